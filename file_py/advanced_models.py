@@ -5,6 +5,27 @@ class AdvancedModels:
     This class provides methods for training and evaluating advanced machine learning models.
     """
 
+    def xgboost_params(scale_pos_weight):
+        """
+        Returns the XGBoost training parameters shared by the in-memory and the streaming training.
+
+        Parameters:
+        - scale_pos_weight: float, ratio between negative and positive training examples
+
+        Returns:
+        - params: dict, XGBoost parameters
+        """
+        return {
+            'objective': 'binary:logistic',
+            'scale_pos_weight': scale_pos_weight,
+            'max_depth': 5,
+            'eta': 0.1,
+            'subsample': 0.8,
+            'colsample_bytree': 0.8,
+            'min_child_weight': 5,
+            'eval_metric': 'auc'
+        }
+
     def train_xgboost(X_train, y_train, X_test, y_test):
         """
         Trains an XGBoost classifier and evaluates its performance on the test data.
@@ -25,22 +46,67 @@ class AdvancedModels:
         val_neg = y_train[y_train == 0].count()
         scale_pos_weight = val_neg / val_pos
 
-        params = {
-            'objective': 'binary:logistic',
-            'scale_pos_weight': scale_pos_weight,
-            'max_depth': 5,
-            'eta': 0.1,
-            'subsample': 0.8,
-            'colsample_bytree': 0.8,
-            'min_child_weight': 5,
-            'eval_metric': 'auc'
-        }
+        params = AdvancedModels.xgboost_params(scale_pos_weight)
         num_round = 200
 
         evals = [(dtrain, 'train'), (dtest, 'eval')]
         bst = xgb.train(params, dtrain, num_round, evals, early_stopping_rounds=10)
 
         y_pred_prob = bst.predict(dtest)
+        AdvancedModels._print_evaluation(y_test, y_pred_prob)
+        return bst
+
+    def train_xgboost_streaming(train_batches, test_batches, external_memory=False, cache_prefix='file_cache/xgboost'):
+        """
+        Trains an XGBoost classifier from batches of data, without holding the whole data set in memory.
+
+        The batches are passed to XGBoost through a data iterator. By default they are quantized into a
+        QuantileDMatrix, which keeps only one byte per value (the test matrix reuses the quantiles of the
+        training one); with external_memory=True the quantized pages are written to disk under
+        cache_prefix and read back during training. The parameters, the scale_pos_weight computed from
+        the training labels, the 200 rounds and the early stopping are those of train_xgboost, with the
+        'hist' tree method.
+
+        Parameters:
+        - train_batches: callable, returns a new iterable of (X, y) training batches at every call,
+          e.g. lambda: preprocessor.transform_batches(catalog.day(day) for day in ['12_06', '19_06'])
+        - test_batches: callable, returns a new iterable of (X, y) testing batches at every call
+        - external_memory: bool, if True the matrices are kept on disk instead of in memory
+        - cache_prefix: str, prefix of the on-disk pages of the external memory
+
+        Returns:
+        - bst: trained XGBoost model
+        """
+        # Imported here: the iterator subclasses xgb.DataIter, which imports XGBoost
+        from .xgboost_batch_iterator import XGBoostBatchIterator
+
+        if external_memory:
+            os.makedirs(os.path.dirname(cache_prefix) or '.', exist_ok=True)
+            dtrain = xgb.DMatrix(XGBoostBatchIterator(train_batches, cache_prefix=f'{cache_prefix}_train'))
+            dtest = xgb.DMatrix(XGBoostBatchIterator(test_batches, cache_prefix=f'{cache_prefix}_test'))
+        else:
+            dtrain = xgb.QuantileDMatrix(XGBoostBatchIterator(train_batches))
+            dtest = xgb.QuantileDMatrix(XGBoostBatchIterator(test_batches), ref=dtrain)
+
+        # Only the labels are needed to weight the classes, not the features
+        y_train = dtrain.get_label()
+        scale_pos_weight = (y_train == 0).sum() / (y_train == 1).sum()
+
+        params = {**AdvancedModels.xgboost_params(scale_pos_weight), 'tree_method': 'hist'}
+        num_round = 200
+
+        evals = [(dtrain, 'train'), (dtest, 'eval')]
+        bst = xgb.train(params, dtrain, num_round, evals, early_stopping_rounds=10)
+
+        y_pred_prob = bst.predict(dtest)
+        AdvancedModels._print_evaluation(dtest.get_label(), y_pred_prob)
+        return bst
+
+    @staticmethod
+    def _print_evaluation(y_test, y_pred_prob):
+        """
+        Prints accuracy, ROC AUC and classification report of the predicted probabilities.
+        """
         y_pred = (y_pred_prob > 0.5).astype(int)
 
         accuracy = accuracy_score(y_test, y_pred)
@@ -48,4 +114,3 @@ class AdvancedModels:
         print(f'Accuracy: {accuracy * 100:.2f}%')
         print(f'ROC AUC: {roc_auc:.2f}')
         print(classification_report(y_test, y_pred))
-        return bst
\ No newline at end of file
@@ -0,0 +1,441 @@
+from .lib import *
+from .dataset_catalog import DatasetCatalog
+from .preprocessed_cache import PreprocessedCache
+from .preprocessing_pipeline import PreprocessingPipeline
+from .csv_preprocessing_scaler import CsvPreprocessingScaler
+from .rule_scorecard import RuleScorecard
+from .rule_index import RuleIndex
+from .plots import Plots
+from .plots_single_attack import PlotsSingleAttack
+from .value_counts_plot import ValueCountsPlot
+from .pattern_mining import PatternMining
+from .correlation_matrix_plots import CorrelationMatrixPlots
+from .preprocessing_train_test_split import PreprocessingTrainTestSplit
+from .initial_training import InitialTraining
+from .hyperparameter_tuning import HyperparameterTuning
+from .search_result_store import SearchResultStore
+from .model_evaluator import ModelEvaluator
+from .advanced_models import AdvancedModels
+from .deep_learning_model import DeepLearningModel
+from .figure_renderer import FigureRenderer
+
+def _run_task(task, config):
+    """Runs one stage of one day (in a worker process) and returns the files it wrote and the seconds spent."""
+    start = time.perf_counter()
+    outputs = BatchPipeline.run_task(task, config)
+    return outputs, time.perf_counter() - start
+
+class BatchPipeline:
+    """Runs the analysis of analisi_log_attacco.ipynb without Jupyter, from a JSON config file.
+
+    Every day of the config (a Splunk export and its run log) is preprocessed and labeled
+    once through the DatasetCatalog, then split into independent tasks: the figures
+    ('plots'), the preceding-event patterns ('patterns') and one training branch per
+    encoding ('train_le', 'train_ohe', ...). The tasks run in a process pool and write
+    their figures, metrics (JSON/CSV) and printed output (.log) to output_dir/<day>/;
+    the figures are drawn by a FigureRenderer (with an index file per task) while the
+    task goes on, and those whose data did not change are not drawn again. A task is skipped when the hashes of its input files, the
+    preprocessing version and its part of the config are those of its last successful
+    run (kept in output_dir/manifest.json) and its files are still there.
+
+    Config keys (all optional, see DEFAULTS):
+        directory: The directory of the LogSplunkWF_<day>.csv / attackLog_<day>.csv pairs.
+        days: The days to run, as a list of names of the directory or as a dict
+            {name: [export, run_log]}; by default every day of the directory.
+        cache_dir, output_dir: The PreprocessedCache directory and the output directory.
+        n_jobs: The number of tasks (and days to label) run at the same time.
+        stages: Any of STAGES.
+        encodings: The training branches, any of ENCODINGS.
+        figures: Any of FIGURES.
+        figure_format: The format of the matplotlib figures, any of FigureRenderer.FORMATS
+            (the Altair charts are always HTML).
+        figure_workers: The processes drawing the figures of each task.
+        max_per_page: The maximum number of subplots of a value_counts_* figure; the
+            others are split into pages (<figure>_1, <figure>_2, ...).
+        rules, elements_to_consider: The rules of the patterns_before_activation figures
+            and the number of preceding events of the patterns.
+        split: The arguments of PreprocessingTrainTestSplit.split_data (strategy, test_size).
+        training: initial (bool), search (None to skip the tuning, or 'grid', 'halving', 'tpe'),
+            n_jobs (of InitialTraining), xgboost (bool) and deep_learning (bool).
+
+    Methods:
+        load_config(path): Reads a config file and fills in the defaults.
+        tasks(config, catalog): Returns the tasks of a config.
+        fingerprint(task, config, cache): Returns the key that tells whether a task must run again.
+        run_task(task, config): Runs one task and returns the files it wrote.
+        run(config, force=False): Runs the tasks whose inputs changed and returns a summary.
+    """
+
+    STAGES = ('plots', 'patterns', 'train')
+
+    # Training branches: the PreprocessingPipeline view and whether the split is sparse
+    ENCODINGS = {'le': ('std_le', False), 'ohe': ('std_ohe', False), 'ohe_sparse': ('std_ohe_sparse', True)}
+
+    FIGURES = ('cake_attack', 'top_10_signatures', 'precision_recall', 'distributions',
+               'value_counts_per_unique', 'value_counts_per_mitre_attack', 'patterns_before_activation',
+               'correlation_matrix')
+
+    DEFAULTS = {
+        'directory': 'file_csv',
+        'days': None,
+        'cache_dir': 'file_cache',
+        'output_dir': 'file_output',
+        'n_jobs': 1,
+        'stages': list(STAGES),
+        'encodings': ['le', 'ohe'],
+        'figures': list(FIGURES),
+        'figure_format': 'png',
+        'figure_workers': 2,
+        'max_per_page': 50,
+        'rules': [],
+        'elements_to_consider': 5,
+        'split': {'strategy': 'random', 'test_size': 0.25},
+        'training': {'initial': True, 'search': 'grid', 'n_jobs': 1, 'xgboost': True, 'deep_learning': False},
+    }
+
+    TARGET = 'corrisponde_ad_attacco'
+
+    @staticmethod
+    def load_config(path=None, **overrides):
+        """Reads a config file and fills in the defaults.
+
+        Args:
+            path (str): The JSON config file; None uses only the defaults.
+            **overrides: Keys that replace those of the file.
+
+        Returns:
+            dict: The complete config.
+        """
+        config = {}
+        if path is not None:
+            with open(path) as f:
+                config = json.load(f)
+        config.update(overrides)
+
+        complete = {**BatchPipeline.DEFAULTS, **config}
+        for key in ('split', 'training'):
+            complete[key] = {**BatchPipeline.DEFAULTS[key], **config.get(key, {})}
+
+        for key, allowed in (('stages', BatchPipeline.STAGES), ('encodings', BatchPipeline.ENCODINGS),
+                             ('figures', BatchPipeline.FIGURES)):
+            unknown = set(complete[key]) - set(allowed)
+            if unknown:
+                raise ValueError(f"Unknown {key} {sorted(unknown)}, expected some of {tuple(allowed)}")
+        if complete['figure_format'] not in FigureRenderer.FORMATS:
+            raise ValueError(f"Unknown figure_format {complete['figure_format']!r}, expected one of {FigureRenderer.FORMATS}")
+        return complete
+
+    @staticmethod
+    def catalog(config):
+        """Returns the DatasetCatalog of the days of a config."""
+        days = config['days']
+        if isinstance(days, dict):
+            catalog = DatasetCatalog(cache_dir=config['cache_dir'])
+            for name, (file_path, run_log_path) in days.items():
+                catalog.register(name, file_path, run_log_path)
+            return catalog
+
+        catalog = DatasetCatalog.from_directory(config['directory'], cache_dir=config['cache_dir'])
+        if days is not None:
+            missing = set(days) - set(catalog.days)
+            if missing:
+                raise ValueError(f"Days {sorted(missing)} not found in {config['directory']}")
+            catalog.days = {name: catalog.days[name] for name in days}
+        return catalog
+
+    @staticmethod
+    def tasks(config, catalog):
+        """Returns the tasks of a config, one per day and stage (and per encoding for the training).
+
+        Args:
+            config (dict): The complete config.
+            catalog (DatasetCatalog): The catalog of the days.
+
+        Returns:
+            list: Dictionaries with the 'id', 'day', 'stage', 'encoding', 'file_path' and 'run_log_path' of every task.
+        """
+        tasks = []
+        for day, (file_path, run_log_path) in catalog.days.items():
+            for stage in config['stages']:
+                for encoding in (config['encodings'] if stage == 'train' else [None]):
+                    name = f'{stage}_{encoding}' if encoding else stage
+                    tasks.append({'id': f'{day}/{name}', 'day': day, 'stage': stage, 'encoding': encoding,
+                                  'file_path': file_path, 'run_log_path': run_log_path})
+        return tasks
+
+    @staticmethod
+    def fingerprint(task, config, cache):
+        """Returns the key that tells whether a task must run again.
+
+        Args:
+            task (dict): The task.
+            config (dict): The complete config.
+            cache (PreprocessedCache): The cache, which remembers the hashes of the files.
+
+        Returns:
+            str: A hash of the input files, the preprocessing and drawing versions and the config of the stage.
+        """
+        if task['stage'] == 'plots':
+            params = {key: config[key] for key in ('figures', 'figure_format', 'max_per_page', 'rules', 'elements_to_consider')}
+        elif task['stage'] == 'patterns':
+            params = {'elements_to_consider': config['elements_to_consider']}
+        else:
+            params = {'encoding': task['encoding'], 'split': config['split'], 'training': config['training'],
+                      'correlation_matrix': 'correlation_matrix' in config['figures'], 'figure_format': config['figure_format']}
+        key = {
+            'stage': task['stage'],
+            'inputs': [cache.file_hash(task['file_path']), cache.file_hash(task['run_log_path'])],
+            'version': CsvPreprocessingScaler.PREPROCESSING_VERSION,
+            'drawing_version': FigureRenderer.DRAWING_VERSION,
+            'params': params,
+        }
+        return hashlib.blake2b(json.dumps(key, sort_keys=True).encode(), digest_size=16).hexdigest()
+
+    @staticmethod
+    def run_task(task, config):
+        """Runs one task, writing its files to output_dir/<day>/ and its printed output to <stage>.log.
+
+        Args:
+            task (dict): The task, as returned by tasks().
+            config (dict): The complete config.
+
+        Returns:
+            list: The paths of the files written.
+        """
+        directory = os.path.join(config['output_dir'], task['day'])
+        os.makedirs(directory, exist_ok=True)
+        name = task['id'].split('/', 1)[1]
+        log_path = os.path.join(directory, f'{name}.log')
+
+        stage = {'plots': BatchPipeline._plots, 'patterns': BatchPipeline._patterns, 'train': BatchPipeline._train}
+        with open(log_path, 'w') as log, contextlib.redirect_stdout(log), contextlib.redirect_stderr(log):
+            outputs = stage[task['stage']](task, config, directory)
+        return outputs + [log_path]
+
+    @staticmethod
+    def _labeled(task, config):
+        """Returns the labeled raw events of the day of a task, from the cache."""
+        return PreprocessedCache(config['cache_dir']).labeled(task['file_path'], task['run_log_path'])
+
+    @staticmethod
+    def _plots(task, config, directory):
+        """Draws the figures of the labeled events of a day and saves the rule scorecard."""
+        df = BatchPipeline._labeled(task, config)
+        scorecard = RuleScorecard.build(df)
+        scorecard_path = os.path.join(directory, 'rule_scorecard.csv')
+        scorecard.to_csv(scorecard_path)
+
+        # Drawing function and aggregate table of every figure; the Altair charts are saved as HTML pages
+        figures = {
+            'cake_attack': (Plots.draw_cake_attack, lambda: Plots.cake_attack_data(df)),
+            'top_10_signatures': (Plots.draw_top_10_signatures, lambda: Plots.top_10_signatures_data(df, scorecard)),
+            'precision_recall': (Plots.draw_precision_recall, lambda: Plots.precision_recall_data(df, scorecard)),
+            'distributions': (Plots.draw_distributions, lambda: Plots.distributions_data(df)),
+        }
+        # Small multiples, one page of at most max_per_page subplots per figure
+        pages = {
+            'value_counts_per_unique': (Plots.draw_value_counts_per_unique, lambda: Plots.value_counts_per_unique_data(df)),
+            'value_counts_per_mitre_attack': (ValueCountsPlot.draw_value_counts_per_unique, lambda: ValueCountsPlot.value_counts_per_unique_data(df)),
+        }
+        altair = ('top_10_signatures', 'precision_recall')
+        formats = (config['figure_format'],)
+
+        with FigureRenderer(directory, max_workers=config['figure_workers'], index_name='figure_cache_plots.json') as renderer:
+            for name, (draw, data) in figures.items():
+                if name in config['figures']:
+                    renderer.render(name, draw, data(), formats=('html',) if name in altair else formats)
+
+            for name, (draw, data) in pages.items():
+                if name in config['figures']:
+                    # Every page is cached on its own rows, so only the pages whose counts changed are drawn again
+                    figure_pages = Plots.value_counts_pages(data(), config['max_per_page'])
+                    for number, page in enumerate(figure_pages, start=1):
+                        renderer.render(f'{name}_{number}', draw, page, formats=formats)
+
+                    # The pages of earlier runs beyond the last one (e.g. with a smaller max_per_page),
+                    # and the single figure drawn before the pages, are deleted
+                    for stale in renderer.names():
+                        number = stale[len(name) + 1:]
+                        if stale == name or (stale.startswith(f'{name}_') and number.isdigit() and int(number) > len(figure_pages)):
+                            renderer.discard(stale)
+
+            if 'patterns_before_activation' in config['figures'] and config['rules']:
+                index = RuleIndex(df)
+                for rule in config['rules']:
+                    data = PlotsSingleAttack.patterns_data(df, rule, config['elements_to_consider'], index=index)
+                    if data is None:
+                        print(f"Rule {rule!r} not found, no patterns_before_activation figures")
+                        continue
+                    safe = ''.join(c if c.isalnum() or c in '-_' else '_' for c in rule)
+                    name = f'patterns_before_activation_{safe}'
+                    renderer.render(f'{name}_rules', PlotsSingleAttack.draw_rules_counts, data, formats=('html',))
+                    for key in ('mitre_attack', 'parent_process', 'process'):
+                        renderer.render(f'{name}_{key}', PlotsSingleAttack.draw_column_counts, data, formats=formats, key=key)
+                    renderer.render(f'{name}_preceding', PlotsSingleAttack.draw_preceding_counts, data, formats=formats)
+            files = renderer.wait()
+
+        return [scorecard_path] + [path for paths in files.values() for path in paths]
+
+    @staticmethod
+    def _patterns(task, config, directory):
+        """Counts the events preceding the activations of every rule of a day."""
+        df = BatchPipeline._labeled(task, config)
+        counts = PatternMining.preceding_event_counts(df, config['elements_to_consider'])
+        path = os.path.join(directory, 'pattern_counts.csv')
+        counts.to_csv(path, index=False)
+        return [path]
+
+    @staticmethod
+    def _train(task, config, directory):
+        """Trains and evaluates the models of one encoding of a day, as in the notebook, and saves the metrics."""
+        view, sparse = BatchPipeline.ENCODINGS[task['encoding']]
+        cache = PreprocessedCache(config['cache_dir'])
+        df = PreprocessingPipeline.from_cache(cache, task['file_path'], task['run_log_path']).labeled(view)
+
+        # The correlation matrix is drawn in the background while the models train
+        with FigureRenderer(directory, max_workers=1, index_name=f'figure_cache_train_{task["encoding"]}.json') as renderer:
+            if 'correlation_matrix' in config['figures'] and not sparse:
+                if task['encoding'] == 'le':
+                    matrix, title, big = CorrelationMatrixPlots.correlation_matrix(df), 'Correlation Matrix (Label Encoding)', False
+                else:
+                    matrix, title, big = CorrelationMatrixPlots.correlation_matrix_big(df), 'Correlation Matrix (OneHot Encoding)', True
+                renderer.render(f'correlation_matrix_{task["encoding"]}', CorrelationMatrixPlots.draw_correlation_matrix,
+                                matrix, formats=(config['figure_format'],), title=title, big=big)
+
+            metrics = BatchPipeline._metrics(df, task['encoding'], sparse, config)
+            path = os.path.join(directory, f'metrics_{task["encoding"]}.json')
+            with open(path, 'w') as f:
+                json.dump(metrics, f, indent=1, default=BatchPipeline._json_value)
+            files = renderer.wait()
+        return [path for paths in files.values() for path in paths] + [path]
+
+    @staticmethod
+    def _metrics(df, encoding, sparse, config):
+        """Splits the encoded events, trains the models of the config and returns their metrics."""
+        training = config['training']
+        X_train, X_test, y_train, y_test = PreprocessingTrainTestSplit.split_data(
+            df, BatchPipeline.TARGET, sparse=sparse, **config['split'])
+        metrics = {'encoding': encoding, 'train_rows': X_train.shape[0], 'test_rows': X_test.shape[0]}
+
+        if training['initial']:
+            metrics['initial'], timings = InitialTraining.train_and_evaluate_initial_models(
+                X_train, y_train, X_test, y_test, n_jobs=training['n_jobs'], return_timings=True)
+            metrics['initial_timings'] = timings.to_dict(orient='records')
+
+        if training['search']:
+            store = SearchResultStore(os.path.join(config['cache_dir'], 'search_results.jsonl'))
+            best_models, search_report = HyperparameterTuning.tune_hyperparameters(
+                X_train, y_train, search=training['search'], store=store, return_report=True)
+            evaluator = ModelEvaluator(best_models)
+            metrics['tuned'] = evaluator.evaluate_models(X_test, y_test)
+            best_model, best_f1_score = evaluator.print_best_model(encoding)
+            metrics['best_model'] = {'name': best_model, 'f1_score': best_f1_score}
+            metrics['search_report'] = search_report.to_dict(orient='records')
+
+        if training['xgboost']:
+            bst = AdvancedModels.train_xgboost(X_train, y_train, X_test, y_test)
+            y_pred = (bst.predict(xgb.DMatrix(X_test)) > 0.5).astype(int)
+            metrics['xgboost'] = classification_report(y_test, y_pred, output_dict=True)
+
+        if training['deep_learning'] and not sparse:
+            model = DeepLearningModel.train_deep_learning_model(X_train, y_train, X_test, y_test)
+            y_pred = (model.predict(X_test) > 0.5).astype(int).ravel()
+            metrics['deep_learning'] = classification_report(y_test, y_pred, output_dict=True)
+
+        return metrics
+
+    @staticmethod
+    def _json_value(value):
+        """Converts the numpy values of the metrics for json.dump."""
+        return value.item() if isinstance(value, np.generic) else str(value)
+
+    @staticmethod
+    def run(config, force=False):
+        """Runs the tasks of a config whose inputs changed since their last successful run.
+
+        Args:
+            config (dict): The config, as returned by load_config.
+            force (bool): If True every task runs again.
+
+        Returns:
+            pandas.DataFrame: One row per task with its status ('ran', 'skipped' or 'failed'),
+            seconds and files (or error), also saved as output_dir/run_summary.json.
+        """
+        os.makedirs(config['output_dir'], exist_ok=True)
+        manifest_path = os.path.join(config['output_dir'], 'manifest.json')
+        manifest = {}
+        if os.path.exists(manifest_path):
+            with open(manifest_path) as f:
+                manifest = json.load(f)
+
+        def save_manifest():
+            tmp = f'{manifest_path}.{os.getpid()}.tmp'
+            with open(tmp, 'w') as f:
+                json.dump(manifest, f, indent=1)
+            os.replace(tmp, manifest_path)
+
+        catalog = BatchPipeline.catalog(config)
+        start = time.perf_counter()
+        labeled = catalog.prepare(n_jobs=config['n_jobs'])
+        print(f"Labeled {len(labeled)} of {len(catalog.days)} days in {time.perf_counter() - start:.2f}s")
+
+        summary, pending = [], []
+        for task in BatchPipeline.tasks(config, catalog):
+            fingerprint = BatchPipeline.fingerprint(task, config, catalog.cache)
+            previous = manifest.get(task['id'], {})
+            if (not force and previous.get('fingerprint') == fingerprint
+                    and all(os.path.exists(path) for path in previous.get('outputs', []))):
+                summary.append({'task': task['id'], 'status': 'skipped', 'seconds': 0.0, 'outputs': previous['outputs']})
+                print(f"{task['id']}: unchanged, skipped")
+            else:
+                pending.append((task, fingerprint))
+
+        def finish(task, fingerprint, future):
+            try:
+                outputs, seconds = future.result()
+            except Exception as error:
+                manifest.pop(task['id'], None)
+                save_manifest()
+                summary.append({'task': task['id'], 'status': 'failed', 'seconds': float('nan'), 'error': repr(error)})
+                print(f"{task['id']}: failed ({error!r})")
+                return
+            manifest[task['id']] = {'fingerprint': fingerprint, 'outputs': outputs, 'seconds': seconds}
+            save_manifest()
+            summary.append({'task': task['id'], 'status': 'ran', 'seconds': seconds, 'outputs': outputs})
+            print(f"{task['id']}: done in {seconds:.2f}s")
+
+        if config['n_jobs'] == 1 or len(pending) <= 1:
+            for task, fingerprint in pending:
+                future = Future()
+                try:
+                    future.set_result(_run_task(task, config))
+                except Exception as error:
+                    future.set_exception(error)
+                finish(task, fingerprint, future)
+        elif pending:
+            with ProcessPoolExecutor(max_workers=min(config['n_jobs'], len(pending))) as executor:
+                running = {executor.submit(_run_task, task, config): (task, fingerprint) for task, fingerprint in pending}
+                while running:
+                    done, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        finish(*running.pop(future), future)
+
+        if not summary:
+            print("No tasks to run: the config selects no days")
+        summary = pd.DataFrame(summary, columns=['task', 'status', 'seconds', 'outputs', 'error'])
+        summary.to_json(os.path.join(config['output_dir'], 'run_summary.json'), orient='records', indent=1)
+        print(f"Total: {time.perf_counter() - start:.2f}s")
+        return summary
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Runs the log analysis pipeline from a JSON config file.')
+    parser.add_argument('config', nargs='?', default=None, help='JSON config file, e.g. batch_config.json')
+    parser.add_argument('--output-dir', default=None)
+    parser.add_argument('--n-jobs', type=int, default=None)
+    parser.add_argument('--force', action='store_true', help='Run every task again, even if its inputs are unchanged')
+    args = parser.parse_args()
+
+    overrides = {key: value for key, value in (('output_dir', args.output_dir), ('n_jobs', args.n_jobs)) if value is not None}
+    summary = BatchPipeline.run(BatchPipeline.load_config(args.config, **overrides), force=args.force)
+    print(summary[['task', 'status', 'seconds']].to_string(index=False))
+    sys.exit(1 if (summary['status'] == 'failed').any() else 0)
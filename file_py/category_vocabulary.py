@@ -0,0 +1,135 @@
+from .lib import *
+
+class CategoryVocabulary:
+    """A vocabulary of categories shared across runs, to store text columns as pandas categoricals.
+
+    After RawPreprocessing, signatures, MITRE ids, EventType, tag and the process ids
+    are Python objects repeated on every (exploded) row, and every groupby or
+    value_counts hashes them again. Encoding them as categoricals keeps one small
+    integer code per row plus one copy of every distinct value.
+
+    The vocabulary is append-only and can be saved to a JSON file: a value keeps the
+    same code in every run and new values only get new codes. A frame encoded before
+    the vocabulary grew has fewer categories, though, and pd.concat of categoricals with
+    different categories falls back to object: concat() gives every frame the current
+    categories first, which keeps the codes and only extends the categories.
+
+    Note that value_counts and groupby on a categorical also report the categories
+    that do not appear in the frame (with 0), unless observed=True is used.
+
+    Attributes:
+        path (str): The JSON file of the vocabulary, or None to keep it in memory.
+        categories (dict): The ordered list of known values for every column.
+
+    Methods:
+        update(df): Adds the unseen values of a DataFrame to the vocabulary.
+        encode(df): Returns a copy of a DataFrame with the columns as categoricals.
+        dtype(column): Returns the current categorical dtype of a column.
+        concat(frames): Concatenates frames encoded at different times, keeping the categoricals.
+        save(): Saves the vocabulary to its JSON file.
+        memory_report(df, df_encoded): Compares the memory used by two layouts of the same DataFrame.
+    """
+
+    CATEGORICAL_COLUMNS = ["signature", "RuleAnnotation.mitre_attack.id", "EventType", "tag",
+                           "parent_process_id", "process_id"]
+
+    def __init__(self, path=None, columns=None):
+        """Initializes the vocabulary, loading it from path if the file exists.
+
+        Args:
+            path (str): The JSON file of the vocabulary.
+            columns (list): The columns to encode, by default CATEGORICAL_COLUMNS.
+        """
+        self.path = path
+        self.columns = list(columns or CategoryVocabulary.CATEGORICAL_COLUMNS)
+        self.categories = {column: [] for column in self.columns}
+        if path is not None and os.path.exists(path):
+            with open(path) as f:
+                self.categories.update(json.load(f))
+
+    @staticmethod
+    def _to_builtin(value):
+        """Converts numpy scalars to Python ones, so that they can be saved as JSON."""
+        return value.item() if isinstance(value, np.generic) else value
+
+    def update(self, df):
+        """Adds the unseen values of a DataFrame to the vocabulary.
+
+        Args:
+            df (pandas.DataFrame): The DataFrame to read the values from.
+
+        Returns:
+            CategoryVocabulary: The vocabulary itself.
+        """
+        for column in self.columns:
+            if column not in df.columns:
+                continue
+            known = set(self.categories[column])
+            new_values = {CategoryVocabulary._to_builtin(v) for v in df[column].dropna().unique()} - known
+            self.categories[column].extend(sorted(new_values, key=str))
+        return self
+
+    def encode(self, df):
+        """Returns a copy of a DataFrame with the vocabulary columns as categoricals.
+
+        Unseen values are added to the vocabulary first, so the codes of the known
+        values never change. A frame already encoded gets the current categories.
+
+        Args:
+            df (pandas.DataFrame): The DataFrame to encode.
+
+        Returns:
+            pandas.DataFrame: The encoded DataFrame.
+        """
+        self.update(df)
+        df = df.copy()
+        for column in self.columns:
+            if column in df.columns:
+                df[column] = df[column].astype(self.dtype(column))
+        return df
+
+    def dtype(self, column):
+        """Returns the current categorical dtype of a column of the vocabulary."""
+        return pd.CategoricalDtype(self.categories[column])
+
+    def concat(self, frames, **kwargs):
+        """Concatenates frames encoded by this vocabulary, also before it grew, keeping the categoricals.
+
+        Args:
+            frames (list): The encoded DataFrames.
+            **kwargs: The other arguments of pd.concat (e.g. ignore_index=True).
+
+        Returns:
+            pandas.DataFrame: The concatenated DataFrame, with the current categories.
+        """
+        frames = [self.encode(df) for df in frames]
+        return pd.concat(frames, **kwargs)
+
+    def save(self):
+        """Saves the vocabulary to its JSON file, atomically so that readers never see a partial file."""
+        if self.path is None:
+            raise ValueError("The vocabulary has no path to be saved to")
+        tmp = f'{self.path}.{os.getpid()}.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(self.categories, f, indent=1)
+        os.replace(tmp, self.path)
+
+    @staticmethod
+    def memory_report(df, df_encoded):
+        """Compares the memory used by two layouts of the same DataFrame.
+
+        Args:
+            df (pandas.DataFrame): The DataFrame with the current (object) layout.
+            df_encoded (pandas.DataFrame): The same DataFrame returned by encode().
+
+        Returns:
+            pandas.DataFrame: The bytes used by every column in both layouts, with a total row.
+        """
+        report = pd.DataFrame({
+            'object_bytes': df.memory_usage(deep=True, index=False),
+            'categorical_bytes': df_encoded.memory_usage(deep=True, index=False),
+        })
+        report.loc['Total'] = report.sum()
+        report['ratio'] = report['object_bytes'] / report['categorical_bytes']
+        print(report.to_string(formatters={'ratio': '{:.1f}x'.format}))
+        return report
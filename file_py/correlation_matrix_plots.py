@@ -4,46 +4,43 @@ class CorrelationMatrixPlots:
     """A utility class for plotting correlation matrices.
 
     This class provides static methods to plot correlation matrices using matplotlib and seaborn.
+    The matrices are computed by correlation_matrix and correlation_matrix_big and drawn by
+    draw_correlation_matrix, which returns the figure without showing it (see FigureRenderer).
 
     Attributes:
         None
 
     Methods:
+        correlation_matrix(df): Computes the correlation matrix of a DataFrame.
+        correlation_matrix_big(df): Computes the correlation matrix of the most correlated columns of a DataFrame.
+        draw_correlation_matrix(matrix, title, big=False): Draws a correlation matrix and returns the figure.
         plot_correlation_matrix(df, title): Plots a correlation matrix for a DataFrame with a specified title.
         plot_correlation_matrix_big(df, title): Plots a larger correlation matrix for a DataFrame with a specified title.
     """
-    
+
     @staticmethod
-    def plot_correlation_matrix(df, title):
-        """Plots a correlation matrix for a DataFrame with a specified title.
+    def correlation_matrix(df):
+        """Computes the correlation matrix of a DataFrame, without the 'codice_attacco' column.
 
         Args:
             df (pandas.DataFrame): The DataFrame containing the data.
-            title (str): The title for the plot.
 
         Returns:
-            None
+            pandas.DataFrame: The correlation matrix.
         """
-        correlation_matrix = df.corr()
-        plt.figure(figsize=(10, 8))
-        sns.heatmap(correlation_matrix, annot=True, fmt=".2f", cmap='coolwarm', linewidths=0.5)
-        plt.xticks(rotation=45, ha='right')
-        plt.yticks(rotation=0)
-        plt.title(title)
-        plt.show()
+        return df.drop(columns='codice_attacco', errors='ignore').corr()
 
     @staticmethod
-    def plot_correlation_matrix_big(df, title):
-        """Plots a larger correlation matrix for a DataFrame with a specified title.
+    def correlation_matrix_big(df):
+        """Computes the correlation matrix of the columns with at least three correlations above 0.30 in absolute value.
 
         Args:
             df (pandas.DataFrame): The DataFrame containing the data.
-            title (str): The title for the plot.
 
         Returns:
-            None
+            pandas.DataFrame: The filtered correlation matrix, always with 'corrisponde_ad_attacco'.
         """
-        correlation_matrix = df.corr()
+        correlation_matrix = CorrelationMatrixPlots.correlation_matrix(df)
 
         # Filter columns with at least three values > 0.30 or < -0.30
         cols_to_keep = correlation_matrix.columns[
@@ -55,11 +52,51 @@ class CorrelationMatrixPlots:
             cols_to_keep.append('corrisponde_ad_attacco')
 
         # Filter the correlation matrix to keep only the desired columns and rows
-        filtered_corr_matrix = correlation_matrix.loc[cols_to_keep, cols_to_keep]
+        return correlation_matrix.loc[cols_to_keep, cols_to_keep]
+
+    @staticmethod
+    def draw_correlation_matrix(matrix, title, big=False):
+        """Draws a correlation matrix as a heatmap.
+
+        Args:
+            matrix (pandas.DataFrame): The matrix returned by correlation_matrix or correlation_matrix_big.
+            title (str): The title for the plot.
+            big (bool): If True the figure is larger and the cells are not annotated.
 
-        plt.figure(figsize=(15, 10))
-        sns.heatmap(filtered_corr_matrix, annot=False, fmt=".2f", cmap='coolwarm', linewidths=0.5)
+        Returns:
+            matplotlib.figure.Figure: The figure.
+        """
+        fig = plt.figure(figsize=(15, 10) if big else (10, 8))
+        sns.heatmap(matrix, annot=not big, fmt=".2f", cmap='coolwarm', linewidths=0.5)
         plt.xticks(rotation=45, ha='right')
         plt.yticks(rotation=0)
         plt.title(title)
+        return fig
+
+    @staticmethod
+    def plot_correlation_matrix(df, title):
+        """Plots a correlation matrix for a DataFrame with a specified title.
+
+        Args:
+            df (pandas.DataFrame): The DataFrame containing the data.
+            title (str): The title for the plot.
+
+        Returns:
+            None
+        """
+        CorrelationMatrixPlots.draw_correlation_matrix(CorrelationMatrixPlots.correlation_matrix(df), title)
+        plt.show()
+
+    @staticmethod
+    def plot_correlation_matrix_big(df, title):
+        """Plots a larger correlation matrix for a DataFrame with a specified title.
+
+        Args:
+            df (pandas.DataFrame): The DataFrame containing the data.
+            title (str): The title for the plot.
+
+        Returns:
+            None
+        """
+        CorrelationMatrixPlots.draw_correlation_matrix(CorrelationMatrixPlots.correlation_matrix_big(df), title, big=True)
         plt.show()
\ No newline at end of file
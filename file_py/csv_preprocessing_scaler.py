@@ -1,4 +1,5 @@
 from .lib import *
+from .run_log_parser import RunLogParser
 
 class CsvPreprocessingScaler:
     """A utility class for preprocessing CSV data and applying scaling.
@@ -12,17 +13,35 @@ class CsvPreprocessingScaler:
 
     Methods:
         read_csv_file(file_path): Reads a CSV file and returns a DataFrame.
+        read_csv_chunks(file_path, run_log_path, chunksize): Yields preprocessed (and labeled) chunks of a CSV file.
 
         drop_unnecessary_columns(df, columns_to_drop): Drops specified columns from a DataFrame.
         convert_to_datetime(df, column): Converts a column in a DataFrame to datetime format.
 
         RawPreprocessing(df): Performs raw preprocessing steps on a DataFrame.
+        RawRowsPreprocessing(df): Performs the row-wise raw preprocessing steps on a DataFrame or chunk.
         LEPreprocessing(df): Performs label encoding preprocessing on a DataFrame.
         OhePreprocessing(df): Performs one-hot encoding preprocessing on a DataFrame.
+        LEEncoding(df): Applies label encoding to an already raw-preprocessed DataFrame.
+        OheEncoding(df): Applies one-hot encoding to an already raw-preprocessed DataFrame.
         
         stdScaler(df): Applies standard scaling to the features of a DataFrame.
+        stdScalerSparse(df): Applies sparsity-preserving standard scaling (with_mean=False).
+        to_csr(df): Converts the numeric columns of a DataFrame to a scipy CSR matrix.
     """
 
+    # Bump when RawPreprocessing changes its output, to invalidate the cached frames
+    PREPROCESSING_VERSION = 1
+
+    # Columns kept by RawPreprocessing, in output order
+    RAW_COLUMNS = ["signature", "RuleAnnotation.mitre_attack.id", "_time", "parent_process_id", "process_id", 
+                   "severity_id", "EventType", "tag"]
+
+    # Explicit dtypes for the streaming reader ('_time' is converted afterwards)
+    RAW_DTYPES = {"signature": "str", "RuleAnnotation.mitre_attack.id": "str", "_time": "str",
+                  "parent_process_id": "Int64", "process_id": "Int64", "severity_id": "Int64",
+                  "EventType": "str", "tag": "str"}
+
     def read_csv_file(file_path):
         """Reads a CSV file and returns a DataFrame.
 
@@ -90,6 +109,21 @@ class CsvPreprocessingScaler:
                         "date_wday", "date_year", "date_zone", "RuleAnnotation", "Timestamp", 
                         "tag::eventtype", "AppVersion"]
         df = CsvPreprocessingScaler.drop_unnecessary_columns(df, columns_to_drop)
+
+        return CsvPreprocessingScaler.RawRowsPreprocessing(df)
+
+    def RawRowsPreprocessing(df):
+        """Performs the row-wise raw preprocessing steps on a DataFrame.
+
+        These steps do not depend on the rest of the file, so they can be applied
+        to a single chunk as well as to the whole DataFrame.
+
+        Args:
+            df (pandas.DataFrame): A DataFrame containing at least RAW_COLUMNS.
+
+        Returns:
+            pandas.DataFrame: The preprocessed DataFrame with RAW_COLUMNS only.
+        """
         
         # Convert '_time' column to datetime
         CsvPreprocessingScaler.convert_to_datetime(df, '_time')
@@ -100,10 +134,47 @@ class CsvPreprocessingScaler:
         # Explode rows with lists of values into multiple separate rows
         df = df.explode('RuleAnnotation.mitre_attack.id')
         
-        df = df[["signature", "RuleAnnotation.mitre_attack.id", "_time", "parent_process_id", "process_id", 
-                "severity_id", "EventType", "tag"]]
+        df = df[CsvPreprocessingScaler.RAW_COLUMNS]
         return df
 
+    def read_csv_chunks(file_path, run_log_path=None, chunksize=100_000, dtype=None):
+        """Reads a CSV file in chunks and yields preprocessed (and labeled) chunks.
+
+        Only RAW_COLUMNS are read, with the explicit RAW_DTYPES, so the '_raw'
+        column and the other discarded fields never reach memory: peak memory
+        depends on chunksize, not on the size of the file. The drop of columns with
+        more than 2000 missing values is not needed here since only the kept
+        columns are read.
+
+        Args:
+            file_path (str): The path to the CSV file.
+            run_log_path (str): The path to the run log CSV file. If given, every
+                chunk is labeled with RunLogParser.label_attacks.
+            chunksize (int): The number of CSV rows per chunk (before the explode).
+            dtype (dict): Overrides for RAW_DTYPES.
+
+        Yields:
+            pandas.DataFrame: The preprocessed chunks, in file order.
+        """
+        attacks = RunLogParser.parse_run_log(run_log_path) if run_log_path else None
+        try:
+            reader = pd.read_csv(file_path, usecols=CsvPreprocessingScaler.RAW_COLUMNS,
+                                 dtype={**CsvPreprocessingScaler.RAW_DTYPES, **(dtype or {})},
+                                 chunksize=chunksize)
+        except FileNotFoundError:
+            print(f"File {file_path} not found.")
+            return
+        except pd.errors.EmptyDataError:
+            print(f"File {file_path} is empty.")
+            return
+
+        with reader:
+            for chunk in reader:
+                chunk = CsvPreprocessingScaler.RawRowsPreprocessing(chunk)
+                if attacks is not None:
+                    chunk = RunLogParser.label_attacks(attacks, chunk)
+                yield chunk
+
     def RawPreprocessingWSig(df):
         """Performs raw preprocessing steps on a DataFrame.
 
@@ -146,7 +217,19 @@ class CsvPreprocessingScaler:
             pandas.DataFrame: The preprocessed DataFrame.
         """
 
-        df = CsvPreprocessingScaler.RawPreprocessing(df)
+        return CsvPreprocessingScaler.LEEncoding(CsvPreprocessingScaler.RawPreprocessing(df))
+
+    def LEEncoding(df):
+        """Applies label encoding to a DataFrame already processed by RawPreprocessing.
+
+        Args:
+            df (pandas.DataFrame): The raw-preprocessed DataFrame (left untouched).
+
+        Returns:
+            pandas.DataFrame: The label-encoded DataFrame.
+        """
+
+        df = df.copy()
         columns_to_encode_for_LE = ["signature", "RuleAnnotation.mitre_attack.id", "parent_process_id", "process_id", 
                             "severity_id", "EventType", "tag"]
         label_encoder = LabelEncoder()
@@ -169,14 +252,27 @@ class CsvPreprocessingScaler:
             pandas.DataFrame: The preprocessed DataFrame.
         """
 
-        df = CsvPreprocessingScaler.RawPreprocessing(df)
+        return CsvPreprocessingScaler.OheEncoding(CsvPreprocessingScaler.RawPreprocessing(df))
+
+    def OheEncoding(df, sparse=False):
+        """Applies one-hot encoding to a DataFrame already processed by RawPreprocessing.
+
+        Args:
+            df (pandas.DataFrame): The raw-preprocessed DataFrame (left untouched).
+            sparse (bool): If True, the dummy columns are pandas sparse columns.
+
+        Returns:
+            pandas.DataFrame: The one-hot encoded DataFrame.
+        """
+
+        df = df.copy()
         columns_to_encode_for_OH = ["signature", "RuleAnnotation.mitre_attack.id", "severity_id", "EventType", "tag"]
 
         # Replace newlines in 'tag' column
         df['tag'] = df['tag'].str.replace('\n', '_')
 
         try:
-            df = pd.get_dummies(df, columns=columns_to_encode_for_OH)
+            df = pd.get_dummies(df, columns=columns_to_encode_for_OH, sparse=sparse)
         except Exception as e:
             print(f"An error occurred during OneHotEncoding: {e}")
         
@@ -198,3 +294,38 @@ class CsvPreprocessingScaler:
         except Exception as e:
             print(f"An error occurred during standard scaling: {e}")
             return df
+
+    def to_csr(df):
+        """Converts the (dense or sparse) numeric columns of a DataFrame to a scipy CSR matrix.
+
+        Args:
+            df (pandas.DataFrame): The DataFrame to convert.
+
+        Returns:
+            scipy.sparse.csr_matrix: The matrix, with the columns in the same order.
+        """
+        return df.astype(pd.SparseDtype("float64", 0)).sparse.to_coo().tocsr()
+
+    def stdScalerSparse(df):
+        """Applies sparsity-preserving standard scaling to the features of a DataFrame.
+
+        The features are only divided by their standard deviation (StandardScaler with
+        with_mean=False): centering would turn every zero of the one-hot columns into a
+        non-zero value.
+
+        Args:
+            df (pandas.DataFrame): The DataFrame to scale, e.g. OheEncoding(df, sparse=True).
+
+        Returns:
+            pandas.DataFrame: The scaled DataFrame, with sparse feature columns and '_time' last.
+        """
+        scaler = StandardScaler(with_mean=False)
+        try:
+            features = df.drop(columns="_time")
+            df_scaled = pd.DataFrame.sparse.from_spmatrix(scaler.fit_transform(CsvPreprocessingScaler.to_csr(features)),
+                                                          index=df.index, columns=features.columns)
+            df_scaled["_time"] = df["_time"].to_numpy()
+            return df_scaled
+        except Exception as e:
+            print(f"An error occurred during standard scaling: {e}")
+            return df
@@ -19,8 +19,12 @@ class CsvPreprocessingScalerFull:
         RawPreprocessing(df): Performs raw preprocessing steps on a DataFrame.
         LEPreprocessing(df): Performs label encoding preprocessing on a DataFrame.
         OhePreprocessing(df): Performs one-hot encoding preprocessing on a DataFrame.
+        LEEncoding(df): Applies label encoding to an already raw-preprocessed DataFrame.
+        OheEncoding(df): Applies one-hot encoding to an already raw-preprocessed DataFrame.
         
         stdScaler(df): Applies standard scaling to the features of a DataFrame.
+        stdScalerSparse(df): Applies sparsity-preserving standard scaling (with_mean=False).
+        to_csr(df): Converts the numeric columns of a DataFrame to a scipy CSR matrix.
     """
 
     def read_csv_file(file_path):
@@ -151,7 +155,19 @@ class CsvPreprocessingScalerFull:
             pandas.DataFrame: The preprocessed DataFrame.
         """
 
-        df = CsvPreprocessingScalerFull.RawPreprocessing(df)
+        return CsvPreprocessingScalerFull.LEEncoding(CsvPreprocessingScalerFull.RawPreprocessing(df))
+
+    def LEEncoding(df):
+        """Applies label encoding to a DataFrame already processed by RawPreprocessing.
+
+        Args:
+            df (pandas.DataFrame): The raw-preprocessed DataFrame (left untouched).
+
+        Returns:
+            pandas.DataFrame: The label-encoded DataFrame.
+        """
+
+        df = df.copy()
         columns_to_encode_for_LE = ["signature", "RuleAnnotation.mitre_attack.id", "parent_process_id", "process_id", 
                             "severity_id", "EventType", "tag"]
         label_encoder = LabelEncoder()
@@ -174,14 +190,27 @@ class CsvPreprocessingScalerFull:
             pandas.DataFrame: The preprocessed DataFrame.
         """
 
-        df = CsvPreprocessingScalerFull.RawPreprocessing(df)
+        return CsvPreprocessingScalerFull.OheEncoding(CsvPreprocessingScalerFull.RawPreprocessing(df))
+
+    def OheEncoding(df, sparse=False):
+        """Applies one-hot encoding to a DataFrame already processed by RawPreprocessing.
+
+        Args:
+            df (pandas.DataFrame): The raw-preprocessed DataFrame (left untouched).
+            sparse (bool): If True, the dummy columns are pandas sparse columns.
+
+        Returns:
+            pandas.DataFrame: The one-hot encoded DataFrame.
+        """
+
+        df = df.copy()
         columns_to_encode_for_OH = ["signature", "RuleAnnotation.mitre_attack.id", "severity_id", "EventType", "tag"]
 
         # Replace newlines in 'tag' column
         df['tag'] = df['tag'].str.replace('\n', '_')
 
         try:
-            df = pd.get_dummies(df, columns=columns_to_encode_for_OH)
+            df = pd.get_dummies(df, columns=columns_to_encode_for_OH, sparse=sparse)
         except Exception as e:
             print(f"An error occurred during OneHotEncoding: {e}")
         
@@ -203,3 +232,38 @@ class CsvPreprocessingScalerFull:
         except Exception as e:
             print(f"An error occurred during standard scaling: {e}")
             return df
+
+    def to_csr(df):
+        """Converts the (dense or sparse) numeric columns of a DataFrame to a scipy CSR matrix.
+
+        Args:
+            df (pandas.DataFrame): The DataFrame to convert.
+
+        Returns:
+            scipy.sparse.csr_matrix: The matrix, with the columns in the same order.
+        """
+        return df.astype(pd.SparseDtype("float64", 0)).sparse.to_coo().tocsr()
+
+    def stdScalerSparse(df):
+        """Applies sparsity-preserving standard scaling to the features of a DataFrame.
+
+        The features are only divided by their standard deviation (StandardScaler with
+        with_mean=False): centering would turn every zero of the one-hot columns into a
+        non-zero value.
+
+        Args:
+            df (pandas.DataFrame): The DataFrame to scale, e.g. OheEncoding(df, sparse=True).
+
+        Returns:
+            pandas.DataFrame: The scaled DataFrame, with sparse feature columns and '_time' last.
+        """
+        scaler = StandardScaler(with_mean=False)
+        try:
+            features = df.drop(columns="_time")
+            df_scaled = pd.DataFrame.sparse.from_spmatrix(scaler.fit_transform(CsvPreprocessingScalerFull.to_csr(features)),
+                                                          index=df.index, columns=features.columns)
+            df_scaled["_time"] = df["_time"].to_numpy()
+            return df_scaled
+        except Exception as e:
+            print(f"An error occurred during standard scaling: {e}")
+            return df
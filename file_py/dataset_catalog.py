@@ -0,0 +1,151 @@
+from .lib import *
+from .preprocessed_cache import PreprocessedCache
+from .category_vocabulary import CategoryVocabulary
+
+def _prepare_day(cache_dir, file_path, run_log_path):
+    """Preprocesses and labels one day in a worker process, leaving the result in the cache."""
+    PreprocessedCache(cache_dir).labeled(file_path, run_log_path)
+    return file_path
+
+class DatasetCatalog:
+    """A catalog of days, each one a (Splunk export, run log) pair, combined into one dataset.
+
+    Every day is preprocessed and labeled on its own, in parallel worker processes,
+    and stored in the PreprocessedCache: adding a new day, or changing the files of a
+    day, processes only that day. The days are then concatenated with a 'giorno'
+    column and with the text columns encoded by a CategoryVocabulary shared by all
+    the days and saved next to the cache, so a value has the same code on every day
+    and in every later run.
+
+    Attributes:
+        days (dict): The (Splunk export, run log) pair of every day, by name, in registration order.
+        cache (PreprocessedCache): The cache of the preprocessed and labeled days.
+        vocabulary (CategoryVocabulary): The vocabulary shared by all the days.
+
+    Methods:
+        register(name, file_path, run_log_path): Adds a day to the catalog.
+        from_directory(directory): Builds a catalog from the exports and run logs of a directory.
+        prepare(names, n_jobs): Preprocesses and labels, in parallel, the days not cached yet.
+        day(name): Returns the preprocessed and labeled events of a day.
+        combined(names): Returns the events of several days in one DataFrame with a shared encoding.
+    """
+
+    DAY_COLUMN = 'giorno'
+
+    def __init__(self, cache_dir='file_cache', vocabulary_path=None):
+        """Initializes an empty catalog.
+
+        Args:
+            cache_dir (str): The directory of the PreprocessedCache.
+            vocabulary_path (str): The JSON file of the shared vocabulary
+                (default: 'vocabulary.json' in cache_dir).
+        """
+        self.days = {}
+        self.cache = PreprocessedCache(cache_dir)
+        self.vocabulary = CategoryVocabulary(vocabulary_path or os.path.join(cache_dir, 'vocabulary.json'))
+
+    def register(self, name, file_path, run_log_path):
+        """Adds a day to the catalog.
+
+        Args:
+            name (str): The name of the day, e.g. '24_06'.
+            file_path (str): The path to the Splunk export of the day.
+            run_log_path (str): The path to the run log of the day.
+
+        Returns:
+            DatasetCatalog: The catalog itself.
+        """
+        self.days[name] = (file_path, run_log_path)
+        return self
+
+    @classmethod
+    def from_directory(cls, directory='file_csv', export_prefix='LogSplunkWF_', run_log_prefix='attackLog_', **kwargs):
+        """Builds a catalog with every day of a directory that has both an export and a run log.
+
+        The files are paired by the suffix of their names ('LogSplunkWF_24_06.csv' with
+        'attackLog_24_06.csv') and the days are registered in calendar order.
+
+        Args:
+            directory (str): The directory with the files.
+            export_prefix (str): The prefix of the Splunk exports.
+            run_log_prefix (str): The prefix of the run logs.
+            **kwargs: The arguments of the constructor.
+
+        Returns:
+            DatasetCatalog: The catalog.
+        """
+        catalog = cls(**kwargs)
+        files = sorted(os.listdir(directory))
+        names = [f[len(run_log_prefix):-len('.csv')] for f in files if f.startswith(run_log_prefix) and f.endswith('.csv')]
+
+        def calendar_order(name):
+            parts = name.split('_')
+            return tuple(int(p) for p in reversed(parts)) if all(p.isdigit() for p in parts) else (name,)
+
+        for name in sorted(names, key=calendar_order):
+            export = os.path.join(directory, f'{export_prefix}{name}.csv')
+            if os.path.exists(export):
+                catalog.register(name, export, os.path.join(directory, f'{run_log_prefix}{name}.csv'))
+            else:
+                print(f"Day {name} skipped: {export} not found.")
+        return catalog
+
+    def prepare(self, names=None, n_jobs=None):
+        """Preprocesses and labels, in parallel worker processes, the days not cached yet.
+
+        Args:
+            names (list): The days to prepare, by default all of them.
+            n_jobs (int): The number of processes (default: one per day to prepare, at most the CPUs).
+
+        Returns:
+            list: The names of the days that were processed.
+        """
+        names = list(self.days) if names is None else list(names)
+        missing = [name for name in names if not self.cache.has_labeled(*self.days[name])]
+        if len(missing) == 1 or n_jobs == 1:
+            for name in missing:
+                _prepare_day(self.cache.cache_dir, *self.days[name])
+        elif missing:
+            workers = min(len(missing), n_jobs or os.cpu_count())
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                futures = {executor.submit(_prepare_day, self.cache.cache_dir, *self.days[name]): name
+                           for name in missing}
+                for future in futures:
+                    future.result()
+        return missing
+
+    def day(self, name):
+        """Returns the preprocessed and labeled events of a day (a fast load from the cache).
+
+        Args:
+            name (str): The name of the day.
+
+        Returns:
+            pandas.DataFrame: The raw-preprocessed DataFrame with 'corrisponde_ad_attacco' and 'codice_attacco'.
+        """
+        return self.cache.labeled(*self.days[name])
+
+    def combined(self, names=None, n_jobs=None):
+        """Returns the events of several days in one DataFrame with a shared encoding.
+
+        Args:
+            names (list): The days to combine, by default all of them in registration order.
+            n_jobs (int): The number of processes used to prepare the days not cached yet.
+
+        Returns:
+            pandas.DataFrame: The labeled events of the days, with the 'giorno' column and the
+            vocabulary columns as categoricals with the same categories on every day.
+        """
+        names = list(self.days) if names is None else list(names)
+        self.prepare(names, n_jobs)
+
+        frames = []
+        for name in names:
+            frame = self.day(name)
+            self.vocabulary.update(frame)
+            frames.append(frame.assign(**{DatasetCatalog.DAY_COLUMN: name}))
+        self.vocabulary.save()
+
+        df = self.vocabulary.encode(pd.concat(frames, ignore_index=True))
+        df[DatasetCatalog.DAY_COLUMN] = pd.Categorical(df[DatasetCatalog.DAY_COLUMN], categories=names)
+        return df
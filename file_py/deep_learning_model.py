@@ -5,6 +5,25 @@ class DeepLearningModel:
     This class provides methods for training and evaluating a deep learning model using Keras.
     """
 
+    def build_model(n_features):
+        """
+        Builds and compiles the network shared by the in-memory and the streaming training.
+
+        Parameters:
+        - n_features: int, number of input features
+
+        Returns:
+        - model: compiled Keras model
+        """
+        model = Sequential([
+            Dense(64, activation='relu', input_shape=(n_features,)),
+            Dense(32, activation='relu'),
+            Dense(1, activation='sigmoid')
+        ])
+
+        model.compile(optimizer='adam', loss='binary_crossentropy', metrics=['accuracy'])
+        return model
+
     def train_deep_learning_model(X_train, y_train, X_test, y_test):
         """
         Trains a deep learning model and evaluates its performance on the test data.
@@ -18,13 +37,7 @@ class DeepLearningModel:
         Returns:
         - model: trained deep learning model
         """
-        model = Sequential([
-            Dense(64, activation='relu', input_shape=(X_train.shape[1],)),
-            Dense(32, activation='relu'),
-            Dense(1, activation='sigmoid')
-        ])
-
-        model.compile(optimizer='adam', loss='binary_crossentropy', metrics=['accuracy'])
+        model = DeepLearningModel.build_model(X_train.shape[1])
 
         model.fit(X_train, y_train, epochs=10, batch_size=32, verbose=1)
 
@@ -36,4 +49,96 @@ class DeepLearningModel:
 
         print("Classification Report for Deep Learning Model:")
         print(classification_report(y_test, y_pred))
-        return model
\ No newline at end of file
+        return model
+
+    def dataset(batches, n_features, batch_size=1024, shuffle_buffer=None):
+        """
+        Builds a tf.data pipeline of float32 batches from a source of (X, y) batches.
+
+        Parameters:
+        - batches: callable, returns a new iterable of (X, y) batches at every call (one call per epoch)
+        - n_features: int, number of input features
+        - batch_size: int, number of rows of every batch passed to the model
+        - shuffle_buffer: int, if given the rows are shuffled within a buffer of this many rows
+
+        Returns:
+        - dataset: tf.data.Dataset of (features, labels) batches, prefetched
+        """
+        dataset = tf.data.Dataset.from_generator(
+            lambda: ((np.asarray(X, dtype=np.float32), np.asarray(y, dtype=np.float32)) for X, y in batches()),
+            output_signature=(tf.TensorSpec(shape=(None, n_features), dtype=tf.float32),
+                              tf.TensorSpec(shape=(None,), dtype=tf.float32)))
+        if shuffle_buffer:
+            dataset = dataset.unbatch().shuffle(shuffle_buffer).batch(batch_size)
+        else:
+            dataset = dataset.rebatch(batch_size)
+        return dataset.prefetch(tf.data.AUTOTUNE)
+
+    def class_weights(batches):
+        """
+        Computes balanced class weights (n_samples / (2 * n_class_samples)) reading only the labels.
+
+        Parameters:
+        - batches: callable, returns an iterable of (X, y) batches
+
+        Returns:
+        - class_weight: dict, weight of class 0 and class 1
+        """
+        counts = np.zeros(2, dtype=np.int64)
+        for _, y in batches():
+            counts += np.bincount(np.asarray(y, dtype=np.int64), minlength=2)[:2]
+        return {label: counts.sum() / (2 * count) if count else 1.0 for label, count in enumerate(counts)}
+
+    def train_deep_learning_model_streaming(train_batches, test_batches, batch_size=1024, epochs=10,
+                                            shuffle_buffer=100_000, class_weight='balanced',
+                                            validation_batches=None, patience=None):
+        """
+        Trains the deep learning model on a tf.data pipeline, without holding the whole data set in memory.
+
+        The batches (e.g. lambda: preprocessor.transform_batches(frames)) are read again at every epoch,
+        shuffled within a buffer, regrouped in batches of batch_size rows and prefetched while the model
+        trains. The test set is predicted one batch at a time.
+
+        Parameters:
+        - train_batches: callable, returns a new iterable of (X, y) training batches at every call
+        - test_batches: callable, returns a new iterable of (X, y) testing batches at every call
+        - batch_size: int, number of rows per gradient step (the in-memory training uses 32)
+        - epochs: int, maximum number of epochs
+        - shuffle_buffer: int, number of rows of the shuffle buffer (None or 0 to keep the order)
+        - class_weight: 'balanced' (computed with one pass over the training labels), dict or None
+        - validation_batches: callable, optional source of validation batches for the early stopping
+        - patience: int, if given training stops after patience epochs without improvement of the
+          validation loss (or of the training loss without validation_batches), keeping the best weights
+
+        Returns:
+        - model: trained deep learning model
+        """
+        n_features = np.asarray(next(iter(train_batches()))[0]).shape[1]
+        model = DeepLearningModel.build_model(n_features)
+
+        if class_weight == 'balanced':
+            class_weight = DeepLearningModel.class_weights(train_batches)
+
+        validation = None
+        if validation_batches is not None:
+            validation = DeepLearningModel.dataset(validation_batches, n_features, batch_size)
+        callbacks = []
+        if patience is not None:
+            callbacks.append(EarlyStopping(monitor='val_loss' if validation is not None else 'loss',
+                                           patience=patience, restore_best_weights=True))
+
+        model.fit(DeepLearningModel.dataset(train_batches, n_features, batch_size, shuffle_buffer),
+                  epochs=epochs, validation_data=validation, class_weight=class_weight,
+                  callbacks=callbacks, verbose=1)
+
+        y_test, y_pred_prob = [], []
+        for X, y in test_batches():
+            y_pred_prob.append(model.predict_on_batch(np.asarray(X, dtype=np.float32)).ravel())
+            y_test.append(np.asarray(y))
+        y_test, y_pred_prob = np.concatenate(y_test), np.concatenate(y_pred_prob)
+        y_pred = (y_pred_prob > 0.5).astype(int)
+
+        print(f'Test Accuracy: {accuracy_score(y_test, y_pred)}')
+        print("Classification Report for Deep Learning Model:")
+        print(classification_report(y_test, y_pred))
+        return model
@@ -0,0 +1,218 @@
+from .lib import *
+
+def _render_figure(draw, data, kwargs, paths):
+    """Draws a figure in a worker process and writes it to every path, by extension."""
+    plt.switch_backend('Agg')
+    figure = draw(data, **kwargs)
+    try:
+        for path in paths:
+            FigureRenderer.save(figure, path)
+    finally:
+        plt.close('all')
+    return paths
+
+class FigureRenderer:
+    """Draws figures to files in a background process pool, redrawing only those whose data changed.
+
+    The plotting classes split every chart into a function that computes its aggregate
+    table (e.g. Plots.distributions_data) and one that draws the table and returns the
+    figure (e.g. Plots.draw_distributions). The renderer receives the drawing function
+    and the table, so only the small table is sent to the workers, and the figure is
+    drawn and written there while the caller goes on. Every figure is keyed by the hash
+    of DRAWING_VERSION and of its drawing function name, table, arguments and formats:
+    if the key and the files are those of the last rendering (kept in the index file,
+    figure_cache.json in output_dir by default) the figure is not drawn again.
+
+    Matplotlib figures can be written as PNG, SVG or HTML (an SVG page), Altair charts as
+    HTML (PNG and SVG need vl-convert) and Plotly figures as HTML (PNG and SVG need kaleido).
+
+    Attributes:
+        output_dir (str): The directory of the figures.
+
+    Methods:
+        key(draw, data, kwargs, formats): Returns the cache key of a figure.
+        save(figure, path): Writes a matplotlib, Altair or Plotly figure to a file.
+        render(name, draw, data, formats=('png',), **kwargs): Draws a figure in the background.
+        names(): Returns the figures of output_dir, in the cache or on disk.
+        discard(name): Deletes the files and the cache entry of a figure.
+        wait(): Waits for the pending figures and returns the files of every figure.
+        close(): Waits for the pending figures and stops the workers.
+    """
+
+    FORMATS = ('png', 'svg', 'html')
+
+    # Bump when a draw_* function changes its figure, to draw the cached figures again
+    DRAWING_VERSION = 1
+
+    def __init__(self, output_dir='file_output/figures', max_workers=None, index_name='figure_cache.json'):
+        """Initializes the renderer; the workers are started at the first figure to draw.
+
+        Args:
+            output_dir (str): The directory of the figures and of the index file.
+            max_workers (int): The number of worker processes (default: the CPUs, at most 4).
+            index_name (str): The index file of the cache keys; renderers running at the same
+                time on the same directory should use different index files (see wait).
+        """
+        self.output_dir = output_dir
+        os.makedirs(output_dir, exist_ok=True)
+        self._max_workers = max_workers or min(4, os.cpu_count())
+        self._executor = None
+        self._index_path = os.path.join(output_dir, index_name)
+        self._index = self._read_index()
+        self._updates = {}
+        self._pending = {}
+        self._files = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _read_index(self):
+        if not os.path.exists(self._index_path):
+            return {}
+        with open(self._index_path) as f:
+            return json.load(f)
+
+    @staticmethod
+    def key(draw, data, kwargs, formats):
+        """Returns the cache key of a figure.
+
+        Args:
+            draw (callable): The drawing function.
+            data: The aggregate table (or tables) passed to draw.
+            kwargs (dict): The other arguments of draw.
+            formats (tuple): The formats to write.
+
+        Returns:
+            str: The joblib hash of DRAWING_VERSION, the function name, the data, the arguments and the formats.
+        """
+        return joblib.hash((FigureRenderer.DRAWING_VERSION, draw.__module__, draw.__qualname__, data, kwargs, tuple(formats)))
+
+    @staticmethod
+    def save(figure, path):
+        """Writes a matplotlib, Altair or Plotly figure to a file, in the format of its extension.
+
+        Args:
+            figure: A matplotlib Figure, an Altair chart or a Plotly figure.
+            path (str): The file to write.
+        """
+        extension = os.path.splitext(path)[1][1:]
+        if hasattr(figure, 'savefig'):
+            if extension == 'html':
+                svg = io.StringIO()
+                figure.savefig(svg, format='svg', bbox_inches='tight')
+                with open(path, 'w') as f:
+                    f.write(f'<!DOCTYPE html>\n<html><body>\n{svg.getvalue()}\n</body></html>\n')
+            else:
+                figure.savefig(path, format=extension, bbox_inches='tight')
+        elif hasattr(figure, 'write_html'):
+            if extension == 'html':
+                figure.write_html(path)
+            else:
+                figure.write_image(path)
+        else:
+            figure.save(path)
+
+    def render(self, name, draw, data, formats=('png',), **kwargs):
+        """Draws a figure in a worker process, unless the files of the same data are already there.
+
+        Args:
+            name (str): The name of the files (output_dir/<name>.<format>).
+            draw (callable): A module-level or class-level function returning the figure of data.
+            data: The aggregate table (or tables) to draw.
+            formats (tuple): Any of FORMATS.
+            **kwargs: The other arguments of draw.
+
+        Returns:
+            concurrent.futures.Future: The future list of the files of the figure.
+        """
+        unknown = set(formats) - set(FigureRenderer.FORMATS)
+        if unknown:
+            raise ValueError(f"Unknown formats {sorted(unknown)}, expected some of {FigureRenderer.FORMATS}")
+
+        paths = [os.path.join(self.output_dir, f'{name}.{extension}') for extension in formats]
+        key = FigureRenderer.key(draw, data, kwargs, formats)
+        cached = self._index.get(name)
+        if cached and cached['key'] == key and all(os.path.exists(path) for path in cached['paths']):
+            future = Future()
+            future.set_result(cached['paths'])
+            self._files[name] = cached['paths']
+            return future
+
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self._max_workers)
+        future = self._executor.submit(_render_figure, draw, data, kwargs, paths)
+        self._pending[name] = (future, key)
+        return future
+
+    def names(self):
+        """Returns the names of the figures of output_dir, those in the cache and those with a file of FORMATS."""
+        names = set(self._index) | {name for name, (future, key) in self._pending.items()}
+        for file in os.listdir(self.output_dir):
+            name, extension = os.path.splitext(file)
+            if extension[1:] in FigureRenderer.FORMATS:
+                names.add(name)
+        return sorted(names)
+
+    def discard(self, name):
+        """Deletes the files of a figure (in every format) and removes it from the cache at the next wait().
+
+        Args:
+            name (str): The name of the figure, as given to render.
+        """
+        for extension in FigureRenderer.FORMATS:
+            path = os.path.join(self.output_dir, f'{name}.{extension}')
+            if os.path.exists(path):
+                os.remove(path)
+        self._updates[name] = None
+        self._files.pop(name, None)
+
+    def wait(self):
+        """Waits for the pending figures and records them in the cache.
+
+        The index file is read again and only the entries of this renderer are changed, but
+        the read and the write are not locked: if two renderers sharing an index file write it
+        at the same time one of their entries can be lost, and that figure is drawn again next
+        time. Renderers running at the same time should therefore use different index_name.
+
+        Returns:
+            dict: The files of every figure rendered (or found in the cache) so far, by name.
+        """
+        errors = []
+        for name, (future, key) in self._pending.items():
+            try:
+                paths = future.result()
+            except Exception as error:
+                self._updates[name] = None
+                errors.append(f'{name}: {error!r}')
+                continue
+            self._updates[name] = {'key': key, 'paths': paths}
+            self._files[name] = paths
+        self._pending = {}
+
+        # Only the figures of this renderer are changed in the index on disk
+        self._index = self._read_index()
+        for name, entry in self._updates.items():
+            if entry is None:
+                self._index.pop(name, None)
+            else:
+                self._index[name] = entry
+        tmp = f'{self._index_path}.{os.getpid()}.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(self._index, f, indent=1)
+        os.replace(tmp, self._index_path)
+
+        if errors:
+            raise RuntimeError('Some figures could not be rendered:\n' + '\n'.join(errors))
+        return dict(self._files)
+
+    def close(self):
+        """Waits for the pending figures and stops the worker processes."""
+        try:
+            self.wait()
+        finally:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
@@ -0,0 +1,185 @@
+from .lib import *
+from .csv_preprocessing_scaler import CsvPreprocessingScaler
+from .preprocessing_train_test_split import PreprocessingTrainTestSplit
+
+class FittedPreprocessor:
+    """A label/one-hot encoder and standard scaler fitted once, saved to disk and reused on new batches.
+
+    LEPreprocessing refits its LabelEncoder on every column and stdScaler fits a new
+    StandardScaler on every call, so the mappings are lost and new events cannot be
+    scored without preprocessing the whole dataset again. This class fits the
+    vocabulary of every encoded column and the scaler on the training data and then
+    applies the same transformation to any batch of RawPreprocessing output.
+
+    Missing values are encoded as LEPreprocessing and OhePreprocessing do: the code
+    len(vocabulary) for the Label Encoding (LabelEncoder sorts NaN last), an all-zero
+    row for the One-Hot Encoding (get_dummies has no NaN column). Values never seen
+    during fit go to a dedicated "unseen" bucket: the code len(vocabulary) + 1, or the
+    '<column>_unseen' column.
+
+    Attributes:
+        encoding (str): 'le' for Label Encoding, 'ohe' for One-Hot Encoding.
+        scale (bool): Whether the encoded features are standard-scaled.
+        vocabularies (dict): The sorted known values of every encoded column.
+        feature_names (list): The output feature columns, '_time' excluded.
+        scaler (StandardScaler): The fitted scaler, if scale is True.
+
+    Methods:
+        fit(df): Fits the vocabularies and the scaler on a raw-preprocessed DataFrame.
+        transform(df): Encodes and scales a raw-preprocessed DataFrame with the fitted state.
+        fit_transform(df): Fits and transforms the same DataFrame.
+        transform_batches(frames, target_column, batch_rows): Yields float32 (X, y) batches of labeled frames.
+        save(path): Saves the fitted preprocessor.
+        load(path): Loads a saved preprocessor.
+    """
+
+    COLUMNS_TO_ENCODE = {
+        'le': ["signature", "RuleAnnotation.mitre_attack.id", "parent_process_id", "process_id",
+               "severity_id", "EventType", "tag"],
+        'ohe': ["signature", "RuleAnnotation.mitre_attack.id", "severity_id", "EventType", "tag"],
+    }
+
+    def __init__(self, encoding='le', scale=True):
+        """Initializes an unfitted preprocessor.
+
+        Args:
+            encoding (str): 'le' for Label Encoding, 'ohe' for One-Hot Encoding.
+            scale (bool): Whether to standard-scale the encoded features.
+        """
+        if encoding not in FittedPreprocessor.COLUMNS_TO_ENCODE:
+            raise ValueError(f"Unknown encoding {encoding!r}, expected 'le' or 'ohe'")
+        self.encoding = encoding
+        self.scale = scale
+        self.vocabularies = {}
+        self.feature_names = None
+        self.scaler = None
+
+    @staticmethod
+    def _prepare(df):
+        """Applies the same cleaning as OhePreprocessing before encoding."""
+        df = df.copy()
+        if 'tag' in df.columns:
+            df['tag'] = df['tag'].str.replace('\n', '_')
+        return df
+
+    @staticmethod
+    def _vocabulary(values):
+        """Returns the sorted distinct values of a column, as LabelEncoder and get_dummies order them."""
+        unique = pd.unique(values.dropna())
+        try:
+            return np.sort(unique)
+        except TypeError:
+            return np.array(sorted(unique, key=str), dtype=object)
+
+    def _encode(self, df):
+        """Encodes a prepared DataFrame with the fitted vocabularies."""
+        columns = FittedPreprocessor.COLUMNS_TO_ENCODE[self.encoding]
+        if self.encoding == 'le':
+            encoded = df.copy()
+            for column in columns:
+                vocabulary = self.vocabularies[column]
+                codes = pd.Categorical(df[column], categories=vocabulary).codes.astype(np.int64)
+                missing = df[column].isna().to_numpy()
+                codes[codes < 0] = len(vocabulary) + 1  # Unseen bucket
+                codes[missing] = len(vocabulary)
+                encoded[column] = codes
+            return encoded.drop(columns='_time')
+
+        parts = [df.drop(columns=columns + ['_time'])]
+        for column in columns:
+            vocabulary = self.vocabularies[column]
+            codes = pd.Categorical(df[column], categories=vocabulary).codes
+            # Missing values stay all-zero, unseen ones go to the last column
+            rows = np.flatnonzero(df[column].notna().to_numpy())
+            dummies = np.zeros((len(df), len(vocabulary) + 1), dtype=bool)
+            dummies[rows, np.where(codes[rows] < 0, len(vocabulary), codes[rows])] = True
+            names = [f'{column}_{value}' for value in vocabulary] + [f'{column}_unseen']
+            parts.append(pd.DataFrame(dummies, index=df.index, columns=names))
+        return pd.concat(parts, axis=1)
+
+    def fit(self, df):
+        """Fits the vocabularies and the scaler on a raw-preprocessed DataFrame.
+
+        Args:
+            df (pandas.DataFrame): The RawPreprocessing output of the training data.
+
+        Returns:
+            FittedPreprocessor: The fitted preprocessor.
+        """
+        df = FittedPreprocessor._prepare(df)
+        self.vocabularies = {column: FittedPreprocessor._vocabulary(df[column])
+                             for column in FittedPreprocessor.COLUMNS_TO_ENCODE[self.encoding]}
+        features = self._encode(df)
+        self.feature_names = list(features.columns)
+        if self.scale:
+            self.scaler = StandardScaler().fit(features)
+        return self
+
+    def transform(self, df):
+        """Encodes and scales a raw-preprocessed DataFrame with the fitted state.
+
+        Args:
+            df (pandas.DataFrame): The RawPreprocessing output of any batch of events.
+
+        Returns:
+            pandas.DataFrame: The features in feature_names order, with '_time' as last column.
+        """
+        if self.feature_names is None:
+            raise ValueError("The preprocessor must be fitted before transform")
+        features = self._encode(FittedPreprocessor._prepare(df))[self.feature_names]
+        if self.scale:
+            features = pd.DataFrame(self.scaler.transform(features), index=df.index, columns=self.feature_names)
+        features['_time'] = df['_time'].to_numpy()
+        return features
+
+    def fit_transform(self, df):
+        """Fits the preprocessor on a raw-preprocessed DataFrame and transforms it."""
+        return self.fit(df).transform(df)
+
+    def transform_batches(self, frames, target_column='corrisponde_ad_attacco', batch_rows=100_000, drop_time=False):
+        """Yields the features and the target of labeled frames in batches of at most batch_rows rows.
+
+        Only one batch is encoded at a time, so the memory used does not depend on the
+        total size of the data: the frames can be loaded one day at a time from the
+        PreprocessedCache (DatasetCatalog.day) or read in chunks (CsvPreprocessingScaler.read_csv_chunks).
+        '_time' is converted to seconds as in PreprocessingTrainTestSplit.preprocess_data.
+
+        Args:
+            frames (iterable): The labeled RawPreprocessing outputs (DataFrames or chunks).
+            target_column (str): The name of the target column.
+            batch_rows (int): The maximum number of rows of a batch.
+            drop_time (bool): Whether '_time' is removed from the features.
+
+        Yields:
+            tuple: The float32 features (numpy.ndarray, columns in feature_names order with
+            '_time' last) and the target (numpy.ndarray) of a batch.
+        """
+        for frame in frames:
+            for start in range(0, len(frame), batch_rows):
+                batch = frame.iloc[start:start + batch_rows]
+                X = self.transform(batch[CsvPreprocessingScaler.RAW_COLUMNS])
+                if drop_time:
+                    X = X.drop(columns='_time')
+                else:
+                    X = PreprocessingTrainTestSplit.preprocess_data(X)
+                yield X.to_numpy(dtype=np.float32), batch[target_column].to_numpy()
+
+    def save(self, path):
+        """Saves the fitted preprocessor.
+
+        Args:
+            path (str): The destination file.
+        """
+        joblib.dump(self, path)
+
+    @staticmethod
+    def load(path):
+        """Loads a saved preprocessor.
+
+        Args:
+            path (str): The file written by save.
+
+        Returns:
+            FittedPreprocessor: The fitted preprocessor.
+        """
+        return joblib.load(path)
@@ -1,22 +1,28 @@
 from .lib import *
+from .search_result_store import SearchResultStore
 
 class HyperparameterTuning:
     """
-    This class provides methods for tuning hyperparameters of machine learning models using grid search.
+    This class provides methods for tuning hyperparameters of machine learning models using grid search,
+    successive halving or a budgeted Bayesian (TPE) search.
     """
 
-    def tune_hyperparameters(X_train, y_train):
+    # Models that cannot be trained on a scipy sparse matrix
+    DENSE_ONLY = {'Naive Bayes'}
+
+    SEARCHES = ('grid', 'halving', 'tpe')
+
+    def search_spaces(X_train):
         """
-        Performs hyperparameter tuning for various machine learning algorithms using grid search.
+        Returns the models to tune and their parameter grids.
 
         Parameters:
-        - X_train: array-like, shape (n_samples, n_features), training input data
-        - y_train: array-like, shape (n_samples,), training target labels
+        - X_train: array-like or scipy sparse matrix, training input data
 
         Returns:
-        - best_models: dict, best estimator for each algorithm after hyperparameter tuning
+        - algorithms: dict, (model, parameter grid) for each algorithm
         """
-        algorithms = {
+        return {
             'Random Forest': (RandomForestClassifier(), {
                 'n_estimators': [100, 200, 300],
                 'max_depth': [None, 10, 20],
@@ -36,7 +42,8 @@ class HyperparameterTuning:
                 'knn__metric': ['euclidean', 'manhattan', 'minkowski']
             }),
             'Logistic Regression': (Pipeline([
-                ('scaler', StandardScaler()),
+                # Centering would densify a sparse matrix
+                ('scaler', StandardScaler(with_mean=not sp.issparse(X_train))),
                 ('logreg', LogisticRegression(max_iter=1000))
             ]), {
                 'logreg__C': [0.01, 0.1, 1, 10, 100],
@@ -44,12 +51,232 @@ class HyperparameterTuning:
             })
         }
 
+    def tune_hyperparameters(X_train, y_train, search='grid', n_iter=10, resource='n_samples', factor=3, cv=5, store=None, return_report=False):
+        """
+        Performs hyperparameter tuning for various machine learning algorithms.
+
+        Search strategies:
+        - 'grid': exhaustive GridSearchCV, every combination on the full training set.
+        - 'halving': successive halving; every round evaluates the remaining combinations with factor
+          times more resources and keeps the best 1/factor of them. The resource is the number of
+          training samples ('n_samples') or the number of trees ('n_estimators', for the models whose
+          grid contains it; the others use 'n_samples').
+        - 'tpe': Bayesian search with the Tree-structured Parzen Estimator of optuna, at most n_iter
+          combinations per model.
+        All the strategies use the same F1 scorer and the same stratified folds, and refit the best
+        combination on the whole training set. With return_report=True the search time and the estimated
+        time of the full grid of every model are returned too.
+
+        With a store, every fit (combination and fold) is saved as soon as it finishes and the fits
+        already in the store are not repeated: an interrupted search resumes where it stopped, and
+        running the search again on the same data costs only the refit of the best models.
+
+        Parameters:
+        - X_train: array-like or scipy sparse matrix, shape (n_samples, n_features), training input data
+        - y_train: array-like, shape (n_samples,), training target labels
+        - search: str, 'grid', 'halving' or 'tpe'
+        - n_iter: int, number of combinations tried per model by 'tpe'
+        - resource: str, resource increased by 'halving': 'n_samples' or 'n_estimators'
+        - factor: int, reduction factor of 'halving'
+        - cv: int, number of cross-validation folds
+        - store: SearchResultStore or str (path of its file), persistent store of the fits
+        - return_report: bool, if True the search report is returned too
+
+        Returns:
+        - best_models: dict, best estimator for each algorithm after hyperparameter tuning
+        - search_report: DataFrame, search seconds, estimated seconds of the full grid, seconds saved
+          and best F1 of each model (only with return_report=True)
+        """
+        if search not in HyperparameterTuning.SEARCHES:
+            raise ValueError(f"Unknown search {search!r}, expected one of {HyperparameterTuning.SEARCHES}")
+        if resource not in ('n_samples', 'n_estimators'):
+            raise ValueError(f"Unknown resource {resource!r}, expected 'n_samples' or 'n_estimators'")
+
         scorer = make_scorer(f1_score)
+        y_train = np.asarray(y_train)
+        folds = list(StratifiedKFold(n_splits=cv).split(np.zeros(len(y_train)), y_train))
+        if isinstance(store, str):
+            store = SearchResultStore(store)
+        dataset = SearchResultStore.fingerprint(X_train, y_train) if store is not None else None
+
         best_models = {}
-        for name, (model, params) in algorithms.items():
-            grid_search = GridSearchCV(model, params, scoring=scorer, cv=5, n_jobs=-1)
-            grid_search.fit(X_train, y_train)
-            best_models[name] = grid_search.best_estimator_
-            print(f'Best parameters for {name}: {grid_search.best_params_}')
-            print(f'Best F1-score: {grid_search.best_score_}')
-        return best_models
\ No newline at end of file
+        report = []
+        for name, (model, params) in HyperparameterTuning.search_spaces(X_train).items():
+            if sp.issparse(X_train) and name in HyperparameterTuning.DENSE_ONLY:
+                print(f"{name} skipped: it does not support sparse input")
+                continue
+
+            start = time.perf_counter()
+            cache = (store, dataset, name) if store is not None else None
+            if (search == 'grid' or len(ParameterGrid(params)) <= 1) and cache is None:
+                grid_search = GridSearchCV(model, params, scoring=scorer, cv=folds, n_jobs=-1)
+                grid_search.fit(X_train, y_train)
+                best_model, best_params, best_score = \
+                    grid_search.best_estimator_, grid_search.best_params_, grid_search.best_score_
+                cost_ratio = 1.0
+            else:
+                if search == 'grid' or len(ParameterGrid(params)) <= 1:
+                    # Same candidates, folds and choice of the best as GridSearchCV, fit by fit
+                    candidates = list(ParameterGrid(params))
+                    scores, _ = HyperparameterTuning._evaluate(model, candidates, X_train, y_train, folds, scorer, cache)
+                    best = int(np.argmax(np.nan_to_num(scores, nan=-np.inf)))
+                    best_params, best_score, cost_ratio = candidates[best], scores[best], 1.0
+                elif search == 'halving':
+                    best_params, best_score, cost_ratio = HyperparameterTuning._halving_search(
+                        model, params, X_train, y_train, folds, scorer, resource, factor, cache)
+                else:
+                    best_params, best_score, cost_ratio = HyperparameterTuning._tpe_search(
+                        model, params, X_train, y_train, folds, scorer, n_iter, cache)
+                best_model = clone(model).set_params(**best_params).fit(X_train, y_train)
+            seconds = time.perf_counter() - start
+
+            best_models[name] = best_model
+            print(f'Best parameters for {name}: {best_params}')
+            print(f'Best F1-score: {best_score}')
+            report.append([name, search, seconds, seconds / cost_ratio, best_score])
+
+        search_report = pd.DataFrame(
+            report, columns=['model', 'search', 'search_seconds', 'grid_seconds_estimate', 'best_f1'])
+        search_report['seconds_saved'] = search_report['grid_seconds_estimate'] - search_report['search_seconds']
+        print(search_report.to_string(index=False))
+        if return_report:
+            return best_models, search_report
+        return best_models
+
+    @staticmethod
+    def _rows(data, indices):
+        """Selects rows of a DataFrame, array or sparse matrix by position."""
+        return data.iloc[indices] if hasattr(data, 'iloc') else data[indices]
+
+    @staticmethod
+    def _fit_and_score(model, params, X, y, train, test, scorer):
+        """Fits a combination on one fold and returns its F1-score and the seconds spent."""
+        start = time.perf_counter()
+        estimator = clone(model).set_params(**params)
+        estimator.fit(HyperparameterTuning._rows(X, train), y[train])
+        score = scorer(estimator, HyperparameterTuning._rows(X, test), y[test])
+        return score, time.perf_counter() - start
+
+    @staticmethod
+    def _evaluate(model, candidates, X, y, folds, scorer, cache=None):
+        """
+        Cross-validates every combination in parallel over combinations and folds.
+
+        With cache = (store, dataset fingerprint, model name) the fits found in the store are not
+        repeated and every new fit is saved as soon as it finishes.
+
+        Returns:
+        - scores: numpy.ndarray, mean F1-score of each combination
+        - seconds: numpy.ndarray, total fit and score seconds of each combination (stored ones included)
+        """
+        tasks = [(params, fold, train, test) for params in candidates for fold, (train, test) in enumerate(folds)]
+        outputs = [None] * len(tasks)
+        keys = [None] * len(tasks)
+        if cache is not None:
+            store, dataset, _ = cache
+            for i, (params, fold, train, _) in enumerate(tasks):
+                keys[i] = SearchResultStore.key(dataset, model, params, fold, len(folds), len(train))
+                outputs[i] = store.get(keys[i])
+
+        missing = [i for i, output in enumerate(outputs) if output is None]
+        results = Parallel(n_jobs=-1, return_as='generator')(
+            delayed(HyperparameterTuning._fit_and_score)(model, tasks[i][0], X, y, tasks[i][2], tasks[i][3], scorer)
+            for i in missing)
+        for i, output in zip(missing, results):
+            outputs[i] = output
+            if cache is not None:
+                params, fold, train, _ = tasks[i]
+                store.put(keys[i], {'model': cache[2], 'params': params, 'fold': fold,
+                                    'n_train': len(train), 'score': output[0], 'seconds': output[1]})
+
+        outputs = np.array(outputs, dtype=np.float64).reshape(len(candidates), len(folds), 2)
+        return outputs[:, :, 0].mean(axis=1), outputs[:, :, 1].sum(axis=1)
+
+    @staticmethod
+    def _halving_search(model, params, X, y, folds, scorer, resource, factor, cache=None):
+        """
+        Successive halving over the parameter grid.
+
+        Returns:
+        - best_params: dict, best combination (with the number of trees if it is the resource)
+        - best_score: float, its mean F1-score at the last round
+        - cost_ratio: float, fit seconds spent divided by the estimated seconds of the full grid
+        """
+        if resource == 'n_estimators' and 'n_estimators' not in params:
+            resource = 'n_samples'
+        grid_size = len(ParameterGrid(params))
+
+        if resource == 'n_estimators':
+            trees = sorted(params['n_estimators'])
+            params = {key: values for key, values in params.items() if key != 'n_estimators'}
+            min_resource, max_resource = trees[0], trees[-1]
+        else:
+            max_resource = len(y)
+        candidates = list(ParameterGrid(params))
+        rounds = max(1, math.ceil(math.log(len(candidates), factor)))
+        if resource == 'n_samples':
+            min_resource = max(max_resource // factor ** (rounds - 1), 2 * len(folds))
+
+        spent = 0.0
+        for iteration in range(rounds):
+            amount = min(max_resource, min_resource * factor ** iteration)
+            if iteration == rounds - 1:
+                amount = max_resource
+            if resource == 'n_estimators':
+                round_candidates = [{**candidate, 'n_estimators': amount} for candidate in candidates]
+                scores, seconds = HyperparameterTuning._evaluate(model, round_candidates, X, y, folds, scorer, cache)
+            else:
+                round_candidates = candidates
+                scores, seconds = HyperparameterTuning._evaluate(
+                    model, candidates, X, y, HyperparameterTuning._subsample_folds(folds, y, amount), scorer, cache)
+            spent += seconds.sum()
+
+            order = np.argsort(-np.nan_to_num(scores, nan=-np.inf), kind='stable')
+            if iteration == rounds - 1:
+                best = order[0]
+                break
+            candidates = [candidates[i] for i in order[:max(1, math.ceil(len(candidates) / factor))]]
+
+        # Full grid: every combination with the per-combination cost of the last round
+        grid_cost = seconds.mean() * grid_size
+        return round_candidates[best], scores[best], spent / grid_cost
+
+    @staticmethod
+    def _subsample_folds(folds, y, n_samples):
+        """Restricts every fold to a stratified subsample of n_samples training rows."""
+        if n_samples >= len(y):
+            return folds
+        subsampled = []
+        for train, test in folds:
+            size = min(len(train) - 1, max(2, n_samples * len(train) // len(y)))
+            train, _ = train_test_split(train, train_size=size, stratify=y[train], random_state=42)
+            subsampled.append((np.sort(train), test))
+        return subsampled
+
+    @staticmethod
+    def _tpe_search(model, params, X, y, folds, scorer, n_iter, cache=None):
+        """
+        Bayesian search with the TPE sampler of optuna.
+
+        Returns:
+        - best_params: dict, best combination found
+        - best_score: float, its mean F1-score
+        - cost_ratio: float, fit seconds spent divided by the estimated seconds of the full grid
+        """
+        grid_size = len(ParameterGrid(params))
+        tried = {}
+
+        def objective(trial):
+            candidate = {key: trial.suggest_categorical(key, values) for key, values in params.items()}
+            key = tuple(sorted(candidate.items(), key=lambda item: item[0]))
+            if key not in tried:  # TPE can sample the same combination again
+                scores, seconds = HyperparameterTuning._evaluate(model, [candidate], X, y, folds, scorer, cache)
+                tried[key] = (np.nan_to_num(scores[0]), seconds[0])
+            return tried[key][0]
+
+        optuna.logging.set_verbosity(optuna.logging.WARNING)
+        study = optuna.create_study(direction='maximize', sampler=optuna.samplers.TPESampler(seed=42))
+        study.optimize(objective, n_trials=min(n_iter, grid_size))
+
+        seconds = np.array([cost for _, cost in tried.values()])
+        return study.best_params, study.best_value, seconds.sum() / (seconds.mean() * grid_size)
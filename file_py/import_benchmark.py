@@ -0,0 +1,106 @@
+from .lib import *
+
+_PROBE = """
+import importlib, json, sys, time
+start = time.perf_counter()
+importlib.import_module(sys.argv[1])
+seconds = time.perf_counter() - start
+try:
+    import resource
+    rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+except ImportError:
+    rss_mb = float('nan')
+backends = sorted(name for name in json.loads(sys.argv[2]) if name in sys.modules)
+print(json.dumps({'seconds': seconds, 'rss_mb': rss_mb, 'backends': backends}))
+"""
+
+class ImportBenchmark:
+    """Measures how long it takes, and how much memory, to import each module of file_py.
+
+    Every import runs in a new interpreter, once with the lazy backends of lib and once
+    with FILE_PY_EAGER_IMPORTS=1 (every backend imported up front, as lib used to do),
+    so the two columns show what a short batch job or a worker process saves.
+
+    Methods:
+        modules(): Returns the modules of the package.
+        measure(module, eager=False, repeat=3): Measures the import of one module.
+        run(modules=None, repeat=3): Measures the import of every module, lazy and eager.
+    """
+
+    BACKENDS = ('sklearn', 'scipy', 'xgboost', 'catboost', 'tensorflow', 'keras', 'optuna',
+                'matplotlib', 'plotly', 'altair', 'seaborn', 'pyarrow')
+
+    @staticmethod
+    def modules():
+        """Returns the modules of the package (file_py.*), in alphabetical order."""
+        directory = os.path.dirname(os.path.abspath(__file__))
+        return [f'file_py.{name[:-len(".py")]}' for name in sorted(os.listdir(directory))
+                if name.endswith('.py') and name != 'import_benchmark.py']
+
+    @staticmethod
+    def measure(module, eager=False, repeat=3):
+        """Imports a module in a new interpreter and measures the import.
+
+        Args:
+            module (str): The module, e.g. 'file_py.run_log_parser'.
+            eager (bool): If True, lib imports every backend up front.
+            repeat (int): The number of interpreters; the fastest import is kept.
+
+        Returns:
+            dict: The seconds and the peak memory in MB of the fastest import, the backends
+            loaded by it, and the error if the import failed.
+        """
+        environment = {key: value for key, value in os.environ.items() if key != 'FILE_PY_EAGER_IMPORTS'}
+        if eager:
+            environment['FILE_PY_EAGER_IMPORTS'] = '1'
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+        best = None
+        for _ in range(repeat):
+            result = subprocess.run([sys.executable, '-c', _PROBE, module, json.dumps(ImportBenchmark.BACKENDS)],
+                                    cwd=root, env=environment, capture_output=True, text=True)
+            if result.returncode != 0:
+                lines = result.stderr.strip().splitlines()
+                return {'seconds': float('nan'), 'rss_mb': float('nan'), 'backends': [],
+                        'error': lines[-1] if lines else f'exit code {result.returncode}'}
+            measurement = json.loads(result.stdout.strip().splitlines()[-1])
+            if best is None or measurement['seconds'] < best['seconds']:
+                best = measurement
+        return {**best, 'error': None}
+
+    @staticmethod
+    def run(modules=None, repeat=3):
+        """Measures the import of every module, with lazy and with eager backends.
+
+        Args:
+            modules (list): The modules to measure, by default all the modules of the package.
+            repeat (int): The number of interpreters per module and mode.
+
+        Returns:
+            pandas.DataFrame: One row per module with the seconds, the peak memory in MB and the
+            backends of the lazy import, the seconds and memory of the eager import and the speedup.
+        """
+        rows = []
+        for module in modules or ImportBenchmark.modules():
+            lazy = ImportBenchmark.measure(module, repeat=repeat)
+            eager = ImportBenchmark.measure(module, eager=True, repeat=repeat)
+            rows.append({
+                'module': module,
+                'lazy_s': lazy['seconds'],
+                'eager_s': eager['seconds'],
+                'speedup': eager['seconds'] / lazy['seconds'],
+                'lazy_mb': lazy['rss_mb'],
+                'eager_mb': eager['rss_mb'],
+                'lazy_backends': ', '.join(lazy['backends']),
+                'error': lazy['error'] or eager['error'],
+            })
+        return pd.DataFrame(rows)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Measures the import time of the modules of file_py.')
+    parser.add_argument('modules', nargs='*', help='Modules to measure, e.g. file_py.run_log_parser (default: all)')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    with pd.option_context('display.width', 200, 'display.max_columns', None, 'display.max_colwidth', 60):
+        print(ImportBenchmark.run(args.modules, repeat=args.repeat).round(3).to_string(index=False))
@@ -1,24 +1,34 @@
 from .lib import *
 
+# Training matrices, memory-mapped once per worker process
+_worker_data = None
+
+def _init_worker(path):
+    global _worker_data
+    # Copy-on-write: the pages are still shared, but the arrays are writable, as some
+    # models (e.g. CatBoost on a scipy sparse matrix) refuse read-only buffers
+    _worker_data = joblib.load(path, mmap_mode='c')
+
+def _fit_model(name, model, threads):
+    X_train, y_train, X_test, y_test = _worker_data
+    return InitialTraining._fit_and_evaluate(name, model, threads, X_train, y_train, X_test, y_test)
+
 class InitialTraining:
     """
     This class provides methods for training and evaluating initial machine learning models.
     """
 
-    def train_and_evaluate_initial_models(X_train, y_train, X_test, y_test):
-        """
-        Trains and evaluates a set of initial machine learning models on the provided training and testing data.
+    # Models that cannot be trained on a scipy sparse matrix
+    DENSE_ONLY = {'Quadratic Discriminant Analysis'}
 
-        Parameters:
-        - X_train: array-like, shape (n_samples, n_features), training input data
-        - y_train: array-like, shape (n_samples,), training target labels
-        - X_test: array-like, shape (n_samples, n_features), testing input data
-        - y_test: array-like, shape (n_samples,), testing target labels
+    # Models that use their own threads, with the parameter that sets how many
+    THREADED = {'XGBoost': 'n_jobs', 'CatBoost': 'thread_count', 'Extra Trees': 'n_jobs'}
 
-        Returns:
-        - results: dict, classification reports for each model
+    def initial_models():
+        """
+        Returns the untrained initial models, by name.
         """
-        algorithms = {
+        return {
             'Decision Tree': DecisionTreeClassifier(),
             'AdaBoost': AdaBoostClassifier(),
             'XGBoost': XGBClassifier(use_label_encoder=False, eval_metric='logloss'),
@@ -28,11 +38,123 @@ class InitialTraining:
             'Extra Trees': ExtraTreesClassifier()
         }
 
+    def train_and_evaluate_initial_models(X_train, y_train, X_test, y_test, n_jobs=1, cpu_budget=None, return_timings=False):
+        """
+        Trains and evaluates a set of initial machine learning models on the provided training and testing data.
+
+        With n_jobs > 1 the models are trained at the same time in a process pool. The matrices are
+        written once to disk and memory-mapped by every worker instead of being copied for each model,
+        and every model gets a share of cpu_budget: the threaded models (XGBoost, CatBoost, Extra Trees)
+        use cpu_budget // n_jobs threads, the others one, and a model is started only when its CPUs are
+        free, so the threads never exceed the budget.
+
+        Parameters:
+        - X_train: array-like or scipy sparse matrix, shape (n_samples, n_features), training input data
+        - y_train: array-like, shape (n_samples,), training target labels
+        - X_test: array-like, shape (n_samples, n_features), testing input data
+        - y_test: array-like, shape (n_samples,), testing target labels
+        - n_jobs: int, number of models trained at the same time
+        - cpu_budget: int, number of CPUs shared by the models (default: all the CPUs)
+        - return_timings: bool, if True the timings are returned too
+
+        Returns:
+        - results: dict, classification reports for each model
+        - timings: DataFrame, the threads and the wall, fit and predict seconds of each model
+          (only with return_timings=True)
+        """
+        algorithms = InitialTraining.initial_models()
+        for name in list(algorithms):
+            if sp.issparse(X_train) and name in InitialTraining.DENSE_ONLY:
+                print(f"\n{name} skipped: it does not support sparse input")
+                del algorithms[name]
+
+        start = time.perf_counter()
+        if n_jobs > 1:
+            outputs = InitialTraining._train_parallel(algorithms, X_train, y_train, X_test, y_test,
+                                                      n_jobs, cpu_budget or os.cpu_count())
+        else:
+            outputs = {}
+            for name, model in algorithms.items():
+                model_start = time.perf_counter()
+                outputs[name] = InitialTraining._fit_and_evaluate(name, model, None, X_train, y_train, X_test, y_test)
+                outputs[name]['wall'] = time.perf_counter() - model_start
+        total = time.perf_counter() - start
+
         results = {}
-        for name, model in algorithms.items():
+        for name in algorithms:
+            results[name] = outputs[name]['report']
+            print(f"\n{name} Classification Report:")
+            print(outputs[name]['text'])
+
+        timings = pd.DataFrame(
+            [[name, outputs[name]['threads'], outputs[name]['wall'], outputs[name]['fit'], outputs[name]['predict']]
+             for name in algorithms],
+            columns=['model', 'threads', 'wall_seconds', 'fit_seconds', 'predict_seconds'])
+        print(timings.to_string(index=False))
+        print(f"Total: {total:.2f}s (sum of the model times: {timings['wall_seconds'].sum():.2f}s)")
+        if return_timings:
+            return results, timings
+        return results
+
+    @staticmethod
+    def _fit_and_evaluate(name, model, threads, X_train, y_train, X_test, y_test):
+        """
+        Fits and evaluates one model, limiting its threads (and those of BLAS) if threads is given.
+        """
+        limit = contextlib.nullcontext()
+        if threads is not None:
+            if name in InitialTraining.THREADED:
+                model.set_params(**{InitialTraining.THREADED[name]: threads})
+            limit = threadpool_limits(limits=threads)
+
+        with limit:
+            fit_start = time.perf_counter()
             model.fit(X_train, y_train)
+            predict_start = time.perf_counter()
             y_pred = model.predict(X_test)
-            results[name] = classification_report(y_test, y_pred, output_dict=True)
-            print(f"\n{name} Classification Report:")
-            print(classification_report(y_test, y_pred))
-        return results
\ No newline at end of file
+            predict_end = time.perf_counter()
+
+        return {
+            'report': classification_report(y_test, y_pred, output_dict=True),
+            'text': classification_report(y_test, y_pred),
+            'threads': threads,
+            'fit': predict_start - fit_start,
+            'predict': predict_end - predict_start,
+        }
+
+    @staticmethod
+    def _train_parallel(algorithms, X_train, y_train, X_test, y_test, n_jobs, cpu_budget):
+        """
+        Trains the models in a process pool without exceeding cpu_budget threads.
+        """
+        threaded = max(1, cpu_budget // n_jobs)
+        cpus = {name: min(threaded if name in InitialTraining.THREADED else 1, cpu_budget) for name in algorithms}
+        # The models with more threads start first, the others fill the free CPUs
+        waiting = sorted(algorithms, key=lambda name: -cpus[name])
+
+        directory = tempfile.mkdtemp(prefix='initial_training_')
+        try:
+            path = os.path.join(directory, 'data.joblib')
+            joblib.dump((X_train, np.asarray(y_train), X_test, np.asarray(y_test)), path)
+
+            outputs, running, free = {}, {}, cpu_budget
+            with ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_worker, initargs=(path,)) as executor:
+                while waiting or running:
+                    while len(running) < n_jobs:
+                        fitting = [name for name in waiting if cpus[name] <= free or not running]
+                        if not fitting:
+                            break
+                        name = fitting[0]
+                        waiting.remove(name)
+                        future = executor.submit(_fit_model, name, algorithms[name], cpus[name])
+                        running[future] = (name, time.perf_counter())
+                        free -= cpus[name]
+                    done, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        name, submitted = running.pop(future)
+                        outputs[name] = future.result()
+                        outputs[name]['wall'] = time.perf_counter() - submitted
+                        free += cpus[name]
+            return outputs
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
@@ -1,27 +1,133 @@
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import matplotlib.colors as mcolors
-import plotly.express as px
-import plotly.graph_objects as go
-import altair as alt
-import seaborn as sns
 import math
 import csv
-import xgboost as xgb
-from sklearn.model_selection import train_test_split, GridSearchCV
-from sklearn.metrics import classification_report, make_scorer, f1_score, accuracy_score, roc_auc_score
-from sklearn.tree import DecisionTreeClassifier
-from sklearn.ensemble import AdaBoostClassifier, ExtraTreesClassifier, RandomForestClassifier, GradientBoostingClassifier
-from xgboost import XGBClassifier
-from catboost import CatBoostClassifier
-from sklearn.neural_network import MLPClassifier
-from sklearn.discriminant_analysis import QuadraticDiscriminantAnalysis
-from sklearn.naive_bayes import GaussianNB
-from sklearn.pipeline import Pipeline
-from sklearn.preprocessing import StandardScaler, LabelEncoder
-from sklearn.neighbors import KNeighborsClassifier
-from sklearn.linear_model import LogisticRegression
-from keras.models import Sequential # type: ignore
-from keras.layers import Dense  # type: ignore
-from collections import defaultdict
\ No newline at end of file
+import time
+import os
+import json
+import hashlib
+import io
+import importlib
+import joblib
+from joblib import Parallel, delayed
+import sys
+import argparse
+import queue
+import threading
+import collections
+import urllib.request
+import tempfile
+import shutil
+import contextlib
+import subprocess
+import warnings
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, Future, wait, FIRST_COMPLETED
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threadpoolctl import threadpool_limits
+
+
+class _LazyImport:
+    """A module, or a name of a module, imported the first time it is used.
+
+    The plotting and machine learning backends below take seconds and hundreds of MB
+    to import, so every module of the package gets them from here as lazy names and
+    pays for a backend only when it actually uses it. Attribute access, calls,
+    subclassing, isinstance checks and pickling go to the real object.
+    Set FILE_PY_EAGER_IMPORTS=1 to import everything when lib is imported.
+    """
+
+    def __init__(self, module, name=None):
+        self.__dict__.update(_module=module, _name=name, _target=None)
+
+    def _resolve(self):
+        target = self.__dict__['_target']
+        if target is None:
+            target = importlib.import_module(self._module)
+            if self._name is not None:
+                target = getattr(target, self._name)
+            self.__dict__['_target'] = target
+        return target
+
+    def __getattr__(self, attribute):
+        return getattr(self._resolve(), attribute)
+
+    def __setattr__(self, attribute, value):
+        setattr(self._resolve(), attribute, value)
+
+    def __dir__(self):
+        return dir(self._resolve())
+
+    def __call__(self, *args, **kwargs):
+        return self._resolve()(*args, **kwargs)
+
+    def __instancecheck__(self, instance):
+        return isinstance(instance, self._resolve())
+
+    def __subclasscheck__(self, subclass):
+        return issubclass(subclass, self._resolve())
+
+    def __mro_entries__(self, bases):
+        return (self._resolve(),)
+
+    def __reduce__(self):
+        return _resolve_lazy, (self._module, self._name)
+
+    def __repr__(self):
+        if self.__dict__['_target'] is not None:
+            return repr(self.__dict__['_target'])
+        return f"<lazy {self._module}{'.' + self._name if self._name else ''}>"
+
+
+def _resolve_lazy(module, name=None):
+    return _LazyImport(module, name)._resolve()
+
+
+plt = _LazyImport('matplotlib.pyplot')
+mcolors = _LazyImport('matplotlib.colors')
+px = _LazyImport('plotly.express')
+go = _LazyImport('plotly.graph_objects')
+alt = _LazyImport('altair')
+sns = _LazyImport('seaborn')
+sp = _LazyImport('scipy.sparse')
+feather = _LazyImport('pyarrow.feather')
+xgb = _LazyImport('xgboost')
+optuna = _LazyImport('optuna')
+tf = _LazyImport('tensorflow')
+train_test_split = _LazyImport('sklearn.model_selection', 'train_test_split')
+GridSearchCV = _LazyImport('sklearn.model_selection', 'GridSearchCV')
+StratifiedKFold = _LazyImport('sklearn.model_selection', 'StratifiedKFold')
+ParameterGrid = _LazyImport('sklearn.model_selection', 'ParameterGrid')
+GroupShuffleSplit = _LazyImport('sklearn.model_selection', 'GroupShuffleSplit')
+clone = _LazyImport('sklearn.base', 'clone')
+classification_report = _LazyImport('sklearn.metrics', 'classification_report')
+make_scorer = _LazyImport('sklearn.metrics', 'make_scorer')
+f1_score = _LazyImport('sklearn.metrics', 'f1_score')
+accuracy_score = _LazyImport('sklearn.metrics', 'accuracy_score')
+roc_auc_score = _LazyImport('sklearn.metrics', 'roc_auc_score')
+precision_score = _LazyImport('sklearn.metrics', 'precision_score')
+recall_score = _LazyImport('sklearn.metrics', 'recall_score')
+DecisionTreeClassifier = _LazyImport('sklearn.tree', 'DecisionTreeClassifier')
+AdaBoostClassifier = _LazyImport('sklearn.ensemble', 'AdaBoostClassifier')
+ExtraTreesClassifier = _LazyImport('sklearn.ensemble', 'ExtraTreesClassifier')
+RandomForestClassifier = _LazyImport('sklearn.ensemble', 'RandomForestClassifier')
+GradientBoostingClassifier = _LazyImport('sklearn.ensemble', 'GradientBoostingClassifier')
+XGBClassifier = _LazyImport('xgboost', 'XGBClassifier')
+CatBoostClassifier = _LazyImport('catboost', 'CatBoostClassifier')
+MLPClassifier = _LazyImport('sklearn.neural_network', 'MLPClassifier')
+QuadraticDiscriminantAnalysis = _LazyImport('sklearn.discriminant_analysis', 'QuadraticDiscriminantAnalysis')
+GaussianNB = _LazyImport('sklearn.naive_bayes', 'GaussianNB')
+Pipeline = _LazyImport('sklearn.pipeline', 'Pipeline')
+StandardScaler = _LazyImport('sklearn.preprocessing', 'StandardScaler')
+LabelEncoder = _LazyImport('sklearn.preprocessing', 'LabelEncoder')
+KNeighborsClassifier = _LazyImport('sklearn.neighbors', 'KNeighborsClassifier')
+LogisticRegression = _LazyImport('sklearn.linear_model', 'LogisticRegression')
+Sequential = _LazyImport('keras.models', 'Sequential')
+load_model = _LazyImport('keras.models', 'load_model')
+Dense = _LazyImport('keras.layers', 'Dense')
+EarlyStopping = _LazyImport('keras.callbacks', 'EarlyStopping')
+
+if os.environ.get('FILE_PY_EAGER_IMPORTS'):
+    for _value in list(globals().values()):
+        if type(_value) is _LazyImport:
+            _value._resolve()
@@ -59,4 +59,5 @@ class ModelEvaluator:
 
         # Print the best model and its score
         if best_model:
-            print(f'\nDopo la codifica con {codifica} il modello migliore è stato {best_model} con lo score di {best_f1_score:.4f}')
\ No newline at end of file
+            print(f'\nDopo la codifica con {codifica} il modello migliore è stato {best_model} con lo score di {best_f1_score:.4f}')
+        return best_model, best_f1_score
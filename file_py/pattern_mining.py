@@ -0,0 +1,106 @@
+from .lib import *
+from .plots_single_attack import PlotsSingleAttack
+
+# Frame of the events in chronological order, set once per worker process
+_worker_frame = None
+
+def _init_worker(frame):
+    global _worker_frame
+    _worker_frame = frame
+
+def _count_shard(positions, trigger_rules, count_columns, attack_col):
+    return PatternMining._count(_worker_frame, positions, trigger_rules, count_columns, attack_col)
+
+class PatternMining:
+    """
+    Estrae in un'unica passata i pattern degli eventi che precedono l'attivazione di tutte le regole.
+
+    Invece di chiamare PlotsSingleAttack.patterns_before_activation una regola alla volta (riordinando
+    e riscansionando ogni volta il DataFrame), il DataFrame viene ordinato una sola volta, i "primi avvii
+    della serie" di tutte le regole vengono individuati con un solo confronto vettoriale e gli eventi
+    precedenti vengono contati per regola in un'unica tabella in formato tidy.
+
+    Metodi:
+        preceding_event_counts(df, elements_to_consider, n_jobs=1):
+            Conta gli eventi precedenti ai primi avvii di ogni regola, per ogni colonna di interesse.
+    """
+
+    def preceding_event_counts(df, elements_to_consider, n_jobs=1, rule_col='signature', mitre_attack_col='RuleAnnotation.mitre_attack.id', time_col='_time', eventtype_col='EventType', parent_col='parent_process_id', process_col='process_id', severity_col='severity_id', tag_col='tag', attack_col='corrisponde_ad_attacco'):
+        """
+        Conta, per ogni regola, gli eventi che precedono i suoi primi avvii della serie durante un attacco.
+
+        Per ogni regola i conteggi coincidono con quelli che patterns_before_activation calcola sugli
+        eventi restituiti da PlotsSingleAttack.preceding_events.
+
+        Args:
+        df: DataFrame etichettato con la colonna degli attacchi.
+        elements_to_consider: Numero di eventi precedenti da considerare.
+        n_jobs: Numero di processi; con n_jobs > 1 le regole vengono divise in gruppi elaborati in parallelo.
+        Gli altri argomenti sono i nomi delle colonne, come in patterns_before_activation.
+
+        Returns:
+        DataFrame: Una riga per (regola, colonna, valore, attacco) con le colonne
+        'rule', 'column', 'value' (il valore come stringa), attack_col e 'count'.
+        """
+        series_columns = [rule_col, mitre_attack_col, parent_col, process_col, eventtype_col, tag_col, severity_col]
+
+        # Un solo ordinamento e un solo confronto per tutte le regole
+        df = df.sort_values(by=time_col)
+        triggers = np.flatnonzero((df[attack_col] == True).to_numpy(dtype=bool) &
+                                  PlotsSingleAttack.first_of_series(df, series_columns))
+        trigger_rules = df[rule_col].to_numpy()[triggers]
+
+        frame = df[series_columns + [attack_col]].reset_index(drop=True)
+        args = (series_columns, attack_col)
+
+        if n_jobs > 1 and len(triggers):
+            shards = PatternMining._shards(trigger_rules, n_jobs)
+            with ProcessPoolExecutor(max_workers=len(shards), initializer=_init_worker, initargs=(frame,)) as executor:
+                futures = [executor.submit(_count_shard,
+                                           PatternMining._window_positions(triggers[shard], elements_to_consider),
+                                           np.repeat(trigger_rules[shard], elements_to_consider), *args)
+                           for shard in shards]
+                parts = [future.result() for future in futures]
+            counts = pd.concat(parts, ignore_index=True)
+        else:
+            counts = PatternMining._count(frame, PatternMining._window_positions(triggers, elements_to_consider),
+                                          np.repeat(trigger_rules, elements_to_consider), *args)
+
+        return counts.sort_values(['rule', 'column', 'count'], ascending=[True, True, False], ignore_index=True)
+
+    @staticmethod
+    def _window_positions(triggers, elements_to_consider):
+        """Posizioni dei elements_to_consider eventi precedenti ogni trigger (-1 se prima dell'inizio)."""
+        positions = triggers[:, None] + np.arange(-elements_to_consider, 0)[None, :]
+        return positions.ravel()
+
+    @staticmethod
+    def _shards(trigger_rules, n_shards):
+        """Divide gli indici dei trigger in gruppi di regole con un numero simile di trigger."""
+        rules, inverse, sizes = np.unique(trigger_rules.astype(str), return_inverse=True, return_counts=True)
+        loads = np.zeros(n_shards, dtype=np.int64)
+        shard_of_rule = np.empty(len(rules), dtype=np.intp)
+        for rule in np.argsort(-sizes, kind='stable'):
+            shard_of_rule[rule] = np.argmin(loads)
+            loads[shard_of_rule[rule]] += sizes[rule]
+        shard_of_trigger = shard_of_rule[inverse]
+        return [np.flatnonzero(shard_of_trigger == shard) for shard in range(n_shards) if loads[shard]]
+
+    @staticmethod
+    def _count(frame, positions, trigger_rules, count_columns, attack_col):
+        """Conta i valori di ogni colonna negli eventi precedenti, raggruppati per regola del trigger."""
+        valid = positions >= 0
+        positions, trigger_rules = positions[valid], trigger_rules[valid]
+        window = frame.iloc[positions]
+        attack = window[attack_col].to_numpy()
+
+        parts = []
+        for column in count_columns:
+            counts = pd.DataFrame({'rule': trigger_rules, 'value': window[column].to_numpy(), attack_col: attack}) \
+                .groupby(['rule', 'value', attack_col], observed=True).size().reset_index(name='count')
+            counts.insert(1, 'column', column)
+            # I valori di colonne diverse hanno tipi diversi (ID numerici, EventType e tag testuali):
+            # come stringhe la colonna 'value' ha un solo tipo e la tabella si può salvare anche in parquet
+            counts['value'] = counts['value'].astype(str)
+            parts.append(counts)
+        return pd.concat(parts, ignore_index=True)
@@ -1,4 +1,5 @@
 from .lib import *
+from .rule_scorecard import RuleScorecard
 
 class Plots:
     """
@@ -22,28 +23,42 @@ class Plots:
 
         plot_precision_recall(df):
             Plots precision and recall for every rule
+
+    The per-rule charts accept the table of RuleScorecard.build, so that it is computed only once.
+    Every chart is split into <chart>_data(df), which computes the aggregate table, and
+    draw_<chart>(data), which draws it and returns the figure without showing it, so that
+    FigureRenderer can draw the tables to files in the background.
     """
 
-    def plot_cake_attack(df):
+    def cake_attack_data(df):
         """
-        Method to generate and display the pie chart of the percentage of events that correspond to attacks.
+        Computes the percentage of events that correspond to attacks.
 
         Args:
             df (DataFrame): The DataFrame containing the event data.
 
         Returns:
-            None
+            Series: The percentage of 'Attacks' and 'Non-Attacks'.
         """
         is_attack = df['corrisponde_ad_attacco'] == 1  # Filter attacks
         attack_percentage = is_attack.mean() * 100
-        plt.figure(figsize=(6, 6))
-        plt.pie([attack_percentage, 100 - attack_percentage], labels=['Attacks', 'Non-Attacks'], autopct='%1.1f%%', startangle=140)
+        return pd.Series({'Attacks': attack_percentage, 'Non-Attacks': 100 - attack_percentage})
+
+    def draw_cake_attack(data):
+        """
+        Draws the pie chart of the percentages returned by cake_attack_data.
+
+        Returns:
+            Figure: The matplotlib figure.
+        """
+        fig = plt.figure(figsize=(6, 6))
+        plt.pie(data.values, labels=data.index, autopct='%1.1f%%', startangle=140)
         plt.title('Percentage of Events that Correspond to Attacks')
-        plt.show()
+        return fig
 
-    def plot_distributions(df):
+    def plot_cake_attack(df):
         """
-        Method to generate and display subplots of distributions for attack and non-attack events.
+        Method to generate and display the pie chart of the percentage of events that correspond to attacks.
 
         Args:
             df (DataFrame): The DataFrame containing the event data.
@@ -51,10 +66,22 @@ class Plots:
         Returns:
             None
         """
+        Plots.draw_cake_attack(Plots.cake_attack_data(df))
+        plt.show()
+
+    def distributions_data(df):
+        """
+        Computes the distributions of severity_id, tag and EventType for attack and non-attack events.
+
+        Args:
+            df (DataFrame): The DataFrame containing the event data.
+
+        Returns:
+            dict: For every column, a DataFrame with the 'Attacks' and 'Non-Attacks' counts of every value.
+        """
         is_attack = df['corrisponde_ad_attacco'] == 1
-        fig, axes = plt.subplots(3, 2, figsize=(12, 9))  # 3 rows, 2 columns
-        ylim=[]
-        for i, column in enumerate(['severity_id', 'tag', 'EventType']):
+        data = {}
+        for column in ['severity_id', 'tag', 'EventType']:
 
             # Attack distribution
             attack_values = df[is_attack][column].value_counts(sort=False)
@@ -63,8 +90,22 @@ class Plots:
             non_attack_values = df[~is_attack][column].value_counts(sort=False)
             # Combine unique values and reindex
             all_values = attack_values.index.union(non_attack_values.index)
-            attack_values = attack_values.reindex(all_values, fill_value=0)
-            non_attack_values = non_attack_values.reindex(all_values, fill_value=0)
+            data[column] = pd.DataFrame({'Attacks': attack_values.reindex(all_values, fill_value=0),
+                                         'Non-Attacks': non_attack_values.reindex(all_values, fill_value=0)})
+        return data
+
+    def draw_distributions(data):
+        """
+        Draws the distributions returned by distributions_data.
+
+        Returns:
+            Figure: The matplotlib figure.
+        """
+        fig, axes = plt.subplots(3, 2, figsize=(12, 9))  # 3 rows, 2 columns
+        ylim=[]
+        for i, (column, counts) in enumerate(data.items()):
+            attack_values = counts['Attacks']
+            non_attack_values = counts['Non-Attacks']
 
             attack_values.plot(kind='bar', ax=axes[i, 0], color='red')
             axes[i, 0].set_title(f'Distribution of {column} (Attacks)')
@@ -97,27 +138,65 @@ class Plots:
             axes[i,1].set_ylim(0,ylim[i])
                     
         plt.tight_layout()
+        return fig
+
+    def plot_distributions(df):
+        """
+        Method to generate and display subplots of distributions for attack and non-attack events.
+
+        Args:
+            df (DataFrame): The DataFrame containing the event data.
+
+        Returns:
+            None
+        """
+        Plots.draw_distributions(Plots.distributions_data(df))
         plt.show()
 
-    def plot_top_10_signatures(df):
+    def top_10_signatures_data(df, scorecard=None):
+        """
+        Computes the top 10 signatures in overall frequency, for attacks and for non-attacks.
+
+        Args:
+            df (DataFrame): The DataFrame containing the event data.
+            scorecard (DataFrame): The table returned by RuleScorecard.build; built from df if None.
+
+        Returns:
+            dict: The 'overall', 'attack' and 'non_attack' tables of RuleScorecard.top.
+        """
+        if scorecard is None:
+            scorecard = RuleScorecard.build(df)
+
+        # Calculate top 10 signatures overall, for attacks, and for non-attacks
+        return {
+            'overall': RuleScorecard.top(scorecard, 'total'),
+            'attack': RuleScorecard.top(scorecard, 'true_positives'),
+            'non_attack': RuleScorecard.top(scorecard, 'false_positives'),
+        }
+
+    def plot_top_10_signatures(df, scorecard=None):
         """
         Method to generate and display interactive bar charts of the top 10 signatures in overall frequency and for attacks.
 
         Args:
             df (DataFrame): The DataFrame containing the event data.
+            scorecard (DataFrame): The table returned by RuleScorecard.build; built from df if None.
 
         Returns:
             alt.vconcat: The concatenated Altair charts.
         """
-        # Calculate top 10 signatures overall, for attacks, and for non-attacks
-        top_10_signatures_overall = df['signature'].value_counts().head(10).reset_index()
-        top_10_signatures_attack = df[df['corrisponde_ad_attacco'] == 1]['signature'].value_counts().head(10).reset_index()
-        top_10_signatures_non_attack = df[df['corrisponde_ad_attacco'] == 0]['signature'].value_counts().head(10).reset_index()
+        return Plots.draw_top_10_signatures(Plots.top_10_signatures_data(df, scorecard))
 
-        # Rename columns for clarity
-        top_10_signatures_overall.columns = ['Signature', 'Frequency']
-        top_10_signatures_attack.columns = ['Signature', 'Frequency']
-        top_10_signatures_non_attack.columns = ['Signature', 'Frequency']
+    def draw_top_10_signatures(data):
+        """
+        Draws the tables returned by top_10_signatures_data as interactive bar charts.
+
+        Returns:
+            alt.vconcat: The concatenated Altair charts.
+        """
+        top_10_signatures_overall = data['overall']
+        top_10_signatures_attack = data['attack']
+        top_10_signatures_non_attack = data['non_attack']
 
         # Create the base selection for hovering
         selection = alt.selection_single(fields=['Signature'], on='mouseover', clear='mouseout')
@@ -187,54 +266,73 @@ class Plots:
 
         return final_chart
 
-    def plot_value_counts_per_unique(df):
+    def value_counts_per_unique_data(df, unique_col='signature', count_col='corrisponde_ad_attacco'):
         """
-        Plot the count of values for each unique value in a specified column of the DataFrame.
+        Counts the values of count_col for each unique value of unique_col.
 
         Parameters:
         - df: DataFrame: The DataFrame containing the data to be plotted.
+
+        Returns:
+        - DataFrame: One row per unique value of unique_col (in order of appearance), with the counts of 0 and 1.
+        """
+        # Contiamo con un'unica crosstab i valori di count_col (0 e 1) per ogni valore di unique_col,
+        # assicurandoci che entrambi siano presenti (con gli array, perché l'indice di df può avere duplicati)
+        counts = pd.crosstab(df[unique_col].to_numpy(), df[count_col].to_numpy()).reindex(columns=[0, 1], fill_value=0)
+
+        # Una riga per ogni valore unico, nell'ordine in cui compare
+        counts = counts.reindex(df[unique_col].unique(), fill_value=0)
+        return counts.rename_axis(index=None, columns=None)
+
+    def value_counts_pages(data, max_per_page=50):
         """
+        Splits the table returned by value_counts_per_unique_data into pages of at most max_per_page rows,
+        so that every page is drawn as a separate grid of subplots.
 
-        unique_col = 'signature'
-        count_col = 'corrisponde_ad_attacco'
+        Parameters:
+        - data: DataFrame: The table returned by value_counts_per_unique_data.
+        - max_per_page: int: The maximum number of subplots of a page.
+
+        Returns:
+        - list: The pages, as DataFrames.
+        """
+        if max_per_page < 1:
+            raise ValueError(f"max_per_page must be at least 1, got {max_per_page}")
+        return [data.iloc[start:start + max_per_page] for start in range(0, len(data), max_per_page)]
+
+    def draw_value_counts_per_unique(data, figsize_multiplier=(6, 4), annotate=True):
+        """
+        Draws one bar chart for each row of the table returned by value_counts_per_unique_data
+        (or of one of its pages, see value_counts_pages).
+
+        Parameters:
+        - data: DataFrame: The table returned by value_counts_per_unique_data.
+        - figsize_multiplier: tuple: The size of every subplot (width, height).
+        - annotate: bool: If True the counts are written above the bars.
+
+        Returns:
+        - Figure: The matplotlib figure.
+        """
         cols = 5  # Numero di colonne desiderato nella griglia dei subplot
         color = ['#5cabbf', '#a15cbf']  # Colori per le barre
         xlabel = ''  # Etichetta per l'asse x
         ylabel = 'N. record'  # Etichetta per l'asse y
         xtick_labels = ['Non attacco', 'Attacco']  # Etichette per i tick dell'asse x
-        figsize_multiplier = (6, 4)  # Multiplicatore per la dimensione della figura (larghezza, altezza)
-
-        # Troviamo i valori unici della colonna unique_col
-        unique_values = df[unique_col].unique()
 
         # Impostiamo il numero di subplot (una per ciascun valore unico di unique_col)
-        num_plots = len(unique_values)
+        num_plots = len(data)
 
         # Determiniamo il numero di righe e colonne per la griglia
-        rows = math.ceil(num_plots / cols)  # Calcola il numero di righe necessario
+        rows = max(1, math.ceil(num_plots / cols))  # Calcola il numero di righe necessario
 
         # Creiamo i subplot
-        fig, axes = plt.subplots(rows, cols, figsize=(figsize_multiplier[0] * cols, figsize_multiplier[1] * rows))
-
-        # Se c'è solo un valore unico, axes non è un array bidimensionale, quindi lo convertiamo
-        if num_plots == 1:
-            axes = [[axes]]
-        elif rows == 1:
-            axes = [axes]
-
-        # Cicliamo su ciascun valore unico di unique_col e plottiamo i dati
-        for ax, value in zip(axes.flat, unique_values):
-            # Filtriamo il DataFrame per il valore corrente di unique_col
-            filtered_df = df[df[unique_col] == value]
-
-            # Contiamo i valori di count_col (0 e 1)
-            count_values = filtered_df[count_col].value_counts().sort_index()
-
-            # Assicuriamoci che entrambi i valori (0 e 1) siano presenti
-            count_values = count_values.reindex([0, 1], fill_value=0)
+        fig, axes = plt.subplots(rows, cols, figsize=(figsize_multiplier[0] * cols, figsize_multiplier[1] * rows), squeeze=False)
 
+        # Cicliamo su ciascun valore unico di unique_col e plottiamo i dati, direttamente con
+        # ax.bar dalla matrice dei conteggi
+        for ax, value, count_values in zip(axes.flat, data.index, data.to_numpy()):
             # Creiamo il grafico sul subplot corrente
-            count_values.plot(kind='bar', ax=ax, color=color)
+            bars = ax.bar([0, 1], count_values, width=0.5, color=color)
 
             # Aggiungiamo etichette e titolo
             ax.set_xlabel(xlabel)
@@ -244,7 +342,7 @@ class Plots:
             ax.set_xticklabels(xtick_labels, rotation='horizontal')
 
             # Aggiungiamo i valori sopra ogni barra
-            for p in ax.patches:
+            for p in (bars if annotate else []):
                 ax.annotate(str(p.get_height()), (p.get_x() + p.get_width() / 2., p.get_height()), ha='center', va='center', xytext=(0, 5), textcoords='offset points')
 
         # Rimuoviamo gli assi vuoti
@@ -253,26 +351,57 @@ class Plots:
 
         # Aggiustiamo il layout
         plt.tight_layout()
-        plt.show()
+        return fig
+
+    def plot_value_counts_per_unique(df, max_per_page=50):
+        """
+        Plot the count of values for each unique value in a specified column of the DataFrame,
+        in pages of at most max_per_page subplots.
+
+        Parameters:
+        - df: DataFrame: The DataFrame containing the data to be plotted.
+        - max_per_page: int: The maximum number of subplots of a figure.
+        """
+        for page in Plots.value_counts_pages(Plots.value_counts_per_unique_data(df), max_per_page):
+            Plots.draw_value_counts_per_unique(page)
+            plt.show()
+
+    def precision_recall_data(df, scorecard=None):
+        """
+        Calcola la precisione e il recall di ciascuna regola.
+
+        Args:
+        df: DataFrame contenente i dati da analizzare.
+        scorecard: Tabella restituita da RuleScorecard.build; se None viene calcolata da df.
+
+        Returns:
+        DataFrame: Le colonne 'signature', 'precision' e 'recall' della scorecard.
+        """
+        rule_stats = scorecard if scorecard is not None else RuleScorecard.build(df)
+        return rule_stats[['signature', 'precision', 'recall']]
 
-    def plot_precision_recall(df):
+    def plot_precision_recall(df, scorecard=None):
         """
         Calcola e plotta la precisione e il recall per ciascuna regola utilizzando Altair.
         
         Args:
         df: DataFrame contenente i dati da analizzare.
+        scorecard: Tabella restituita da RuleScorecard.build; se None viene calcolata da df.
+
+        Returns:
+        alt.VConcatChart: Il grafico combinato, dopo averlo mostrato.
+        """
+        final_chart = Plots.draw_precision_recall(Plots.precision_recall_data(df, scorecard))
+        final_chart.display()
+        return final_chart
+
+    def draw_precision_recall(rule_stats):
+        """
+        Disegna con Altair la precisione e il recall restituiti da precision_recall_data.
+
+        Returns:
+        alt.VConcatChart: Il grafico combinato.
         """
-        
-        # Calcolo delle metriche per ciascuna regola
-        rule_stats = df.groupby('signature')['corrisponde_ad_attacco'].agg(
-            total='count',
-            true_positives='sum'
-        ).reset_index()
-        
-        rule_stats['false_positives'] = rule_stats['total'] - rule_stats['true_positives']
-        rule_stats['precision'] = rule_stats['true_positives'] / rule_stats['total']
-        rule_stats['recall'] = rule_stats['true_positives'] / rule_stats['true_positives'].sum()
-        
         # Plotting con Altair
         precision_chart = alt.Chart(rule_stats).mark_bar(color='blue', opacity=0.7).encode(
             x=alt.X('signature:N', title='Regola', axis=None),
@@ -323,5 +452,4 @@ class Plots:
         ).configure_concat(
             spacing=5
         )
-        # Visualizza il grafico combinato
-        final_chart.display()
\ No newline at end of file
+        return final_chart
\ No newline at end of file
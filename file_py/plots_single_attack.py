@@ -7,281 +7,172 @@ class PlotsSingleAttack:
     di supporto. Inoltre, permette di analizzare i pattern degli eventi che precedono l'attivazione di una 
     regola specifica.
 
+    Ogni grafico è diviso in due passi: i metodi *_data calcolano le tabelle aggregate e i metodi draw_*
+    le disegnano e restituiscono la figura senza mostrarla, così che FigureRenderer possa scriverla su
+    file in background; analyze_rule_activations e patterns_before_activation li usano entrambi e
+    mostrano i grafici.
+
     Metodi:
         analyze_rule_activations(df, rule):
             Analizza le attivazioni di una regola specificata e genera vari plot per visualizzare la frequenza
             delle attivazioni, il tipo di evento, il parent process, il process, la severità e i tag.
+
+        rule_activations_data(df, rule), draw_activation_frequency(data), draw_process_counts(data, key),
+        draw_activation_counts(data):
+            Tabelle e grafici di analyze_rule_activations.
         
+        first_of_series(df, columns):
+            Individua gli eventi che sono il primo avvio di una serie rispetto all'evento precedente.
+
+        preceding_events(df, rule, elements_to_consider):
+            Restituisce, senza grafici, gli eventi che precedono ogni primo avvio della serie di una regola.
+
         patterns_before_activation(df, rule, elements_to_consider):
             Analizza i pattern degli eventi che precedono l'attivazione di una regola specifica e genera plot
             per visualizzare le regole, il tipo di evento, i tag, il parent process, il process e la severità 
             degli eventi precedenti.
+
+        patterns_data(df, rule, elements_to_consider), draw_rules_counts(data), draw_column_counts(data, key),
+        draw_preceding_counts(data):
+            Tabelle e grafici di patterns_before_activation.
     """
     
-    def analyze_rule_activations(df, rule, rule_col='signature', mitre_attack_col='RuleAnnotation.mitre_attack.id', time_col='_time', eventtype_col='EventType', parent_col='parent_process_id', process_col='process_id', severity_col='severity_id', tag_col='tag', attack_col='corrisponde_ad_attacco'):
+    def rule_activations_data(df, rule, rule_col='signature', mitre_attack_col='RuleAnnotation.mitre_attack.id', time_col='_time', eventtype_col='EventType', parent_col='parent_process_id', process_col='process_id', severity_col='severity_id', tag_col='tag', attack_col='corrisponde_ad_attacco', index=None):
         """
-        Analizza le attivazioni di una regola specificata in un dataframe, 
-        separando gli attacchi reali dai falsi positivi e generando vari grafici di supporto.
-        
+        Calcola le tabelle dei grafici di analyze_rule_activations, senza disegnarli.
+
         Args:
-        df: DataFrame contenente i dati da analizzare.
-        rule: La regola specifica da analizzare.
-        rule_col: Nome della colonna che contiene l'ID della regola.
-        mitre_attack_col: Nome della colonna che contiene l'ID dell'attacco registrato.
-        time_col: Nome della colonna che contiene il timestamp.
-        eventtype_col: Nome della colonna che contiene il tipo di evento.
-        parent_col: Nome della colonna che contiene l'ID del processo padre.
-        process_col: Nome della colonna che contiene l'ID del processo.
-        severity_col: Nome della colonna che contiene il livello di severità.
-        tag_col: Nome della colonna che contiene i tag.
-        attack_col: Nome della colonna che indica se l'attivazione corrisponde a un attacco reale.
-        """ 
-        
+        Gli stessi di analyze_rule_activations.
+
+        Returns:
+        dict: La regola, le frequenze di attivazione ogni 5 minuti degli attacchi e dei falsi positivi
+        ('frequency_attack', 'frequency_non_attack') e le tabelle 'Attacchi' / 'Non Attacchi' per
+        parent process, process, mitre attack, tipo di evento, severità e tag; None se la regola
+        non è presente.
+        """
         # Verifica se la regola specificata è presente nel dataframe
-        if rule not in df[rule_col].values:
-            print("La regola ricercata non è presente")
-            return
-        
-        # Filtra il dataframe per la regola specificata
-        df_rule = df[df[rule_col] == rule]
-        
-        # Separa le attivazioni in attacchi reali e falsi positivi
-        df_attack = df_rule[df_rule[attack_col] == 1]
-        df_non_attack = df_rule[df_rule[attack_col] == 0]
+        if (rule not in index) if index is not None else (rule not in df[rule_col].values):
+            return None
         
-        # Funzioni per i grafici
-
-        # Funzione di supporto per la frequenza di attivazione
-        def plot_activation_frequency(df_attack, df_non_attack, title):
-            """
-            Plotta la frequenza delle attivazioni degli attacchi e dei falsi positivi in modo interattivo con Plotly.
-            
-            Args:
-            df_attack: DataFrame contenente solo attacchi reali.
-            df_non_attack: DataFrame contenente solo falsi positivi.
-            title: Titolo del grafico.
-            """
-            
-            frequency_attack = df_attack[time_col].dt.floor('5T').value_counts().sort_index()
-            frequency_non_attack = df_non_attack[time_col].dt.floor('5T').value_counts().sort_index()
-
-            fig = go.Figure()
-            fig.add_trace(go.Bar(x=frequency_non_attack.index, y=frequency_non_attack.values, name='Non Attacchi', marker_color='blue'))
-            fig.add_trace(go.Bar(x=frequency_attack.index, y=frequency_attack.values, name='Attacchi', marker_color='red'))
-
-            fig.update_layout(
-                title=title,
-                xaxis_title='Tempo',
-                yaxis_title='Numero di Attivazioni',
-                xaxis_tickangle=-0,
-                barmode='stack',
-                xaxis=dict(
-                    tickvals=frequency_non_attack.index,  # Imposta tickvals agli indici della frequenza
-                    tickformat='%H:%M'  # Imposta il formato dell'ora/minuto
-                )
-            )
+        if index is not None:
+            # Attivazioni della regola già separate dall'indice
+            df_attack = index.frame(rule, attack=True)
+            df_non_attack = index.frame(rule, attack=False)
+        else:
+            # Filtra il dataframe per la regola specificata
+            df_rule = df[df[rule_col] == rule]
+            
+            # Separa le attivazioni in attacchi reali e falsi positivi
+            df_attack = df_rule[df_rule[attack_col] == 1]
+            df_non_attack = df_rule[df_rule[attack_col] == 0]
+
+        def combined_counts(column):
+            return pd.DataFrame({'Attacchi': df_attack[column].value_counts(), 'Non Attacchi': df_non_attack[column].value_counts()})
+
+        parent_process = combined_counts(parent_col)
+        process = combined_counts(process_col)
+
+        return {
+            'rule': rule,
+            'frequency_attack': df_attack[time_col].dt.floor('5min').value_counts().sort_index(),
+            'frequency_non_attack': df_non_attack[time_col].dt.floor('5min').value_counts().sort_index(),
+            # Filtro per tenere solo i processi che hanno almeno una colonna con più di due elementi
+            'parent_process': parent_process[(parent_process['Attacchi'] > 2) | (parent_process['Non Attacchi'] > 2)],
+            'process': process[(process['Attacchi'] > 2) | (process['Non Attacchi'] > 2)],
+            'mitre_attack': combined_counts(mitre_attack_col),
+            'event_type': combined_counts(eventtype_col),
+            'severity': combined_counts(severity_col),
+            'tag': combined_counts(tag_col),
+        }
+
+    def draw_activation_frequency(data):
+        """
+        Disegna in modo interattivo con Plotly la frequenza delle attivazioni degli attacchi e dei falsi positivi.
 
-            fig.update_traces(hovertemplate='Attivazioni: %{y}')  # Imposta il formato del tooltip
+        Args:
+        data: Le tabelle restituite da rule_activations_data.
 
-            fig.show()
-        
-        # Frequenza di Attivazione
-        plot_activation_frequency(df_attack, df_non_attack, f'Frequenza di Attivazione - {rule}')
+        Returns:
+        plotly.graph_objects.Figure: Il grafico.
+        """
+        frequency_attack = data['frequency_attack']
+        frequency_non_attack = data['frequency_non_attack']
+
+        fig = go.Figure()
+        fig.add_trace(go.Bar(x=frequency_non_attack.index, y=frequency_non_attack.values, name='Non Attacchi', marker_color='blue'))
+        fig.add_trace(go.Bar(x=frequency_attack.index, y=frequency_attack.values, name='Attacchi', marker_color='red'))
+
+        fig.update_layout(
+            title=f"Frequenza di Attivazione - {data['rule']}",
+            xaxis_title='Tempo',
+            yaxis_title='Numero di Attivazioni',
+            xaxis_tickangle=-0,
+            barmode='stack',
+            xaxis=dict(
+                tickvals=frequency_non_attack.index,  # Imposta tickvals agli indici della frequenza
+                tickformat='%H:%M'  # Imposta il formato dell'ora/minuto
+            )
+        )
 
-        def plot_parent_process_counts(df_attack, df_non_attack, title):
-            """
-            Plotta il numero di attacchi e falsi positivi per ID del processo padre.
-            
-            Args:
-            df_attack: DataFrame contenente solo attacchi reali.
-            df_non_attack: DataFrame contenente solo falsi positivi.
-            title: Titolo del grafico.
-            """
-            
-            parent_process_counts_attack = df_attack[parent_col].value_counts()
-            parent_process_counts_non_attack = df_non_attack[parent_col].value_counts()
-                
-            combined = pd.DataFrame({'Attacchi': parent_process_counts_attack, 'Non Attacchi': parent_process_counts_non_attack})
+        fig.update_traces(hovertemplate='Attivazioni: %{y}')  # Imposta il formato del tooltip
+        return fig
 
-            # Filtro per tenere solo i processi che hanno almeno una colonna con più di due elementi
-            combined = combined[(combined['Attacchi'] > 2) | (combined['Non Attacchi'] > 2)]
+    def draw_process_counts(data, key):
+        """
+        Disegna il numero di attacchi e falsi positivi per ID del processo padre o del processo.
 
-            # Colori per le colonne
-            colors = {'Attacchi': 'red', 'Non Attacchi': 'blue'}
-    
-            ax = combined.plot(kind='bar', figsize=(20, 6), color=[colors[col] for col in combined.columns])
-            plt.title(title)
-            plt.xlabel('Parent Process Id')
-            plt.xticks(rotation=55, ha='right')            
-            plt.ylabel('Numero di Attivazioni')
-            
-            for p in ax.patches:
-                ax.annotate(f'{int(p.get_height())}',
-                            (p.get_x() + p.get_width() / 2, p.get_height()),
-                            ha='center', va='bottom')
-    
-            plt.show()
+        Args:
+        data: Le tabelle restituite da rule_activations_data.
+        key: 'parent_process' oppure 'process'.
 
-        plot_parent_process_counts(df_attack, df_non_attack, f'Attacchi e Non-Attacchi per Parent Process Id - {rule}')
+        Returns:
+        matplotlib.figure.Figure: La figura.
+        """
+        label = {'parent_process': 'Parent Process Id', 'process': 'Process Id'}[key]
+        combined = data[key]
 
-        def plot_process_counts(df_attack, df_non_attack, title):
-            """
-            Plotta il numero di attacchi e falsi positivi per ID del processo.
-            
-            Args:
-            df_attack: DataFrame contenente solo attacchi reali.
-            df_non_attack: DataFrame contenente solo falsi positivi.
-            title: Titolo del grafico.
-            """
-            
-            # Calcola il conteggio dei processi per attacchi e non attacchi
-            process_counts_attack = df_attack[process_col].value_counts()
-            process_counts_non_attack = df_non_attack[process_col].value_counts()
+        # Colori per le colonne
+        colors = {'Attacchi': 'red', 'Non Attacchi': 'blue'}
 
-            # Combina i due conteggi in un DataFrame
-            combined = pd.DataFrame({'Attacchi': process_counts_attack, 'Non Attacchi': process_counts_non_attack})
-            
-            # Filtro per tenere solo i processi che hanno almeno una colonna con più di due elementi
-            combined = combined[(combined['Attacchi'] > 2) | (combined['Non Attacchi'] > 2)]
-            
-            # Colori per le colonne
-            colors = {'Attacchi': 'red', 'Non Attacchi': 'blue'}
-    
-            ax = combined.plot(kind='bar', figsize=(20, 6), color=[colors[col] for col in combined.columns])
-            plt.title(title)
-            plt.xlabel('Process Id')
-            plt.xticks(rotation=55, ha='right')            
-            plt.ylabel('Numero di Attivazioni')
-            
-            # Aggiungi annotazioni
-            for p in ax.patches:
-                ax.annotate(f'{int(p.get_height())}',
-                            (p.get_x() + p.get_width() / 2, p.get_height()),
-                            ha='center', va='bottom')
+        ax = combined.plot(kind='bar', figsize=(20, 6), color=[colors[col] for col in combined.columns])
+        plt.title(f"Attacchi e Non-Attacchi per {label} - {data['rule']}")
+        plt.xlabel(label)
+        plt.xticks(rotation=55, ha='right')            
+        plt.ylabel('Numero di Attivazioni')
+        
+        # Aggiungi annotazioni
+        for p in ax.patches:
+            ax.annotate(f'{int(p.get_height())}',
+                        (p.get_x() + p.get_width() / 2, p.get_height()),
+                        ha='center', va='bottom')
+        return ax.figure
+
+    def draw_activation_counts(data):
+        """
+        Disegna il numero di attacchi e falsi positivi per mitre attack, tipo di evento, severità e tag.
 
-            # Mostra il grafico
-            plt.show()
+        Args:
+        data: Le tabelle restituite da rule_activations_data.
 
-        plot_process_counts(df_attack, df_non_attack, f'Attacchi e Non-Attacchi per Process Id - {rule}')
+        Returns:
+        matplotlib.figure.Figure: La figura con i quattro grafici.
+        """
+        # Colori per le colonne
+        colors = {'Attacchi': 'red', 'Non Attacchi': 'blue'}
 
-        def plot_mitre_attack_counts(df_attack, df_non_attack, title, ax):
-            """
-            Plotta il numero di attacchi e falsi positivi per tipo di evento.
-            
-            Args:
-            df_attack: DataFrame contenente solo attacchi reali.
-            df_non_attack: DataFrame contenente solo falsi positivi.
-            title: Titolo del grafico.
-            ax: Oggetto Axes su cui tracciare il grafico.
-            """
-            
-            mitre_attack_counts_attack = df_attack[mitre_attack_col].value_counts()
-            mitre_attack_counts_non_attack = df_non_attack[mitre_attack_col].value_counts()
-                
-            combined = pd.DataFrame({'Attacchi': mitre_attack_counts_attack, 'Non Attacchi': mitre_attack_counts_non_attack})
-            
-            # Colori per le colonne
-            colors = {'Attacchi': 'red', 'Non Attacchi': 'blue'}
+        # Creazione dei subplot
+        fig, axs = plt.subplots(1, 4, figsize=(25, 16))
 
+        # Tabella, titolo, etichetta dell'asse x e relativo margine di ogni grafico
+        panels = [('mitre_attack', 'Mitre Attack Id', 'Mitre Attack Id', 50),
+                  ('event_type', 'Tipo di Evento', 'Tipo di Evento', 50),
+                  ('severity', 'Severità', 'Severità', 50),
+                  ('tag', 'Tag', 'Tag', 15)]
+        for ax, (key, title, xlabel, labelpad) in zip(axs, panels):
+            combined = data[key]
             combined.plot(kind='bar', ax=ax, figsize=(16, 8), color=[colors[col] for col in combined.columns])
             ax.set_title(title)
-            ax.set_xlabel('Mitre Attack Id', labelpad=50)
-            ax.set_ylabel('Numero di Attivazioni')
-            ax.set_xticklabels(ax.get_xticklabels(), rotation=0)
-            
-            for p in ax.patches:
-                ax.annotate(f'{int(p.get_height())}',
-                            (p.get_x() + p.get_width() / 2, p.get_height()),
-                            ha='center', va='bottom')
-            
-            plt.tight_layout()
-        
-        def plot_event_type_counts(df_attack, df_non_attack, title, ax):
-            """
-            Plotta il numero di attacchi e falsi positivi per tipo di evento.
-            
-            Args:
-            df_attack: DataFrame contenente solo attacchi reali.
-            df_non_attack: DataFrame contenente solo falsi positivi.
-            title: Titolo del grafico.
-            ax: Oggetto Axes su cui tracciare il grafico.
-            """
-            
-            event_type_counts_attack = df_attack[eventtype_col].value_counts()
-            event_type_counts_non_attack = df_non_attack[eventtype_col].value_counts()
-                
-            combined = pd.DataFrame({'Attacchi': event_type_counts_attack, 'Non Attacchi': event_type_counts_non_attack})
-
-            # Colori per le colonne
-            colors = {'Attacchi': 'red', 'Non Attacchi': 'blue'}
-                
-            combined.plot(kind='bar', ax=ax, figsize=(16, 8), color=[colors[col] for col in combined.columns])
-            ax.set_title(title)
-            ax.set_xlabel('Tipo di Evento', labelpad=50)
-            ax.set_ylabel('Numero di Attivazioni')
-            ax.set_xticklabels(ax.get_xticklabels(), rotation=0)
-            
-            for p in ax.patches:
-                ax.annotate(f'{int(p.get_height())}',
-                            (p.get_x() + p.get_width() / 2, p.get_height()),
-                            ha='center', va='bottom')
-            
-            plt.tight_layout()
-        
-        def plot_severity_counts(df_attack, df_non_attack, title, ax):
-            """
-            Plotta il numero di attacchi e falsi positivi per livello di severità.
-            
-            Args:
-            df_attack: DataFrame contenente solo attacchi reali.
-            df_non_attack: DataFrame contenente solo falsi positivi.
-            title: Titolo del grafico.
-            ax: Oggetto Axes su cui tracciare il grafico.
-            """
-            
-            severity_counts_attack = df_attack[severity_col].value_counts()
-            severity_counts_non_attack = df_non_attack[severity_col].value_counts()
-                
-            combined = pd.DataFrame({'Attacchi': severity_counts_attack, 'Non Attacchi': severity_counts_non_attack})
-
-            # Colori per le colonne
-            colors = {'Attacchi': 'red', 'Non Attacchi': 'blue'}
-                
-            combined.plot(kind='bar', ax=ax, figsize=(16, 8), color=[colors[col] for col in combined.columns])
-            ax.set_title(title)
-            ax.set_xlabel('Severità', labelpad=50)
-            ax.set_ylabel('Numero di Attivazioni')
-            ax.set_xticklabels(ax.get_xticklabels(), rotation=0)
-            
-            for p in ax.patches:
-                ax.annotate(f'{int(p.get_height())}',
-                            (p.get_x() + p.get_width() / 2, p.get_height()),
-                            ha='center', va='bottom')
-            
-            plt.tight_layout()
-        
-        def plot_tag_counts(df_attack, df_non_attack, title, ax):
-            """
-            Plotta il numero di attacchi e falsi positivi per tag.
-            
-            Args:
-            df_attack: DataFrame contenente solo attacchi reali.
-            df_non_attack: DataFrame contenente solo falsi positivi.
-            title: Titolo del grafico.
-            ax: Oggetto Axes su cui tracciare il grafico.
-            """
-            
-            tag_counts_attack = df_attack[tag_col].value_counts()
-            tag_counts_non_attack = df_non_attack[tag_col].value_counts()
-                
-            combined = pd.DataFrame({'Attacchi': tag_counts_attack, 'Non Attacchi': tag_counts_non_attack})
-
-            # Colori per le colonne
-            colors = {'Attacchi': 'red', 'Non Attacchi': 'blue'}
-                
-            combined.plot(kind='bar', ax=ax, figsize=(16, 8), color=[colors[col] for col in combined.columns])
-            ax.set_title(title)
-            ax.set_xlabel('Tag', labelpad=15)
+            ax.set_xlabel(xlabel, labelpad=labelpad)
             ax.set_ylabel('Numero di Attivazioni')
             ax.set_xticklabels(ax.get_xticklabels(), rotation=0)
             
@@ -292,30 +183,20 @@ class PlotsSingleAttack:
             
             plt.tight_layout()
         
-        # Creazione dei subplot
-        fig, axs = plt.subplots(1, 4, figsize=(25, 16))
-        
-        # Chiamata alle funzioni di plot con gli assi corrispondenti
-        plot_mitre_attack_counts(df_attack, df_non_attack, f'Mitre Attack Id', ax=axs[0])
-        plot_event_type_counts(df_attack, df_non_attack, f'Tipo di Evento', ax=axs[1])
-        plot_severity_counts(df_attack, df_non_attack, f'Severità', ax=axs[2])
-        plot_tag_counts(df_attack, df_non_attack, f'Tag', ax=axs[3])
-        
         # Imposta il layout
         plt.tight_layout()
-        plt.show()
-
+        return fig
 
-    def patterns_before_activation(df, rule, elements_to_consider, rule_col='signature', mitre_attack_col='RuleAnnotation.mitre_attack.id', time_col='_time', eventtype_col='EventType', parent_col='parent_process_id', process_col='process_id', severity_col='severity_id', tag_col='tag', attack_col='corrisponde_ad_attacco'):
+    def analyze_rule_activations(df, rule, rule_col='signature', mitre_attack_col='RuleAnnotation.mitre_attack.id', time_col='_time', eventtype_col='EventType', parent_col='parent_process_id', process_col='process_id', severity_col='severity_id', tag_col='tag', attack_col='corrisponde_ad_attacco', index=None):
         """
-        Analizza i pattern degli eventi che precedono l'attivazione di una regola specifica.
-
+        Analizza le attivazioni di una regola specificata in un dataframe, 
+        separando gli attacchi reali dai falsi positivi e generando vari grafici di supporto.
+        
         Args:
         df: DataFrame contenente i dati da analizzare.
         rule: La regola specifica da analizzare.
-        elements_to_consider: Numero di eventi precedenti da considerare.
         rule_col: Nome della colonna che contiene l'ID della regola.
-        mitre_attack_col: Nome della colonna che contiene l'ID dell'attacco.
+        mitre_attack_col: Nome della colonna che contiene l'ID dell'attacco registrato.
         time_col: Nome della colonna che contiene il timestamp.
         eventtype_col: Nome della colonna che contiene il tipo di evento.
         parent_col: Nome della colonna che contiene l'ID del processo padre.
@@ -323,212 +204,302 @@ class PlotsSingleAttack:
         severity_col: Nome della colonna che contiene il livello di severità.
         tag_col: Nome della colonna che contiene i tag.
         attack_col: Nome della colonna che indica se l'attivazione corrisponde a un attacco reale.
+        index: RuleIndex costruito da df, per evitare di scansionare tutto il dataframe ad ogni regola.
         """
-        
-        # Verifica se la regola specificata è presente nel dataframe
-        if rule not in df[rule_col].values:
+        data = PlotsSingleAttack.rule_activations_data(df, rule, rule_col=rule_col, mitre_attack_col=mitre_attack_col, time_col=time_col, eventtype_col=eventtype_col, parent_col=parent_col, process_col=process_col, severity_col=severity_col, tag_col=tag_col, attack_col=attack_col, index=index)
+        if data is None:
             print("La regola ricercata non è presente")
             return
 
-        # Ordina il DataFrame per il tempo per garantire l'ordine cronologico
-        df = df.sort_values(by=time_col)
-        
-        # Lista per memorizzare gli eventi precedenti
-        previous_events = []
-
-        # Scorri il DataFrame completo
-        for i in range(1, len(df)):
-            # Ottieni l'evento attuale e precedente
-            current_event = df.iloc[i]
-            previous_event = df.iloc[i - 1]
-
-            # Verifica se l'evento attuale è la regola specificata
-            if current_event[rule_col] == rule and current_event[attack_col] == True:
-                # Controlla se l'evento attuale è un "primo avvio della serie"
-                if (current_event[rule_col] != previous_event[rule_col] or
-                    current_event[mitre_attack_col] != previous_event[mitre_attack_col] or
-                    current_event[parent_col] != previous_event[parent_col] or
-                    current_event[process_col] != previous_event[process_col] or
-                    current_event[eventtype_col] != previous_event[eventtype_col] or
-                    current_event[tag_col] != previous_event[tag_col] or
-                    current_event[severity_col] != previous_event[severity_col]
-                    ):
-                    
-                    # Aggiungi gli eventi precedenti al primo avvio della serie
-                    start_idx = max(0, i - elements_to_consider)
-                    previous_events.extend(df.iloc[start_idx:i].to_dict('records'))
-
-        # Crea un DataFrame dagli eventi precedenti
-        df_previous_events = pd.DataFrame(previous_events)
-
-        def plot_rules_counts(df, column, title):
-            # Calcola i conteggi
-            counts = df.groupby([column, attack_col]).size().unstack(fill_value=0)
-            counts = counts.loc[(counts.sum(axis=1) >= 10)]  # Filtra le righe con somma >= 10
-            counts.columns = ['Non Attacco' if col == False else 'Attacco' for col in counts.columns]
-            counts = counts.sort_values(by='Attacco', ascending=False)  # Ordina per conteggi di 'Attacco'
-
-            # Trasforma il DataFrame in un formato adatto ad Altair
-            counts = counts.reset_index().melt(id_vars=[column], var_name='tipo_attacco', value_name='conteggio')
-            
-            # Crea il grafico a barre usando Altair
-            chart = alt.Chart(counts).mark_bar().encode(
-                x=alt.X(column + ':O', title='Regole', sort='-y'),
-                y=alt.Y('sum(conteggio):Q', title='Numero di occorrenze'),
-                color=alt.Color('tipo_attacco:N', title=None, scale=alt.Scale(range=['red', 'blue'])),
-                tooltip=[alt.Tooltip(column + ':O', title='Regole'), alt.Tooltip('sum(conteggio):Q', title='Numero di occorrenze')]
-            ).properties(
-                width=1400,
-                height=700,
-                title=alt.TitleParams(
-                text=title,
-                fontSize=18,
-                anchor='start',
-                offset=20  # Aggiungi un margine superiore di 20 punti tra il titolo e il grafico
-                )
-            ).configure_legend(
-                strokeColor='black',  # Colore del bordo della legenda
-                strokeWidth=3,  # Spessore del bordo della legenda
-                orient='top-right',  # Posizione della legenda (in alto a destra)
-                offset=50,  # Distanza della legenda dal bordo del grafico
-                padding=20,
-                labelFontSize=15,
-                fillColor='lightgrey'
-            ).configure_axisY(
-                labelFontSize=12,
-                titleFontSize=15,
-            ).configure_axisX(
-                titleFontSize=15,
-                labels=False
-            ).configure_title(
-                fontSize=16,
-                anchor='start'
-            )
+        # Frequenza di Attivazione
+        PlotsSingleAttack.draw_activation_frequency(data).show()
 
-            chart.display()
+        PlotsSingleAttack.draw_process_counts(data, 'parent_process')
+        plt.show()
 
-        def plot_column_counts(df, column, title):
-            # Divide il DataFrame in attacchi e non attacchi
-            attacks = df[df[attack_col] == True]
-            non_attacks = df[df[attack_col] == False]
-            
-            # Conta le occorrenze per attacchi e non attacchi
-            counts_attacks = attacks[column].value_counts()
-            counts_non_attacks = non_attacks[column].value_counts()
+        PlotsSingleAttack.draw_process_counts(data, 'process')
+        plt.show()
 
-            counts_attacks = counts_attacks[counts_attacks > 2]
-            counts_non_attacks = counts_non_attacks[counts_non_attacks > 2]
+        PlotsSingleAttack.draw_activation_counts(data)
+        plt.show()
 
-            # Trova il valore massimo di counts_attacks
-            max_v_attacks = max(counts_attacks)
-            
-            # Prepara il plot
-            plt.figure(figsize=(18, 8))
-            
-            # Plot per attacchi (rosso)
-            counts_attacks.plot(kind='bar', color='red', alpha=1, label='Attacchi')
-            
-            # Plot per non attacchi (blu)
-            counts_non_attacks.plot(kind='bar', color='blue', alpha=1, label='Non Attacchi')
-
-            # Aggiungi testo sopra le barre
-            for i, (v_attacks, v_non_attacks) in enumerate(zip(counts_attacks, counts_non_attacks)):
-                offset = max_v_attacks / 75  # Usa il valore massimo per il calcolo dell'offset
-                plt.text(i, v_attacks + offset, f"-", color='black', ha='center')
-                plt.text(i, v_attacks + offset, f"{v_attacks} ", color='red', ha='right')
-                plt.text(i, v_attacks + offset, f"  {v_non_attacks}", color='blue', ha='left')
-            
-            plt.xlabel(column)
-            plt.ylabel('Numero di occorrenze')
-            plt.title(title)
-            plt.legend()
-            plt.xticks(rotation=0)
-            plt.show()
 
-        # Plot per le regole attivate prima di quella scelta
-        plot_rules_counts(df_previous_events, rule_col, f'{elements_to_consider} Regole attivate subito prima di {rule}')
-        
-        # Plot per gli attacchi registrati prima dell'attivazione della regola scelta
-        plot_column_counts(df_previous_events, mitre_attack_col, f'{elements_to_consider} Attacchi registrati subito prima di {rule}')
+    def first_of_series(df, columns, positions=None):
+        """
+        Individua gli eventi che sono il "primo avvio di una serie", cioè quelli in cui almeno
+        una delle colonne indicate cambia rispetto all'evento precedente. Il primo evento del
+        DataFrame non ha un precedente e non viene mai considerato primo avvio.
 
-        # Plot per i parent process registrati prima dell'attivazione della regola scelta
-        plot_column_counts(df_previous_events, parent_col, f'{elements_to_consider} Parent Process registrati subito prima di {rule}')
+        Args:
+        df: DataFrame già ordinato in ordine cronologico.
+        columns: Colonne da confrontare con l'evento precedente.
+        positions: Se indicate, solo queste posizioni vengono controllate.
 
-        # Plot per i process registrati prima dell'attivazione della regola scelta
-        plot_column_counts(df_previous_events, process_col, f'{elements_to_consider} Process registrati subito prima di {rule}')
+        Returns:
+        numpy.ndarray: Array booleano con True per ogni primo avvio della serie
+        (per ogni riga di df, oppure per ogni posizione indicata).
+        """
+        if positions is not None:
+            positions = np.asarray(positions, dtype=np.intp)
+            current = positions[positions > 0]
+            changed = np.zeros(len(current), dtype=bool)
+            for column in columns:
+                values = df[column]
+                changed |= values.iloc[current].reset_index(drop=True).ne(
+                    values.iloc[current - 1].reset_index(drop=True)).fillna(True).to_numpy(dtype=bool)
+            result = np.zeros(len(positions), dtype=bool)
+            result[positions > 0] = changed
+            return result
+
+        changed = np.zeros(len(df), dtype=bool)
+        for column in columns:
+            values = df[column].reset_index(drop=True)
+            # Come nel confronto riga per riga, NaN != NaN conta come cambiamento
+            changed |= values.ne(values.shift()).fillna(True).to_numpy(dtype=bool)
+        if len(df):
+            changed[0] = False
+        return changed
+
+    def preceding_events(df, rule, elements_to_consider, rule_col='signature', mitre_attack_col='RuleAnnotation.mitre_attack.id', time_col='_time', eventtype_col='EventType', parent_col='parent_process_id', process_col='process_id', severity_col='severity_id', tag_col='tag', attack_col='corrisponde_ad_attacco', index=None):
+        """
+        Restituisce gli eventi che precedono ogni "primo avvio della serie" di una regola specifica
+        durante un attacco, senza generare grafici.
 
+        Il DataFrame viene ordinato per tempo; un primo avvio è un evento della regola, corrispondente
+        ad un attacco, in cui la regola, l'attacco, il parent process, il process, il tipo di evento,
+        il tag o la severità cambiano rispetto all'evento precedente. Per ognuno vengono raccolti fino a
+        elements_to_consider eventi precedenti, in ordine cronologico e ripetuti se le finestre si sovrappongono.
 
-        # Crea un subplot per eventtype_col, tag_col e severity_col
-        fig, axes = plt.subplots(nrows=1, ncols=3, figsize=(18, 8))
+        Args:
+        df: DataFrame contenente i dati da analizzare.
+        rule: La regola specifica da analizzare.
+        elements_to_consider: Numero di eventi precedenti da considerare.
+        Gli altri argomenti sono i nomi delle colonne, come in patterns_before_activation.
+        index: RuleIndex costruito da df; se indicato il costo è proporzionale alle attivazioni della regola.
 
-        # Plot per gli eventtype registrati prima dell'attivazione della regola scelta (attacchi vs non attacchi)
-        counts_eventtype_attacks = df_previous_events[df_previous_events[attack_col] == True][eventtype_col].value_counts()
-        counts_eventtype_non_attacks = df_previous_events[df_previous_events[attack_col] == False][eventtype_col].value_counts()
+        Returns:
+        DataFrame: Gli eventi precedenti, con un indice da 0 a n-1.
+        """
+        series_columns = [rule_col, mitre_attack_col, parent_col, process_col, eventtype_col, tag_col, severity_col]
 
-        counts_eventtype_attacks.plot(kind='bar', ax=axes[0], color='red', alpha=1, label='Attacchi')
-        counts_eventtype_non_attacks.plot(kind='bar', ax=axes[0], color='blue', alpha=1, label='Non Attacchi')
+        if index is not None:
+            # L'indice contiene già il DataFrame ordinato e le attivazioni della regola durante un attacco
+            df = index.sorted_df
+            candidates = index.positions(rule, attack=True, chronological=True)
+            triggers = candidates[PlotsSingleAttack.first_of_series(df, series_columns, candidates)]
+        else:
+            # Ordina il DataFrame per il tempo per garantire l'ordine cronologico
+            df = df.sort_values(by=time_col)
 
-        # Trova il valore massimo di counts_eventtype_attacks
-        max_v_eventtype_attacks = max(counts_eventtype_attacks)
+            triggers = np.flatnonzero((df[rule_col] == rule).to_numpy(dtype=bool) &
+                                      (df[attack_col] == True).to_numpy(dtype=bool) &
+                                      PlotsSingleAttack.first_of_series(df, series_columns))
 
-        axes[0].set_xlabel(eventtype_col, labelpad=45)
-        axes[0].set_ylabel('Numero di occorrenze')
-        axes[0].set_title(f'{elements_to_consider} EventType prima di {rule}')
-        axes[0].tick_params(axis='x', rotation=0)
-        axes[0].legend()
+        # Posizioni degli elements_to_consider eventi che precedono ogni primo avvio
+        positions = (triggers[:, None] + np.arange(-elements_to_consider, 0)[None, :]).ravel()
+        positions = positions[positions >= 0]
 
-        # Aggiungi testo sopra le barre
-        for i, (v_attacks, v_non_attacks) in enumerate(zip(counts_eventtype_attacks, counts_eventtype_non_attacks)):
-            offset = max_v_eventtype_attacks / 100  # Usa il valore massimo per il calcolo dell'offset
-            axes[0].text(i, v_attacks + offset, f"-", color='black', ha='center')
-            axes[0].text(i, v_attacks + offset, f"{v_attacks} ", color='red', ha='right')
-            axes[0].text(i, v_attacks + offset, f"  {v_non_attacks}", color='blue', ha='left')
+        return df.iloc[positions].reset_index(drop=True)
 
-        # Plot per i tag registrati prima dell'attivazione della regola scelta (attacchi vs non attacchi)
-        counts_tag_attacks = df_previous_events[df_previous_events[attack_col] == True][tag_col].value_counts()
-        counts_tag_non_attacks = df_previous_events[df_previous_events[attack_col] == False][tag_col].value_counts()
+    def patterns_data(df, rule, elements_to_consider, rule_col='signature', mitre_attack_col='RuleAnnotation.mitre_attack.id', time_col='_time', eventtype_col='EventType', parent_col='parent_process_id', process_col='process_id', severity_col='severity_id', tag_col='tag', attack_col='corrisponde_ad_attacco', index=None):
+        """
+        Calcola le tabelle dei grafici di patterns_before_activation, senza disegnarli.
 
-        counts_tag_attacks.plot(kind='bar', ax=axes[1], color='red', alpha=1, label='Attacchi')
-        counts_tag_non_attacks.plot(kind='bar', ax=axes[1], color='blue', alpha=1, label='Non Attacchi')
+        Args:
+        Gli stessi di patterns_before_activation.
 
-        # Trova il valore massimo di counts_tag_attacks
-        max_v_tag_attacks = max(counts_tag_attacks)
+        Returns:
+        dict: La regola, elements_to_consider, i nomi delle colonne, la tabella 'rules' delle regole
+        attivate prima (nel formato di Altair) e, per attacchi, parent process, process, tipo di evento,
+        tag e severità, i conteggi degli attacchi e dei non attacchi; None se la regola non è presente.
+        """
+        # Verifica se la regola specificata è presente nel dataframe
+        if (rule not in index) if index is not None else (rule not in df[rule_col].values):
+            return None
 
-        axes[1].set_xlabel(tag_col)
-        axes[1].set_ylabel('Numero di occorrenze')
-        axes[1].set_title(f'{elements_to_consider} Tag prima di {rule}')
-        axes[1].tick_params(axis='x', rotation=0)
-        axes[1].legend()
+        # Eventi che precedono ogni primo avvio della serie della regola scelta
+        df_previous_events = PlotsSingleAttack.preceding_events(df, rule, elements_to_consider, rule_col=rule_col, mitre_attack_col=mitre_attack_col, time_col=time_col, eventtype_col=eventtype_col, parent_col=parent_col, process_col=process_col, severity_col=severity_col, tag_col=tag_col, attack_col=attack_col, index=index)
 
-        # Aggiungi testo sopra le barre
-        for i, (v_attacks, v_non_attacks) in enumerate(zip(counts_tag_attacks, counts_tag_non_attacks)):
-            offset = max_v_tag_attacks / 100  # Usa il valore massimo per il calcolo dell'offset
-            axes[1].text(i, v_attacks + offset, f"-", color='black', ha='center')
-            axes[1].text(i, v_attacks + offset, f"{v_attacks} ", color='red', ha='right')
-            axes[1].text(i, v_attacks + offset, f"  {v_non_attacks}", color='blue', ha='left')
+        # Conteggi delle regole attivate prima di quella scelta
+        counts = df_previous_events.groupby([rule_col, attack_col]).size().unstack(fill_value=0)
+        counts = counts.loc[(counts.sum(axis=1) >= 10)]  # Filtra le righe con somma >= 10
+        counts.columns = ['Non Attacco' if col == False else 'Attacco' for col in counts.columns]
+        counts = counts.sort_values(by='Attacco', ascending=False)  # Ordina per conteggi di 'Attacco'
+
+        # Trasforma il DataFrame in un formato adatto ad Altair
+        rules = counts.reset_index().melt(id_vars=[rule_col], var_name='tipo_attacco', value_name='conteggio')
 
-        # Plot per i severity registrati prima dell'attivazione della regola scelta (attacchi vs non attacchi)
-        counts_severity_attacks = df_previous_events[df_previous_events[attack_col] == True][severity_col].value_counts()
-        counts_severity_non_attacks = df_previous_events[df_previous_events[attack_col] == False][severity_col].value_counts()
+        # Divide gli eventi in attacchi e non attacchi
+        attacks = df_previous_events[df_previous_events[attack_col] == True]
+        non_attacks = df_previous_events[df_previous_events[attack_col] == False]
 
-        counts_severity_attacks.plot(kind='bar', ax=axes[2], color='red', alpha=1, label='Attacchi')
-        counts_severity_non_attacks.plot(kind='bar', ax=axes[2], color='blue', alpha=1, label='Non Attacchi')
+        def column_counts(column, minimum=None):
+            counts_attacks = attacks[column].value_counts()
+            counts_non_attacks = non_attacks[column].value_counts()
+            if minimum is not None:
+                counts_attacks = counts_attacks[counts_attacks > minimum]
+                counts_non_attacks = counts_non_attacks[counts_non_attacks > minimum]
+            return {'attacks': counts_attacks, 'non_attacks': counts_non_attacks}
+
+        return {
+            'rule': rule,
+            'elements_to_consider': elements_to_consider,
+            'rule_col': rule_col,
+            'columns': {'mitre_attack': mitre_attack_col, 'parent_process': parent_col, 'process': process_col,
+                        'event_type': eventtype_col, 'tag': tag_col, 'severity': severity_col},
+            'rules': rules,
+            # Per attacchi e processi restano solo i valori con più di due occorrenze
+            'mitre_attack': column_counts(mitre_attack_col, minimum=2),
+            'parent_process': column_counts(parent_col, minimum=2),
+            'process': column_counts(process_col, minimum=2),
+            'event_type': column_counts(eventtype_col),
+            'tag': column_counts(tag_col),
+            'severity': column_counts(severity_col),
+        }
+
+    def draw_rules_counts(data):
+        """
+        Disegna con Altair le regole attivate prima di quella scelta, per attacchi e non attacchi.
 
-        # Trova il valore massimo di counts_severity_attacks
-        max_v_severity_attacks = max(counts_severity_attacks)
+        Args:
+        data: Le tabelle restituite da patterns_data.
 
-        axes[2].set_xlabel(severity_col, labelpad=45)
-        axes[2].set_ylabel('Numero di occorrenze')
-        axes[2].set_title(f'{elements_to_consider} Severity prima di {rule}')
-        axes[2].tick_params(axis='x', rotation=0)
-        axes[2].legend()
+        Returns:
+        altair.Chart: Il grafico.
+        """
+        column = data['rule_col']
+        title = f"{data['elements_to_consider']} Regole attivate subito prima di {data['rule']}"
+
+        # Crea il grafico a barre usando Altair
+        return alt.Chart(data['rules']).mark_bar().encode(
+            x=alt.X(column + ':O', title='Regole', sort='-y'),
+            y=alt.Y('sum(conteggio):Q', title='Numero di occorrenze'),
+            color=alt.Color('tipo_attacco:N', title=None, scale=alt.Scale(range=['red', 'blue'])),
+            tooltip=[alt.Tooltip(column + ':O', title='Regole'), alt.Tooltip('sum(conteggio):Q', title='Numero di occorrenze')]
+        ).properties(
+            width=1400,
+            height=700,
+            title=alt.TitleParams(
+            text=title,
+            fontSize=18,
+            anchor='start',
+            offset=20  # Aggiungi un margine superiore di 20 punti tra il titolo e il grafico
+            )
+        ).configure_legend(
+            strokeColor='black',  # Colore del bordo della legenda
+            strokeWidth=3,  # Spessore del bordo della legenda
+            orient='top-right',  # Posizione della legenda (in alto a destra)
+            offset=50,  # Distanza della legenda dal bordo del grafico
+            padding=20,
+            labelFontSize=15,
+            fillColor='lightgrey'
+        ).configure_axisY(
+            labelFontSize=12,
+            titleFontSize=15,
+        ).configure_axisX(
+            titleFontSize=15,
+            labels=False
+        ).configure_title(
+            fontSize=16,
+            anchor='start'
+        )
+
+    def _draw_overlaid_counts(ax, counts, offset_divisor):
+        # Barre degli attacchi (rosso) sovrapposte a quelle dei non attacchi (blu)
+        counts['attacks'].plot(kind='bar', ax=ax, color='red', alpha=1, label='Attacchi')
+        counts['non_attacks'].plot(kind='bar', ax=ax, color='blue', alpha=1, label='Non Attacchi')
+
+        # Usa il valore massimo degli attacchi per il calcolo dell'offset
+        offset = max(counts['attacks']) / offset_divisor
 
         # Aggiungi testo sopra le barre
-        for i, (v_attacks, v_non_attacks) in enumerate(zip(counts_severity_attacks, counts_severity_non_attacks)):
-            offset = max_v_severity_attacks / 100  # Usa il valore massimo per il calcolo dell'offset
-            axes[2].text(i, v_attacks + offset, f"-", color='black', ha='center')
-            axes[2].text(i, v_attacks + offset, f"{v_attacks} ", color='red', ha='right')
-            axes[2].text(i, v_attacks + offset, f"  {v_non_attacks}", color='blue', ha='left')
+        for i, (v_attacks, v_non_attacks) in enumerate(zip(counts['attacks'], counts['non_attacks'])):
+            ax.text(i, v_attacks + offset, f"-", color='black', ha='center')
+            ax.text(i, v_attacks + offset, f"{v_attacks} ", color='red', ha='right')
+            ax.text(i, v_attacks + offset, f"  {v_non_attacks}", color='blue', ha='left')
+
+    def draw_column_counts(data, key):
+        """
+        Disegna gli attacchi, i parent process o i process registrati prima della regola scelta.
+
+        Args:
+        data: Le tabelle restituite da patterns_data.
+        key: 'mitre_attack', 'parent_process' oppure 'process'.
+
+        Returns:
+        matplotlib.figure.Figure: La figura.
+        """
+        label = {'mitre_attack': 'Attacchi', 'parent_process': 'Parent Process', 'process': 'Process'}[key]
+
+        fig, ax = plt.subplots(figsize=(18, 8))
+        PlotsSingleAttack._draw_overlaid_counts(ax, data[key], 75)
+
+        ax.set_xlabel(data['columns'][key])
+        ax.set_ylabel('Numero di occorrenze')
+        ax.set_title(f"{data['elements_to_consider']} {label} registrati subito prima di {data['rule']}")
+        ax.legend()
+        ax.tick_params(axis='x', rotation=0)
+        return fig
+
+    def draw_preceding_counts(data):
+        """
+        Disegna il tipo di evento, i tag e la severità degli eventi registrati prima della regola scelta.
+
+        Args:
+        data: Le tabelle restituite da patterns_data.
+
+        Returns:
+        matplotlib.figure.Figure: La figura con i tre grafici.
+        """
+        # Crea un subplot per tipo di evento, tag e severità
+        fig, axes = plt.subplots(nrows=1, ncols=3, figsize=(18, 8))
+
+        # Tabella, titolo ed eventuale margine dell'etichetta dell'asse x di ogni grafico
+        panels = [('event_type', 'EventType', 45), ('tag', 'Tag', None), ('severity', 'Severity', 45)]
+        for ax, (key, title, labelpad) in zip(axes, panels):
+            PlotsSingleAttack._draw_overlaid_counts(ax, data[key], 100)
+
+            ax.set_xlabel(data['columns'][key], labelpad=labelpad)
+            ax.set_ylabel('Numero di occorrenze')
+            ax.set_title(f"{data['elements_to_consider']} {title} prima di {data['rule']}")
+            ax.tick_params(axis='x', rotation=0)
+            ax.legend()
 
         plt.tight_layout()
-        plt.show()
\ No newline at end of file
+        return fig
+
+    def patterns_before_activation(df, rule, elements_to_consider, rule_col='signature', mitre_attack_col='RuleAnnotation.mitre_attack.id', time_col='_time', eventtype_col='EventType', parent_col='parent_process_id', process_col='process_id', severity_col='severity_id', tag_col='tag', attack_col='corrisponde_ad_attacco', index=None):
+        """
+        Analizza i pattern degli eventi che precedono l'attivazione di una regola specifica.
+
+        Args:
+        df: DataFrame contenente i dati da analizzare.
+        rule: La regola specifica da analizzare.
+        elements_to_consider: Numero di eventi precedenti da considerare.
+        rule_col: Nome della colonna che contiene l'ID della regola.
+        mitre_attack_col: Nome della colonna che contiene l'ID dell'attacco.
+        time_col: Nome della colonna che contiene il timestamp.
+        eventtype_col: Nome della colonna che contiene il tipo di evento.
+        parent_col: Nome della colonna che contiene l'ID del processo padre.
+        process_col: Nome della colonna che contiene l'ID del processo.
+        severity_col: Nome della colonna che contiene il livello di severità.
+        tag_col: Nome della colonna che contiene i tag.
+        attack_col: Nome della colonna che indica se l'attivazione corrisponde a un attacco reale.
+        index: RuleIndex costruito da df, per evitare di scansionare tutto il dataframe ad ogni regola.
+        """
+        data = PlotsSingleAttack.patterns_data(df, rule, elements_to_consider, rule_col=rule_col, mitre_attack_col=mitre_attack_col, time_col=time_col, eventtype_col=eventtype_col, parent_col=parent_col, process_col=process_col, severity_col=severity_col, tag_col=tag_col, attack_col=attack_col, index=index)
+        if data is None:
+            print("La regola ricercata non è presente")
+            return
+
+        # Plot per le regole attivate prima di quella scelta
+        PlotsSingleAttack.draw_rules_counts(data).display()
+
+        # Plot per gli attacchi, i parent process e i process registrati prima dell'attivazione della regola scelta
+        for key in ('mitre_attack', 'parent_process', 'process'):
+            PlotsSingleAttack.draw_column_counts(data, key)
+            plt.show()
+
+        # Plot per eventtype, tag e severity registrati prima dell'attivazione della regola scelta
+        PlotsSingleAttack.draw_preceding_counts(data)
+        plt.show()
@@ -0,0 +1,140 @@
+from .lib import *
+from .csv_preprocessing_scaler import CsvPreprocessingScaler
+from .run_log_parser import RunLogParser
+
+class PreprocessedCache:
+    """An on-disk columnar cache of preprocessed event frames.
+
+    The output of RawPreprocessing, and of process_attacks on top of it, is stored
+    as uncompressed Arrow IPC (Feather) files. On reload a file is read through a
+    memory map, with no parsing or decompression, and converted to pandas in a single
+    pass: this is a fast full load, not a lazy one, since the frame ends up in pandas
+    memory (the string columns, most of them, cannot be shared with the file anyway).
+    Every entry is keyed by the hash of its source files plus
+    CsvPreprocessingScaler.PREPROCESSING_VERSION, so a changed export, a changed
+    run log or a new preprocessing version simply produce a new entry.
+
+    Attributes:
+        cache_dir (str): The directory holding the cached frames.
+
+    Methods:
+        file_hash(file_path): Returns the content hash of a file.
+        raw(file_path): Returns the RawPreprocessing output of a CSV file.
+        labeled(file_path, run_log_path): Returns the raw output labeled with the attacks of a run log.
+        has_labeled(file_path, run_log_path): Tells whether the labeled output is already cached.
+    """
+
+    INDEX_COL = '__index__'
+
+    def __init__(self, cache_dir='file_cache'):
+        """Initializes the cache, creating its directory if needed.
+
+        Args:
+            cache_dir (str): The directory holding the cached frames.
+        """
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+        self._hashes_dir = os.path.join(cache_dir, 'hashes')
+        os.makedirs(self._hashes_dir, exist_ok=True)
+
+    def file_hash(self, file_path):
+        """Returns the content hash of a file.
+
+        The hash is remembered together with the size and modification time of the
+        file, so an unchanged export is not read again just to compute its key.
+
+        Args:
+            file_path (str): The path to the file.
+
+        Returns:
+            str: The hexadecimal BLAKE2b digest of the file.
+        """
+        stat = os.stat(file_path)
+        signature = f'{stat.st_size}:{stat.st_mtime_ns}'
+        abs_path = os.path.abspath(file_path)
+
+        # One memo file per source file, so processes hashing different files at the same
+        # time (e.g. the DatasetCatalog.prepare workers) never overwrite each other
+        memo_path = os.path.join(self._hashes_dir, hashlib.blake2b(abs_path.encode(), digest_size=16).hexdigest() + '.json')
+        if os.path.exists(memo_path):
+            with open(memo_path) as f:
+                known = json.load(f)
+            if known['path'] == abs_path and known['signature'] == signature:
+                return known['hash']
+
+        digest = hashlib.blake2b(digest_size=16)
+        with open(file_path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+        entry = {'path': abs_path, 'signature': signature, 'hash': digest.hexdigest()}
+
+        def write(tmp):
+            with open(tmp, 'w') as f:
+                json.dump(entry, f, indent=1)
+        PreprocessedCache._atomic_write(memo_path, write)
+        return entry['hash']
+
+    def _entry_path(self, stage, *file_paths):
+        """Builds the cache path of a stage from the hashes of its source files."""
+        stem = os.path.splitext(os.path.basename(file_paths[0]))[0]
+        key = '_'.join(self.file_hash(p)[:16] for p in file_paths)
+        version = CsvPreprocessingScaler.PREPROCESSING_VERSION
+        return os.path.join(self.cache_dir, f'{stem}_{stage}_{key}_v{version}.feather')
+
+    def _load_or_build(self, path, build):
+        """Loads a cached frame through a memory map, or builds and stores it if missing."""
+        if os.path.exists(path):
+            df = feather.read_table(path, memory_map=True).to_pandas()
+            return df.set_index(PreprocessedCache.INDEX_COL).rename_axis(None)
+
+        df = build()
+        # Feather stores only a default index: keep the exploded (duplicated) index as a column
+        stored = df.rename_axis(PreprocessedCache.INDEX_COL).reset_index()
+        PreprocessedCache._atomic_write(path, lambda tmp: stored.to_feather(tmp, compression='uncompressed'))
+        return df
+
+    @staticmethod
+    def _atomic_write(path, write):
+        """Writes to a temporary file and moves it in place, so readers never see partial files."""
+        tmp = f'{path}.{os.getpid()}.tmp'
+        write(tmp)
+        os.replace(tmp, path)
+
+    def raw(self, file_path):
+        """Returns the RawPreprocessing output of a CSV file, from the cache if available.
+
+        Args:
+            file_path (str): The path to the Splunk export.
+
+        Returns:
+            pandas.DataFrame: The raw-preprocessed DataFrame.
+        """
+        path = self._entry_path('raw', file_path)
+        return self._load_or_build(path, lambda: CsvPreprocessingScaler.RawPreprocessing(
+            CsvPreprocessingScaler.read_csv_file(file_path)))
+
+    def labeled(self, file_path, run_log_path):
+        """Returns the raw output labeled with the attacks of a run log, from the cache if available.
+
+        Args:
+            file_path (str): The path to the Splunk export.
+            run_log_path (str): The path to the run log CSV file.
+
+        Returns:
+            pandas.DataFrame: The raw-preprocessed DataFrame with 'corrisponde_ad_attacco'
+            and 'codice_attacco'.
+        """
+        path = self._entry_path('labeled', file_path, run_log_path)
+        return self._load_or_build(path, lambda: RunLogParser.process_attacks(run_log_path, self.raw(file_path)))
+
+    def has_labeled(self, file_path, run_log_path):
+        """Tells whether the labeled output of an export and a run log is already cached.
+
+        Args:
+            file_path (str): The path to the Splunk export.
+            run_log_path (str): The path to the run log CSV file.
+
+        Returns:
+            bool: True if labeled() would read the frame from the cache.
+        """
+        return os.path.exists(self._entry_path('labeled', file_path, run_log_path))
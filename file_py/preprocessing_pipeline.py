@@ -0,0 +1,149 @@
+from .lib import *
+from .csv_preprocessing_scaler import CsvPreprocessingScaler
+from .run_log_parser import RunLogParser
+from .category_vocabulary import CategoryVocabulary
+
+class PreprocessingPipeline:
+    """Runs RawPreprocessing once and derives every other view from it lazily.
+
+    The raw stage (null-count drop, '_time' conversion, MITRE id split and explode)
+    is executed only the first time a view needs it; the Label-Encoded, One-Hot and
+    scaled views are computed on first access and cached, as well as their
+    attack-labeled versions. The time spent in every stage is recorded.
+    The returned frames are shared with the cache: copy them before modifying.
+
+    Attributes:
+        df (pandas.DataFrame): The DataFrame read from the Splunk export.
+        run_log_path (str): The path to the run log CSV file, used by labeled().
+        preprocessor (type): CsvPreprocessingScaler or CsvPreprocessingScalerFull.
+        timings (dict): Seconds spent in every executed stage.
+
+    Methods:
+        from_cache(cache, file_path, run_log_path): Builds a pipeline loading the raw stages from a PreprocessedCache.
+        raw: The RawPreprocessing view.
+        categorical: The raw view with the text columns as categoricals of the shared vocabulary.
+        le: The Label-Encoded view.
+        ohe: The One-Hot encoded view.
+        std_le: The scaled Label-Encoded view.
+        std_ohe: The scaled One-Hot encoded view.
+        ohe_sparse: The One-Hot encoded view with sparse dummy columns.
+        std_ohe_sparse: The sparse One-Hot encoded view scaled with stdScalerSparse.
+        labeled(view): The given view labeled with the attacks of the run log.
+        report_timings(): Prints and returns the time spent in every stage.
+    """
+
+    VIEWS = ('raw', 'categorical', 'le', 'ohe', 'std_le', 'std_ohe', 'ohe_sparse', 'std_ohe_sparse')
+
+    def __init__(self, df, run_log_path=None, preprocessor=CsvPreprocessingScaler, vocabulary=None):
+        """Initializes the pipeline without running any stage.
+
+        Args:
+            df (pandas.DataFrame): The DataFrame read from the Splunk export.
+            run_log_path (str): The path to the run log CSV file.
+            preprocessor (type): The class providing RawPreprocessing, LEEncoding,
+                OheEncoding, stdScaler and stdScalerSparse.
+            vocabulary (CategoryVocabulary): The shared vocabulary used by the
+                categorical view (a new in-memory one if not given).
+        """
+        self.df = df
+        self.run_log_path = run_log_path
+        self.preprocessor = preprocessor
+        self.vocabulary = vocabulary if vocabulary is not None else CategoryVocabulary()
+        self.timings = {}
+        self._cache = {}
+
+    @classmethod
+    def from_cache(cls, cache, file_path, run_log_path=None):
+        """Builds a pipeline whose raw and labeled raw stages come from a PreprocessedCache.
+
+        Args:
+            cache (PreprocessedCache): The on-disk cache of preprocessed frames.
+            file_path (str): The path to the Splunk export.
+            run_log_path (str): The path to the run log CSV file.
+
+        Returns:
+            PreprocessingPipeline: The pipeline, with the cached stages already loaded.
+        """
+        pipeline = cls(None, run_log_path)
+        pipeline._stage('raw', lambda: cache.raw(file_path))
+        if run_log_path is not None:
+            pipeline._stage('labeled_raw', lambda: cache.labeled(file_path, run_log_path))
+        return pipeline
+
+    def _stage(self, name, func):
+        """Returns the cached result of a stage, running and timing it the first time."""
+        if name not in self._cache:
+            start = time.perf_counter()
+            self._cache[name] = func()
+            self.timings[name] = time.perf_counter() - start
+        return self._cache[name]
+
+    @property
+    def raw(self):
+        return self._stage('raw', lambda: self.preprocessor.RawPreprocessing(self.df))
+
+    @property
+    def categorical(self):
+        raw = self.raw
+        return self._stage('categorical', lambda: self.vocabulary.encode(raw))
+
+    @property
+    def le(self):
+        raw = self.raw
+        return self._stage('le', lambda: self.preprocessor.LEEncoding(raw))
+
+    @property
+    def ohe(self):
+        raw = self.raw
+        return self._stage('ohe', lambda: self.preprocessor.OheEncoding(raw))
+
+    @property
+    def std_le(self):
+        le = self.le
+        return self._stage('std_le', lambda: self.preprocessor.stdScaler(le))
+
+    @property
+    def std_ohe(self):
+        ohe = self.ohe
+        return self._stage('std_ohe', lambda: self.preprocessor.stdScaler(ohe))
+
+    @property
+    def ohe_sparse(self):
+        raw = self.raw
+        return self._stage('ohe_sparse', lambda: self.preprocessor.OheEncoding(raw, sparse=True))
+
+    @property
+    def std_ohe_sparse(self):
+        ohe_sparse = self.ohe_sparse
+        return self._stage('std_ohe_sparse', lambda: self.preprocessor.stdScalerSparse(ohe_sparse))
+
+    def labeled(self, view='raw'):
+        """Returns a view labeled with the attacks of the run log.
+
+        Args:
+            view (str): One of VIEWS.
+
+        Returns:
+            pandas.DataFrame: The view with 'corrisponde_ad_attacco' and 'codice_attacco'.
+        """
+        if view not in self.VIEWS:
+            raise ValueError(f"Unknown view {view!r}, expected one of {self.VIEWS}")
+        if self.run_log_path is None:
+            raise ValueError("A run_log_path is required to label the attacks")
+        if f'labeled_{view}' in self._cache:
+            return self._cache[f'labeled_{view}']
+        frame = getattr(self, view)
+        attacks = self._stage('run_log', lambda: RunLogParser.parse_run_log(self.run_log_path))
+        return self._stage(f'labeled_{view}', lambda: RunLogParser.label_attacks(attacks, frame))
+
+    def report_timings(self):
+        """Prints and returns the time spent in every executed stage.
+
+        Returns:
+            pandas.DataFrame: One row per stage with the elapsed seconds.
+        """
+        report = pd.DataFrame({'stage': list(self.timings), 'seconds': list(self.timings.values())})
+        for stage, seconds in self.timings.items():
+            print(f'{stage}: {seconds:.2f}s')
+        print(f'Total: {sum(self.timings.values()):.2f}s')
+        return report
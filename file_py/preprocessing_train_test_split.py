@@ -1,4 +1,5 @@
 from .lib import *
+from .csv_preprocessing_scaler import CsvPreprocessingScaler
 
 class PreprocessingTrainTestSplit:
     """
@@ -18,20 +19,95 @@ class PreprocessingTrainTestSplit:
         df['_time'] = (df['_time'].astype(np.int64) // 10**9).astype(int)
         return df
 
-    def split_data(df, target_column, test_size=0.25, random_state=42):
+    STRATEGIES = ('random', 'time', 'attack')
+
+    def split_data(df, target_column, test_size=0.25, random_state=42, sparse=False, strategy='random'):
         """
         Splits the preprocessed DataFrame into features (X) and target (y) and then into training and testing sets.
 
+        Strategies:
+        - 'random': events shuffled at random (neighbouring events of the same attack window end up
+          in both sets, so the scores are optimistic).
+        - 'time': the last test_size fraction of the events, in chronological order, is the test set;
+          the training events of the stretch (see attack_stretches) that continues in the test set are dropped.
+        - 'attack': the contiguous stretches of events inside the same attack window (or between two
+          windows) are kept together and test_size of the stretches go to the test set.
+
         Parameters:
         - df: DataFrame, preprocessed data
         - target_column: str, name of the target column
         - test_size: float, optional (default=0.25), proportion of the dataset to include in the test split
         - random_state: int, optional (default=42), random state for reproducibility
+        - sparse: bool, optional (default=False), if True X is returned as a scipy CSR matrix
+          (for the sparse One-Hot encoding)
+        - strategy: str, optional (default='random'), 'random', 'time' or 'attack'
         
         Returns:
         - X_train, X_test, y_train, y_test: arrays, training and testing data
         """
+        if strategy not in PreprocessingTrainTestSplit.STRATEGIES:
+            raise ValueError(f"Unknown strategy {strategy!r}, expected one of {PreprocessingTrainTestSplit.STRATEGIES}")
+        if strategy != 'random':
+            train, test = PreprocessingTrainTestSplit.split_positions(df, strategy, test_size, random_state)
+
         df = PreprocessingTrainTestSplit.preprocess_data(df)
-        X = df.drop(target_column, axis=1)
+        # 'codice_attacco' is the matched attack of the run log: a copy of the target, not a feature
+        X = df.drop(columns=[target_column, 'codice_attacco'], errors='ignore')
         y = df[target_column]
-        return train_test_split(X, y, test_size=test_size, random_state=random_state)
\ No newline at end of file
+        if sparse:
+            X = CsvPreprocessingScaler.to_csr(X)
+        if strategy == 'random':
+            return train_test_split(X, y, test_size=test_size, random_state=random_state)
+
+        X_train, X_test = (X[train], X[test]) if sparse else (X.iloc[train], X.iloc[test])
+        return X_train, X_test, y.iloc[train], y.iloc[test]
+
+    def attack_stretches(df, time_column='_time', code_column='codice_attacco'):
+        """
+        Numbers the contiguous stretches of events, in chronological order, inside the same attack
+        window or between two windows.
+
+        Parameters:
+        - df: DataFrame, data labeled with the attack code column
+        - time_column: str, name of the timestamp column
+        - code_column: str, name of the column with the code of the matched attack
+
+        Returns:
+        - stretches: numpy.ndarray, the stretch of every row, in the original row order
+        """
+        if code_column not in df.columns:
+            raise ValueError(f"The '{code_column}' column is needed to group the events by attack window")
+        order = np.argsort(df[time_column].to_numpy(), kind='stable')
+        codes = df[code_column].fillna('').to_numpy()[order]
+        stretches = np.empty(len(df), dtype=np.int64)
+        stretches[order] = np.concatenate([[0], np.cumsum(codes[1:] != codes[:-1])])[:len(df)]
+        return stretches
+
+    def split_positions(df, strategy, test_size=0.25, random_state=42, time_column='_time', code_column='codice_attacco'):
+        """
+        Returns the positions of the training and testing rows of a 'time' or 'attack' split.
+
+        Parameters:
+        - df: DataFrame, data labeled with the attack columns
+        - strategy: str, 'time' or 'attack'
+        - test_size: float, proportion of the events ('time') or of the stretches ('attack') in the test set
+        - random_state: int, random state of the 'attack' split
+        - time_column: str, name of the timestamp column
+        - code_column: str, name of the column with the code of the matched attack
+
+        Returns:
+        - train, test: numpy.ndarray, positions of the training and testing rows
+        """
+        if strategy == 'attack':
+            stretches = PreprocessingTrainTestSplit.attack_stretches(df, time_column, code_column)
+            splitter = GroupShuffleSplit(n_splits=1, test_size=test_size, random_state=random_state)
+            return next(splitter.split(np.zeros(len(df)), groups=stretches))
+
+        order = np.argsort(df[time_column].to_numpy(), kind='stable')
+        cut = int(round(len(df) * (1 - test_size)))
+        train, test = order[:cut], order[cut:]
+        if code_column in df.columns:
+            # Purge the training events of the stretch that continues in the test set
+            stretches = PreprocessingTrainTestSplit.attack_stretches(df, time_column, code_column)
+            train = train[~np.isin(stretches[train], stretches[test])]
+        return np.sort(train), np.sort(test)
@@ -0,0 +1,144 @@
+from .lib import *
+from .csv_preprocessing_scaler import CsvPreprocessingScaler
+from .run_log_parser import RunLogParser
+from .fitted_preprocessor import FittedPreprocessor
+from .initial_training import InitialTraining
+from .preprocessing_train_test_split import PreprocessingTrainTestSplit
+
+class RollingOriginEvaluation:
+    """Evaluates models on later days after training them only on earlier days.
+
+    With the days 12_06, 19_06 and 24_06 the folds are: train on 12_06 and test on
+    19_06, then train on 12_06 + 19_06 and test on 24_06. No event of a test day, nor
+    of its attack windows, is ever seen during training, so the scores show how a
+    model would behave on a new run.
+
+    Every day is preprocessed and labeled once. By default the FittedPreprocessor is
+    fitted once on the training days of the first fold and reused by all the later
+    folds (values never seen go to its "unseen" bucket), so every day is also encoded
+    and scaled only once.
+
+    Attributes:
+        days (list): The (Splunk export, run log) pairs, in chronological order.
+        encoding (str): 'le' or 'ohe', as in FittedPreprocessor.
+        cache (PreprocessedCache): Optional cache of the preprocessed and labeled days.
+        drop_time (bool): Whether '_time' is removed from the features.
+
+    Methods:
+        labeled(day): Returns the preprocessed and labeled events of a day.
+        folds(min_train_days): Returns the (training days, test day) of every fold.
+        evaluate(models, min_train_days, refit_preprocessor): Trains and tests every model on every fold.
+    """
+
+    TARGET = 'corrisponde_ad_attacco'
+
+    def __init__(self, days, encoding='le', cache=None, drop_time=True):
+        """Initializes the evaluation.
+
+        Args:
+            days (list): The (Splunk export, run log) pairs, in chronological order, e.g.
+                [('file_csv/LogSplunkWF_12_06.csv', 'file_csv/attackLog_12_06.csv'), ...].
+            encoding (str): 'le' or 'ohe', as in FittedPreprocessor.
+            cache (PreprocessedCache): Optional cache of the preprocessed and labeled days.
+            drop_time (bool): Whether '_time' is removed from the features. The absolute time of
+                a later day is outside the range of every training day, so it cannot generalize.
+        """
+        self.days = list(days)
+        self.encoding = encoding
+        self.cache = cache
+        self.drop_time = drop_time
+        self._labeled = {}
+        self._features = {}
+
+    def day_name(self, day):
+        """Returns the name of a day, from the file name of its Splunk export."""
+        return os.path.splitext(os.path.basename(self.days[day][0]))[0]
+
+    def labeled(self, day):
+        """Returns the preprocessed events of a day labeled with its run log (computed once).
+
+        Args:
+            day (int): The position of the day in days.
+
+        Returns:
+            pandas.DataFrame: The RawPreprocessing output with 'corrisponde_ad_attacco' and 'codice_attacco'.
+        """
+        if day not in self._labeled:
+            file_path, run_log_path = self.days[day]
+            if self.cache is not None:
+                self._labeled[day] = self.cache.labeled(file_path, run_log_path)
+            else:
+                raw = CsvPreprocessingScaler.RawPreprocessing(CsvPreprocessingScaler.read_csv_file(file_path))
+                self._labeled[day] = RunLogParser.label_attacks(RunLogParser.parse_run_log(run_log_path), raw)
+        return self._labeled[day]
+
+    def folds(self, min_train_days=1):
+        """Returns the folds: every day after the first min_train_days is tested on all the days before it.
+
+        Args:
+            min_train_days (int): The number of days of the first training set.
+
+        Returns:
+            list: The (list of training days, test day) of every fold.
+        """
+        return [(list(range(test)), test) for test in range(min_train_days, len(self.days))]
+
+    def _xy(self, preprocessor, day):
+        """Returns the features and the target of a day, encoded once with the current preprocessor."""
+        if day not in self._features:
+            df = self.labeled(day)
+            X = preprocessor.transform(df[CsvPreprocessingScaler.RAW_COLUMNS])
+            X = X.drop(columns='_time') if self.drop_time else PreprocessingTrainTestSplit.preprocess_data(X)
+            self._features[day] = (X, df[RollingOriginEvaluation.TARGET].to_numpy())
+        return self._features[day]
+
+    def evaluate(self, models=None, min_train_days=1, refit_preprocessor=False):
+        """Trains and tests every model on every fold.
+
+        Args:
+            models (dict): The untrained models by name (default: InitialTraining.initial_models()).
+            min_train_days (int): The number of days of the first training set.
+            refit_preprocessor (bool): Whether to fit a new FittedPreprocessor on the training days of
+                every fold instead of reusing the one fitted on the first fold.
+
+        Returns:
+            pandas.DataFrame: One row per fold and model with the training and test days, precision,
+            recall, F1-score, ROC AUC and the fit and predict seconds.
+        """
+        models = models if models is not None else InitialTraining.initial_models()
+        results = []
+        preprocessor = None
+        for train_days, test_day in self.folds(min_train_days):
+            if preprocessor is None or refit_preprocessor:
+                train_df = pd.concat([self.labeled(day)[CsvPreprocessingScaler.RAW_COLUMNS] for day in train_days])
+                preprocessor = FittedPreprocessor(self.encoding).fit(train_df)
+                self._features = {}  # Encoded with the previous preprocessor
+
+            parts = [self._xy(preprocessor, day) for day in train_days]
+            X_train = pd.concat([X for X, _ in parts])
+            y_train = np.concatenate([y for _, y in parts])
+            X_test, y_test = self._xy(preprocessor, test_day)
+
+            for name, model in models.items():
+                model = clone(model)
+                fit_start = time.perf_counter()
+                model.fit(X_train, y_train)
+                predict_start = time.perf_counter()
+                y_pred = model.predict(X_test)
+                predict_end = time.perf_counter()
+                try:
+                    auc = roc_auc_score(y_test, model.predict_proba(X_test)[:, 1])
+                except (AttributeError, ValueError):
+                    auc = np.nan  # No probabilities, or a single class in the test day
+                results.append({
+                    'train_days': ' + '.join(self.day_name(day) for day in train_days),
+                    'test_day': self.day_name(test_day),
+                    'model': name,
+                    'precision': precision_score(y_test, y_pred, zero_division=0),
+                    'recall': recall_score(y_test, y_pred, zero_division=0),
+                    'f1': f1_score(y_test, y_pred, zero_division=0),
+                    'roc_auc': auc,
+                    'fit_seconds': predict_start - fit_start,
+                    'predict_seconds': predict_end - predict_start,
+                })
+        return pd.DataFrame(results)
@@ -0,0 +1,92 @@
+from .lib import *
+
+class RuleIndex:
+    """
+    Indice delle attivazioni di ogni regola, costruito una sola volta dal DataFrame etichettato.
+
+    Per ogni regola conserva le posizioni delle sue righe, divise in attacchi e non-attacchi,
+    sia nell'ordine originale del DataFrame sia in quello cronologico. In questo modo analizzare
+    una regola, o tutte le regole una dopo l'altra, costa un tempo proporzionale alle sue
+    attivazioni invece di una scansione completa del DataFrame per ogni regola.
+
+    Attributi:
+        df: Il DataFrame originale.
+        sorted_df: Il DataFrame ordinato per tempo, come in PlotsSingleAttack.preceding_events.
+        rules: Le regole presenti, nell'ordine di prima apparizione.
+
+    Metodi:
+        positions(rule, attack=None, chronological=False):
+            Posizioni delle attivazioni della regola (tutte, solo attacchi o solo non-attacchi).
+        frame(rule, attack=None):
+            Righe del DataFrame originale relative alla regola.
+    """
+
+    def __init__(self, df, rule_col='signature', time_col='_time', attack_col='corrisponde_ad_attacco'):
+        """
+        Costruisce l'indice.
+
+        Args:
+        df: DataFrame etichettato con la colonna degli attacchi.
+        rule_col: Nome della colonna che contiene l'ID della regola.
+        time_col: Nome della colonna che contiene il timestamp.
+        attack_col: Nome della colonna che indica se l'attivazione corrisponde a un attacco reale.
+        """
+        self.df = df
+        self.sorted_df = df.sort_values(by=time_col)
+        self.rule_col = rule_col
+        self.attack_col = attack_col
+
+        self._original = RuleIndex._group(df[rule_col], (df[attack_col] == 1).to_numpy(dtype=bool))
+        self._chronological = RuleIndex._group(self.sorted_df[rule_col], (self.sorted_df[attack_col] == 1).to_numpy(dtype=bool))
+        self.rules = list(self._original)
+
+    @staticmethod
+    def _group(values, is_attack):
+        """Raggruppa le posizioni per valore con un unico ordinamento stabile, separando attacchi e non-attacchi."""
+        codes, uniques = pd.factorize(values)
+        order = np.argsort(codes, kind='stable')
+        order = order[codes[order] >= 0]  # Esclude i valori nulli
+        bounds = np.concatenate([[0], np.cumsum(np.bincount(codes[order], minlength=len(uniques)))])
+
+        groups = {}
+        for i, rule in enumerate(uniques):
+            positions = order[bounds[i]:bounds[i + 1]]
+            attack = is_attack[positions]
+            groups[rule] = {None: positions, True: positions[attack], False: positions[~attack]}
+        return groups
+
+    def __contains__(self, rule):
+        return rule in self._original
+
+    def __len__(self):
+        return len(self.rules)
+
+    def positions(self, rule, attack=None, chronological=False):
+        """
+        Restituisce le posizioni (crescenti) delle attivazioni di una regola.
+
+        Args:
+        rule: La regola.
+        attack: None per tutte le attivazioni, True solo per gli attacchi, False solo per i non-attacchi.
+        chronological: Se True le posizioni si riferiscono a sorted_df, altrimenti a df.
+
+        Returns:
+        numpy.ndarray: Le posizioni, vuoto se la regola non è presente.
+        """
+        groups = self._chronological if chronological else self._original
+        if rule not in groups:
+            return np.array([], dtype=np.intp)
+        return groups[rule][attack]
+
+    def frame(self, rule, attack=None):
+        """
+        Restituisce le righe del DataFrame originale relative a una regola, nell'ordine originale.
+
+        Args:
+        rule: La regola.
+        attack: None per tutte le attivazioni, True solo per gli attacchi, False solo per i non-attacchi.
+
+        Returns:
+        DataFrame: Le righe della regola.
+        """
+        return self.df.iloc[self.positions(rule, attack)]
@@ -0,0 +1,69 @@
+from .lib import *
+
+class RuleScorecard:
+    """
+    The RuleScorecard class builds, with a single groupby, one table with the statistics of every rule:
+    total activations, true positives (activations during an attack), false positives, precision,
+    recall and the class of the rule. The Markdown description, the precision/recall chart and the
+    top 10 charts all read from this table.
+
+    Classes:
+        'generic': the rule responded to attacks, but more often to non-attacks.
+        'specific': the rule responded more often to attacks than to non-attacks.
+        'equal': the rule responded the same number of times to attacks and non-attacks.
+        'non_attack': the rule never responded to an attack.
+
+    Methods:
+        build(df):
+            Builds the scorecard of every rule.
+
+        top(scorecard, column, n):
+            Returns the n rules with the highest value in a column of the scorecard.
+    """
+
+    def build(df, rule_col='signature', attack_col='corrisponde_ad_attacco'):
+        """
+        Builds the scorecard of every rule.
+
+        Args:
+            df (DataFrame): The DataFrame labeled with the attack column.
+            rule_col (str): The name of the column with the rule.
+            attack_col (str): The name of the column with 1 for attacks and 0 for non-attacks.
+
+        Returns:
+            DataFrame: One row per rule with the columns 'signature', 'total', 'true_positives',
+            'false_positives', 'precision', 'recall' and 'class'.
+        """
+        scorecard = df.groupby(rule_col, observed=True)[attack_col].agg(
+            total='count',
+            true_positives='sum'
+        ).reset_index()
+        scorecard = scorecard.rename(columns={rule_col: 'signature'})
+        scorecard['true_positives'] = scorecard['true_positives'].astype(np.int64)
+
+        scorecard['false_positives'] = scorecard['total'] - scorecard['true_positives']
+        scorecard['precision'] = scorecard['true_positives'] / scorecard['total']
+        scorecard['recall'] = scorecard['true_positives'] / scorecard['true_positives'].sum()
+
+        tp, fp = scorecard['true_positives'], scorecard['false_positives']
+        scorecard['class'] = np.select(
+            [tp == 0, tp < fp, tp > fp],
+            ['non_attack', 'generic', 'specific'],
+            default='equal'
+        )
+        return scorecard
+
+    def top(scorecard, column, n=10):
+        """
+        Returns the n rules with the highest value in a column of the scorecard.
+
+        Args:
+            scorecard (DataFrame): The table returned by build.
+            column (str): The column to sort by (e.g. 'total', 'true_positives', 'false_positives').
+            n (int): The number of rules.
+
+        Returns:
+            DataFrame: The 'Signature' and 'Frequency' of the top rules, only for values greater than 0.
+        """
+        top = scorecard[scorecard[column] > 0].sort_values(column, ascending=False, kind='stable').head(n)
+        return pd.DataFrame({'Signature': top['signature'].to_numpy(), 'Frequency': top[column].to_numpy()})
@@ -11,7 +11,9 @@ class RunLogParser:
 
     Methods:
         parse_run_log(file_path): Parses a run log CSV file and returns a list of attacks.
+        assign_attack_windows(times, attacks): Assigns every event time to its attack window.
         process_attacks(file_path, df): Processes attacks and updates a DataFrame accordingly.
+        label_attacks(attacks, df): Labels a DataFrame with already parsed attacks.
     """
 
     @staticmethod
@@ -38,6 +40,53 @@ class RunLogParser:
                 attacks.append(attack)
         return attacks
 
+    @staticmethod
+    def assign_attack_windows(times, attacks):
+        """Assigns every event time to the attack window that contains it.
+
+        The windows are sorted once and split into elementary segments, so that
+        every event is labeled with a single binary search instead of one full
+        mask per attack. Boundaries are inclusive on both sides; when windows
+        overlap, the attack that comes last in the run log wins, exactly as in
+        the previous per-attack loop.
+
+        Args:
+            times (pandas.Series): The event timestamps.
+            attacks (list): The attacks returned by parse_run_log.
+
+        Returns:
+            tuple: A numpy array with 1 for events inside a window and 0 otherwise,
+            and a numpy object array with the matched 'codice_attacco' (NaN if none).
+        """
+        times = pd.DatetimeIndex(times)
+        flags = np.zeros(len(times), dtype=np.int64)
+        codes = np.full(len(times), np.nan, dtype=object)
+        if not attacks:
+            return flags, codes
+
+        tz_aware = attacks[0]['data_inizio'].tzinfo is not None
+        starts = pd.DatetimeIndex(pd.to_datetime([a['data_inizio'] for a in attacks], utc=tz_aware)).as_unit('ns')
+        # Inclusive end: with nanosecond timestamps 'end + 1ns' is the first excluded instant
+        stops = pd.DatetimeIndex(pd.to_datetime([a['data_fine'] for a in attacks], utc=tz_aware)).as_unit('ns') + pd.Timedelta(1, 'ns')
+        if times.tz is not None:
+            times = times.tz_convert('UTC')
+        times = times.as_unit('ns')
+
+        # Elementary segments [breakpoints[k], breakpoints[k + 1]) are covered by a fixed set of windows
+        breakpoints = starts.append(stops).unique().sort_values()
+        bp = breakpoints.asi8
+        covered = (starts.asi8[:, None] <= bp[None, :]) & (bp[None, :] < stops.asi8[:, None])
+        order = np.arange(len(attacks))[:, None]
+        segment_winner = np.where(covered, order, -1).max(axis=0)
+
+        segment = breakpoints.searchsorted(times, side='right') - 1
+        winner = np.where(segment >= 0, segment_winner[np.clip(segment, 0, None)], -1)
+        matched = winner >= 0
+
+        flags[matched] = 1
+        codes[matched] = np.array([a['codice_attacco'] for a in attacks], dtype=object)[winner[matched]]
+        return flags, codes
+
     @staticmethod
     def process_attacks(file_path, df):
         """Processes attacks and updates a DataFrame accordingly.
@@ -47,21 +96,26 @@ class RunLogParser:
             df (pandas.DataFrame): The DataFrame to be updated.
 
         Returns:
-            pandas.DataFrame: The updated DataFrame.
+            pandas.DataFrame: The updated DataFrame, with the 'corrisponde_ad_attacco'
+            flag and the matched 'codice_attacco'.
+        """
+        return RunLogParser.label_attacks(RunLogParser.parse_run_log(file_path), df)
+
+    @staticmethod
+    def label_attacks(attacks, df):
+        """Labels a DataFrame with attacks already parsed by parse_run_log.
+
+        Args:
+            attacks (list): The attacks returned by parse_run_log.
+            df (pandas.DataFrame): The DataFrame to be updated.
+
+        Returns:
+            pandas.DataFrame: A copy of the DataFrame with the 'corrisponde_ad_attacco'
+            flag and the matched 'codice_attacco'.
         """
-        attacks = RunLogParser.parse_run_log(file_path)
         df_result = df.copy()
-        df_result['corrisponde_ad_attacco'] = 0
-        
-        for attack in attacks:
-            codice_attacco = attack['codice_attacco']
-            data_inizio = attack['data_inizio']
-            data_fine = attack['data_fine']
-            
-            mask = (df_result['_time'] >= data_inizio) & (df_result['_time'] <= data_fine)
-            df_result.loc[mask, 'corrisponde_ad_attacco'] = 1
-            df_result.loc[mask, 'codice_attacco'] = codice_attacco
-        
-        df_result.drop(columns=['codice_attacco'], inplace=True)
-        
+        flags, codes = RunLogParser.assign_attack_windows(df_result['_time'], attacks)
+        df_result['corrisponde_ad_attacco'] = flags
+        df_result['codice_attacco'] = codes
+
         return df_result
\ No newline at end of file
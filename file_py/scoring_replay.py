@@ -0,0 +1,126 @@
+from .lib import *
+from .csv_preprocessing_scaler import CsvPreprocessingScaler
+
+class ScoringReplay:
+    """Replays a Splunk export from file_csv against the scoring service, to measure its throughput.
+
+    The events are read in chunks (only RAW_COLUMNS) and sent in requests of batch_size
+    events, either to a running service over HTTP or to a ScoringService in the same
+    process, optionally paced at a fixed rate of events per second.
+
+    Methods:
+        replay(file_path, url=None, service=None, batch_size=100, rate=None, concurrency=4, output_path=None):
+            Sends the export to the service and returns the throughput and latency of the replay.
+    """
+
+    @staticmethod
+    def _events(file_path, batch_size):
+        """Yields the raw events of an export in lists of batch_size dictionaries."""
+        for chunk in pd.read_csv(file_path, usecols=CsvPreprocessingScaler.RAW_COLUMNS, chunksize=batch_size):
+            yield json.loads(chunk.to_json(orient='records'))
+
+    @staticmethod
+    def _post(url, events):
+        """Sends one request to the HTTP service and returns its probabilities."""
+        request = urllib.request.Request(url, data=json.dumps(events).encode(),
+                                         headers={'Content-Type': 'application/json'})
+        with urllib.request.urlopen(request) as response:
+            return json.loads(response.read())['probabilities']
+
+    @staticmethod
+    def replay(file_path, url=None, service=None, batch_size=100, rate=None, concurrency=4, output_path=None):
+        """Sends a Splunk export to the scoring service.
+
+        Args:
+            file_path (str): The Splunk export (e.g. 'file_csv/LogSplunkWF_24_06.csv').
+            url (str): The POST /score endpoint of a running service.
+            service (ScoringService): A service in the same process, used when url is None.
+            batch_size (int): The number of events per request.
+            rate (float): The events per second to send; None sends as fast as possible.
+            concurrency (int): The requests in flight at the same time; over HTTP, also the
+                number of threads sending them.
+            output_path (str): If given, the probabilities are written to this CSV file as
+                they come in, in the order of the events.
+
+        Returns:
+            dict: The replayed events, the seconds, the events per second and the
+            request latency percentiles in milliseconds.
+        """
+        if url is None and service is None:
+            raise ValueError("Either url or service must be given")
+
+        executor = ThreadPoolExecutor(max_workers=concurrency) if url is not None else None
+        output = open(output_path, 'w') if output_path is not None else None
+        if output is not None:
+            output.write('probability\n')
+
+        latencies = []
+
+        def send(events):
+            sent = time.perf_counter()
+            if executor is not None:
+                future = executor.submit(ScoringReplay._post, url, events)
+            else:
+                future = service.submit(events)
+            # The latency is taken when the request completes, not when it is collected;
+            # done is set after it has been recorded, as callbacks run after result() wakes up
+            done = threading.Event()
+
+            def completed(future):
+                latencies.append(time.perf_counter() - sent)
+                done.set()
+
+            future.add_done_callback(completed)
+            return future, done
+
+        def collect(request):
+            future, done = request
+            done.wait()
+            probabilities = future.result()
+            if output is not None:
+                pd.DataFrame({'probability': probabilities}).to_csv(output, header=False, index=False)
+            return len(probabilities)
+
+        start = time.perf_counter()
+        pending, events_sent, events_scored = collections.deque(), 0, 0
+        try:
+            for events in ScoringReplay._events(file_path, batch_size):
+                if rate:
+                    delay = start + events_sent / rate - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+                # At most concurrency requests outstanding: wait on the oldest before sending more
+                if len(pending) >= concurrency:
+                    events_scored += collect(pending.popleft())
+                pending.append(send(events))
+                events_sent += len(events)
+            while pending:
+                events_scored += collect(pending.popleft())
+            elapsed = time.perf_counter() - start
+        finally:
+            if executor is not None:
+                executor.shutdown()
+            if output is not None:
+                output.close()
+
+        latencies = np.array(latencies) * 1000
+        return {
+            'events': events_scored,
+            'seconds': elapsed,
+            'events_per_second': events_scored / elapsed if elapsed else 0.0,
+            'latency_ms_p50': float(np.percentile(latencies, 50)) if len(latencies) else 0.0,
+            'latency_ms_p95': float(np.percentile(latencies, 95)) if len(latencies) else 0.0,
+        }
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Replays a Splunk export against the scoring service.')
+    parser.add_argument('file_path', help='Splunk export, e.g. file_csv/LogSplunkWF_24_06.csv')
+    parser.add_argument('--url', default='http://127.0.0.1:8765/score')
+    parser.add_argument('--batch-size', type=int, default=100)
+    parser.add_argument('--rate', type=float, default=None, help='Events per second')
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--output', default=None, help='CSV file for the probabilities')
+    args = parser.parse_args()
+
+    print(json.dumps(ScoringReplay.replay(args.file_path, url=args.url, batch_size=args.batch_size, rate=args.rate,
+                                          concurrency=args.concurrency, output_path=args.output), indent=1))
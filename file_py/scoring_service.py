@@ -0,0 +1,279 @@
+from .lib import *
+from .csv_preprocessing_scaler import CsvPreprocessingScaler
+from .fitted_preprocessor import FittedPreprocessor
+from .preprocessing_train_test_split import PreprocessingTrainTestSplit
+
+class ScoringService:
+    """A long-running local process that scores raw Splunk events with a saved model.
+
+    Events are collected into micro-batches: a batch is scored as soon as it holds
+    batch_size events, or flush_interval seconds after its first event arrived, so the
+    wait of an event in the queue is bounded while concurrent requests share batches.
+    Every event goes through RawRowsPreprocessing, the saved FittedPreprocessor and
+    the same '_time' conversion used by PreprocessingTrainTestSplit; an event with
+    several MITRE ids is exploded in several rows and gets the highest probability.
+
+    Attributes:
+        model: The trained model (scikit-learn/XGBClassifier, xgboost Booster or Keras model).
+        preprocessor (FittedPreprocessor): The preprocessing fitted on the training data.
+        batch_size (int): The maximum number of events scored together.
+        flush_interval (float): The maximum seconds an event waits for its batch to fill.
+
+    Methods:
+        load(model_path, preprocessor_path): Builds a service from saved files.
+        score(events): Scores a list of raw events immediately.
+        submit(events): Queues raw events and returns a Future with their probabilities.
+        metrics(): Returns the throughput and latency metrics.
+        serve_stdin(): Scores JSON lines from stdin, writing one JSON line per event.
+        serve_http(host, port): Serves POST /score and GET /metrics.
+    """
+
+    def __init__(self, model, preprocessor, batch_size=256, flush_interval=0.05):
+        self.model = model
+        self.preprocessor = preprocessor
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._started = time.perf_counter()
+        self._events = 0
+        self._batches = 0
+        self._scoring_seconds = 0.0
+        self._latencies = collections.deque(maxlen=10_000)
+
+        self._worker = threading.Thread(target=self._run, daemon=True)
+        self._worker.start()
+
+    @staticmethod
+    def load_model(path):
+        """Loads a model saved by joblib (.joblib/.pkl), xgboost (.json/.ubj) or Keras (.keras/.h5)."""
+        extension = os.path.splitext(path)[1].lower()
+        if extension in ('.json', '.ubj'):
+            return xgb.Booster(model_file=path)
+        if extension in ('.keras', '.h5'):
+            return load_model(path)
+        return joblib.load(path)
+
+    @classmethod
+    def load(cls, model_path, preprocessor_path, **kwargs):
+        """Builds a service from a saved model and a saved FittedPreprocessor."""
+        return cls(ScoringService.load_model(model_path), FittedPreprocessor.load(preprocessor_path), **kwargs)
+
+    def _predict_proba(self, X):
+        """Returns the attack probability of every row, whatever the kind of model."""
+        if hasattr(self.model, 'predict_proba'):
+            return self.model.predict_proba(X)[:, 1]
+        if isinstance(self.model, xgb.Booster):
+            return self.model.predict(xgb.DMatrix(X))
+        return np.ravel(self.model.predict(np.asarray(X, dtype=np.float32), verbose=0))
+
+    def score(self, events):
+        """Scores a list of raw events immediately.
+
+        Args:
+            events (list): The raw Splunk events, as dictionaries of column: value.
+
+        Returns:
+            list: The attack probability of every event, in the same order.
+        """
+        if not events:
+            return []
+        df = pd.DataFrame.from_records(events).reindex(columns=CsvPreprocessingScaler.RAW_COLUMNS)
+        df = CsvPreprocessingScaler.RawRowsPreprocessing(df)
+        X = PreprocessingTrainTestSplit.preprocess_data(self.preprocessor.transform(df))
+        probabilities = pd.Series(self._predict_proba(X), index=df.index).groupby(level=0).max()
+        return probabilities.reindex(range(len(events))).tolist()
+
+    def submit(self, events):
+        """Queues raw events to be scored in the next micro-batch.
+
+        Args:
+            events (list): The raw Splunk events, as dictionaries of column: value.
+
+        Returns:
+            concurrent.futures.Future: The future list of probabilities of the events.
+        """
+        future = Future()
+        self._queue.put((events, future, time.perf_counter()))
+        return future
+
+    def _run(self):
+        """Collects the queued requests in micro-batches and scores them."""
+        while True:
+            pending = [self._queue.get()]
+            size = len(pending[0][0])
+            deadline = pending[0][2] + self.flush_interval
+            while size < self.batch_size:
+                # Requests already queued join the batch even after the deadline
+                timeout = deadline - time.perf_counter()
+                try:
+                    if timeout > 0:
+                        pending.append(self._queue.get(timeout=timeout))
+                    else:
+                        pending.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+                size += len(pending[-1][0])
+            self._score_pending(pending)
+
+    def _score_pending(self, pending):
+        """Scores a micro-batch and resolves the futures of its requests.
+
+        If the batch cannot be scored (e.g. an invalid event), its requests are scored one
+        by one, so that only the requests with a bad event fail.
+        """
+        events = [event for request_events, _, _ in pending for event in request_events]
+        start = time.perf_counter()
+        try:
+            probabilities = self.score(events)
+        except Exception as e:
+            if len(pending) == 1:
+                pending[0][1].set_exception(e)
+                return
+            scored = []
+            for request in pending:
+                try:
+                    self._score_request(request)
+                    scored.append(request)
+                except Exception as e:
+                    request[1].set_exception(e)
+            if scored:
+                self._record(scored, start, time.perf_counter())
+            return
+        end = time.perf_counter()
+
+        offset = 0
+        for request_events, future, queued in pending:
+            future.set_result(probabilities[offset:offset + len(request_events)])
+            offset += len(request_events)
+        self._record(pending, start, end)
+
+    def _score_request(self, request):
+        """Scores the events of one request on their own and resolves its future."""
+        request_events, future, _ = request
+        future.set_result(self.score(request_events))
+
+    def _record(self, pending, start, end):
+        """Adds the scored requests of a micro-batch to the metrics."""
+        events = [event for request_events, _, _ in pending for event in request_events]
+        with self._lock:
+            self._events += len(events)
+            self._batches += 1
+            self._scoring_seconds += end - start
+            self._latencies.extend(end - queued for _, _, queued in pending)
+
+    def metrics(self):
+        """Returns the throughput and latency metrics.
+
+        Returns:
+            dict: Scored events and batches, events per second (since start and while
+            scoring), mean batch size and request latency percentiles in milliseconds.
+        """
+        with self._lock:
+            latencies = np.array(self._latencies) * 1000
+            elapsed = time.perf_counter() - self._started
+            return {
+                'events': self._events,
+                'batches': self._batches,
+                'mean_batch_size': self._events / self._batches if self._batches else 0.0,
+                'events_per_second': self._events / elapsed if elapsed else 0.0,
+                'scoring_events_per_second': self._events / self._scoring_seconds if self._scoring_seconds else 0.0,
+                'latency_ms_p50': float(np.percentile(latencies, 50)) if len(latencies) else 0.0,
+                'latency_ms_p95': float(np.percentile(latencies, 95)) if len(latencies) else 0.0,
+                'latency_ms_max': float(latencies.max()) if len(latencies) else 0.0,
+            }
+
+    def serve_stdin(self, input_stream=None, output_stream=None):
+        """Scores JSON lines (one raw event per line) and writes one JSON line per event, in order.
+
+        A line that is not valid JSON, or whose event cannot be scored, gets an
+        {"error": ...} line instead of its probability. The metrics are written to stderr
+        at the end of the input.
+        """
+        input_stream = input_stream or sys.stdin
+        output_stream = output_stream or sys.stdout
+        futures = queue.Queue()
+
+        def write_results():
+            while (future := futures.get()) is not None:
+                try:
+                    record = {'probability': future.result()[0]}
+                except Exception as e:
+                    record = {'error': str(e)}
+                output_stream.write(json.dumps(record) + '\n')
+                output_stream.flush()
+
+        writer = threading.Thread(target=write_results)
+        writer.start()
+        try:
+            for line in input_stream:
+                if line.strip():
+                    try:
+                        futures.put(self.submit([json.loads(line)]))
+                    except Exception as e:
+                        # The error keeps its place among the responses
+                        failed = Future()
+                        failed.set_exception(e)
+                        futures.put(failed)
+        finally:
+            futures.put(None)
+            writer.join()
+        print(json.dumps(self.metrics()), file=sys.stderr)
+
+    def serve_http(self, host='127.0.0.1', port=8765):
+        """Serves POST /score (a JSON list of raw events) and GET /metrics on a local HTTP server."""
+        service = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _reply(self, status, body):
+                payload = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_GET(self):
+                if self.path == '/metrics':
+                    self._reply(200, service.metrics())
+                else:
+                    self._reply(404, {'error': 'not found'})
+
+            def do_POST(self):
+                if self.path != '/score':
+                    self._reply(404, {'error': 'not found'})
+                    return
+                try:
+                    events = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+                    self._reply(200, {'probabilities': service.submit(events).result()})
+                except Exception as e:
+                    self._reply(400, {'error': str(e)})
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        print(f'Scoring service listening on http://{host}:{server.server_address[1]}')
+        try:
+            server.serve_forever()
+        finally:
+            server.server_close()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Scores raw Splunk events with a saved model.')
+    parser.add_argument('--model', required=True, help='Saved model (.joblib/.pkl, xgboost .json/.ubj, Keras .keras/.h5)')
+    parser.add_argument('--preprocessor', required=True, help='Saved FittedPreprocessor')
+    parser.add_argument('--mode', choices=['stdin', 'http'], default='http')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--batch-size', type=int, default=256)
+    parser.add_argument('--flush-interval', type=float, default=0.05, help='Seconds')
+    args = parser.parse_args()
+
+    scoring_service = ScoringService.load(args.model, args.preprocessor,
+                                          batch_size=args.batch_size, flush_interval=args.flush_interval)
+    if args.mode == 'stdin':
+        scoring_service.serve_stdin()
+    else:
+        scoring_service.serve_http(args.host, args.port)
@@ -0,0 +1,103 @@
+from .lib import *
+
+class SearchResultStore:
+    """A persistent store of the cross-validation fits of a hyperparameter search.
+
+    Every finished fit (one combination on one fold) is appended as a JSON line and
+    flushed immediately, so a search interrupted by a dead kernel loses at most the
+    fits that were running. A fit is keyed by the fingerprint of the training data,
+    the model, its parameters and the fold (index, number of folds and training
+    rows), so running the search again, on the same or on another encoding, skips
+    every fit already done and resumes from where it stopped.
+
+    Attributes:
+        path (str): The JSON Lines file holding the results.
+
+    Methods:
+        fingerprint(X, y): Returns the fingerprint of a training set.
+        key(dataset, model, params, fold, n_folds, n_train): Returns the key of a fit.
+        get(key): Returns the (score, seconds) of a stored fit, or None.
+        put(key, record): Stores a finished fit.
+    """
+
+    def __init__(self, path='file_cache/search_results.jsonl'):
+        """Initializes the store, loading the fits already recorded.
+
+        Args:
+            path (str): The JSON Lines file holding the results.
+        """
+        self.path = path
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._results = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # Last line cut by an interruption
+                    self._results[record['key']] = (record['score'], record['seconds'])
+
+    def __len__(self):
+        return len(self._results)
+
+    @staticmethod
+    def fingerprint(X, y):
+        """Returns the fingerprint of a training set (DataFrame, array or sparse matrix).
+
+        Args:
+            X: The training input data.
+            y: The training target labels.
+
+        Returns:
+            str: The hash of the content of X and y.
+        """
+        return joblib.hash((X, np.asarray(y)))
+
+    @staticmethod
+    def key(dataset, model, params, fold, n_folds, n_train):
+        """Returns the key of a fit.
+
+        Args:
+            dataset (str): The fingerprint of the training set.
+            model: The unfitted model, before the parameters of the combination.
+            params (dict): The parameters of the combination.
+            fold (int): The index of the fold.
+            n_folds (int): The number of folds.
+            n_train (int): The training rows of the fold (fewer when subsampled).
+
+        Returns:
+            str: The hexadecimal BLAKE2b digest identifying the fit.
+        """
+        content = json.dumps([dataset, joblib.hash(model), params, fold, n_folds, n_train],
+                             sort_keys=True, default=str)
+        return hashlib.blake2b(content.encode(), digest_size=16).hexdigest()
+
+    def get(self, key):
+        """Returns the (score, seconds) of a stored fit, or None if it was never completed."""
+        return self._results.get(key)
+
+    def put(self, key, record):
+        """Stores a finished fit.
+
+        Args:
+            key (str): The key returned by key.
+            record (dict): The fit, with at least 'score' and 'seconds'.
+        """
+        self._results[key] = (record['score'], record['seconds'])
+        line = json.dumps({'key': key, **record}, default=str) + '\n'
+        if not self._ends_with_newline():
+            # The last line was cut by an interruption: start a new one instead of appending to it
+            line = '\n' + line
+        with open(self.path, 'a') as f:
+            f.write(line)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _ends_with_newline(self):
+        """Tells whether the file is empty or ends with a complete line."""
+        if not os.path.exists(self.path) or os.path.getsize(self.path) == 0:
+            return True
+        with open(self.path, 'rb') as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b'\n'
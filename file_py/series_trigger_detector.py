@@ -0,0 +1,108 @@
+from .lib import *
+
+class SeriesTriggerDetector:
+    """
+    Rilevatore incrementale dei "primi avvii della serie" su un flusso di eventi.
+
+    Riceve gli eventi in ordine cronologico, un blocco alla volta, e per ogni primo avvio
+    (un evento di un attacco in cui la regola, l'attacco, il parent process, il process, il tipo
+    di evento, il tag o la severità cambiano rispetto all'evento precedente) restituisce subito il
+    record (evento trigger, elements_to_consider eventi precedenti). Tra un blocco e l'altro
+    conserva solo gli ultimi elements_to_consider eventi, quindi la memoria non cresce con il
+    flusso e i pattern possono essere estratti in continuo dai log, senza riordinare tutto il
+    DataFrame.
+
+    Su un DataFrame già ordinato per tempo e diviso in blocchi qualsiasi, le finestre dei trigger
+    di una regola coincidono con gli eventi restituiti da PlotsSingleAttack.preceding_events.
+
+    Attributi:
+        elements_to_consider: Numero di eventi precedenti di ogni finestra.
+        rules: Regole da controllare (None per tutte).
+        events_seen: Numero di eventi ricevuti finora.
+
+    Metodi:
+        process(batch):
+            Elabora un blocco di eventi e restituisce i record dei primi avvii trovati.
+        windows(records):
+            Concatena le finestre di più record in un unico DataFrame.
+    """
+
+    def __init__(self, elements_to_consider, rules=None, rule_col='signature', mitre_attack_col='RuleAnnotation.mitre_attack.id', eventtype_col='EventType', parent_col='parent_process_id', process_col='process_id', severity_col='severity_id', tag_col='tag', attack_col='corrisponde_ad_attacco'):
+        """
+        Inizializza il rilevatore con un buffer vuoto.
+
+        Args:
+        elements_to_consider: Numero di eventi precedenti di ogni finestra.
+        rules: Regole da controllare; None per considerare i primi avvii di tutte le regole.
+        Gli altri argomenti sono i nomi delle colonne, come in PlotsSingleAttack.patterns_before_activation.
+        """
+        self.elements_to_consider = elements_to_consider
+        self.rules = None if rules is None else set(rules)
+        self.rule_col = rule_col
+        self.attack_col = attack_col
+        self.series_columns = [rule_col, mitre_attack_col, parent_col, process_col, eventtype_col, tag_col, severity_col]
+        self.events_seen = 0
+
+        self._buffer = None  # Ultimi elements_to_consider eventi
+        self._last = None    # Ultimo evento, per il confronto con il primo evento del blocco successivo
+
+    def process(self, batch):
+        """
+        Elabora un blocco di eventi e restituisce i record dei primi avvii trovati.
+
+        Args:
+        batch: DataFrame con gli eventi successivi a quelli già ricevuti, in ordine cronologico.
+
+        Returns:
+        list: Un record (trigger, finestra) per ogni primo avvio, nell'ordine del flusso: trigger è
+        la riga dell'evento (pandas.Series), finestra il DataFrame dei fino a elements_to_consider
+        eventi che lo precedono, in ordine cronologico.
+        """
+        if len(batch) == 0:
+            return []
+
+        # Confronto di ogni evento con il precedente, anche a cavallo tra due blocchi
+        changed = np.zeros(len(batch), dtype=bool)
+        for column in self.series_columns:
+            values = batch[column].reset_index(drop=True)
+            if self._last is not None:
+                values = pd.concat([self._last[column].reset_index(drop=True), values], ignore_index=True)
+            # Come nel confronto riga per riga, NaN != NaN conta come cambiamento
+            column_changed = values.ne(values.shift()).fillna(True).to_numpy(dtype=bool)
+            changed |= column_changed[1:] if self._last is not None else column_changed
+        if self._last is None:
+            changed[0] = False  # Il primo evento del flusso non ha un precedente
+
+        is_trigger = changed & (batch[self.attack_col] == True).to_numpy(dtype=bool)
+        if self.rules is not None:
+            is_trigger &= batch[self.rule_col].isin(self.rules).to_numpy(dtype=bool)
+        triggers = np.flatnonzero(is_trigger)
+
+        # Il buffer precede il blocco: le finestre possono iniziare nei blocchi precedenti
+        history = batch if self._buffer is None else pd.concat([self._buffer, batch])
+        offset = len(history) - len(batch)
+        records = []
+        for trigger in triggers:
+            end = offset + trigger
+            window = history.iloc[max(0, end - self.elements_to_consider):end]
+            records.append((batch.iloc[trigger], window))
+
+        self._buffer = history.iloc[len(history) - min(len(history), self.elements_to_consider):]
+        self._last = batch.iloc[-1:]
+        self.events_seen += len(batch)
+        return records
+
+    @staticmethod
+    def windows(records):
+        """
+        Concatena le finestre di più record in un unico DataFrame, come PlotsSingleAttack.preceding_events.
+
+        Args:
+        records: I record restituiti da process.
+
+        Returns:
+        DataFrame: Gli eventi delle finestre, con un indice da 0 a n-1.
+        """
+        if not records:
+            return pd.DataFrame()
+        return pd.concat([window for _, window in records], ignore_index=True)
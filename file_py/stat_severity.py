@@ -6,35 +6,94 @@ class StatSeverity:
 
     Metodi
     ------
-    plot_stat_severity(df)
+    severity_stats(df, severity_col='severity_id', attack_col=None)
+        Calcola la severità massima, media e minima di ogni attacco in un'unica passata.
+    plot_stat_severity(df, stats=None)
         Genera e visualizza istogrammi per le statistiche di severità massima, minima e media.
+    draw_stat_severity(stats)
+        Disegna gli istogrammi delle statistiche senza visualizzarli (vedi FigureRenderer).
     """
     @staticmethod
-    def plot_stat_severity(df):
+    def severity_stats(df, severity_col='severity_id', attack_col=None):
+        """
+        Calcola la severità massima, media e minima di ogni attacco con un unico groupby vettoriale.
+
+        Parametri
+        ----------
+        df : pandas.DataFrame
+            Se attack_col è None, una riga per attacco con una lista di valori in severity_col;
+            altrimenti una riga per evento (formato piatto), con l'attacco in attack_col.
+        severity_col : str
+            Nome della colonna con la severità.
+        attack_col : str
+            Nome della colonna che identifica l'attacco nel formato piatto.
+
+        Ritorna
+        -------
+        pandas.DataFrame
+            Un nuovo DataFrame con le colonne 'severity_max', 'severity_mean' e 'severity_min':
+            con lo stesso indice di df se attack_col è None, altrimenti indicizzato per attacco.
+            Il DataFrame di partenza non viene modificato.
+        """
+        if attack_col is None:
+            # Formato piatto (attacco, severità): la posizione della riga identifica l'attacco
+            severity = df[severity_col].reset_index(drop=True).explode()
+            keys = severity.index
+        else:
+            severity = df[severity_col]
+            keys = df[attack_col]
+
+        stats = pd.to_numeric(severity).groupby(keys).agg(severity_max='max', severity_mean='mean', severity_min='min')
+
+        if attack_col is None:
+            stats.index = df.index
+        return stats
+
+    @staticmethod
+    def plot_stat_severity(df, stats=None):
         """
         Genera e visualizza istogrammi per le statistiche di severità massima, minima e media.
 
         Parametri
         ----------
         df : pandas.DataFrame
-            DataFrame contenente una colonna 'severity_id' con valori numerici.
+            DataFrame contenente una colonna 'severity_id' con una lista di valori numerici per ogni attacco.
+        stats : pandas.DataFrame
+            Statistiche già calcolate con severity_stats; se None vengono calcolate da df.
 
-        Il metodo calcola tre nuove colonne nel DataFrame:
+        Le statistiche sono:
         - 'severity_max': il valore massimo di 'severity_id'
         - 'severity_mean': il valore medio di 'severity_id'
         - 'severity_min': il valore minimo di 'severity_id'
 
-        Quindi, crea tre sottotrame (subplots) per visualizzare gli istogrammi delle distribuzioni di queste nuove colonne.
+        Quindi, crea tre sottotrame (subplots) per visualizzare gli istogrammi delle distribuzioni di queste colonne.
+        """
+        if stats is None:
+            stats = StatSeverity.severity_stats(df)
+
+        StatSeverity.draw_stat_severity(stats)
+        plt.show()
+
+    @staticmethod
+    def draw_stat_severity(stats):
         """
-        df["severity_max"] = df["severity_id"].apply(max)
-        df["severity_mean"] = df["severity_id"].apply(lambda x: sum(x) / len(x))
-        df["severity_min"] = df["severity_id"].apply(min)
+        Disegna gli istogrammi delle statistiche di severità, senza visualizzarli.
 
+        Parametri
+        ----------
+        stats : pandas.DataFrame
+            Statistiche calcolate con severity_stats.
+
+        Ritorna
+        -------
+        matplotlib.figure.Figure
+            La figura con i tre istogrammi.
+        """
         fig, axs = plt.subplots(1, 3, figsize=(18, 8), sharey=True)
         fig.suptitle('Statistiche di Criticità per ogni attacco', fontsize=16)
 
         # Istogramma per 'severity_max' nel primo subplot
-        n, bins, patches = axs[0].hist(df['severity_max'], bins=10, edgecolor='black')
+        n, bins, patches = axs[0].hist(stats['severity_max'], bins=10, edgecolor='black')
         axs[0].set_title('Criticità Massima')
         axs[0].set_ylabel('Frequenza')
 
@@ -50,7 +109,7 @@ class StatSeverity:
         axs[0].set_xticks([])  # Rimuovi le xticks dopo aver aggiunto le etichette manualmente
 
         # Istogramma per 'severity_min' nel secondo subplot
-        n, bins, patches = axs[1].hist(df['severity_min'], bins=10, edgecolor='black')
+        n, bins, patches = axs[1].hist(stats['severity_min'], bins=10, edgecolor='black')
         axs[1].set_title('Criticità Minima')
 
         # Aggiungi i valori sopra le barre dell'istogramma 'severity_min'
@@ -65,7 +124,7 @@ class StatSeverity:
         axs[1].set_xticks([])  # Rimuovi le xticks dopo aver aggiunto le etichette manualmente
 
         # Istogramma per 'severity_mean' nel terzo subplot
-        n, bins, patches = axs[2].hist(df['severity_mean'], bins=10, edgecolor='black')
+        n, bins, patches = axs[2].hist(stats['severity_mean'], bins=10, edgecolor='black')
         axs[2].set_title('Criticità Media')
 
         # Aggiungi i valori sopra le barre dell'istogramma 'severity_mean'
@@ -80,4 +139,4 @@ class StatSeverity:
         axs[2].set_xticks([])  # Rimuovi le xticks dopo aver aggiunto le etichette manualmente
 
         plt.tight_layout()
-        plt.show()
\ No newline at end of file
+        return fig
\ No newline at end of file
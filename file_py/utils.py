@@ -1,57 +1,34 @@
 import pandas as pd
 from IPython.display import Markdown, display
+from .rule_scorecard import RuleScorecard
 
 class MarkdownHelper:
 
     @staticmethod
-    def create_value_counts_variables(df):
+    def create_value_counts_variables(df, scorecard=None):
         """Calculates specific variables from a dataset and saves them in a dictionary"""
 
-        # Regole diverse (tutte le regole presenti nel dataset)
-        regole_diverse = df['signature'].nunique()
-
-        attacchi_df = df[df['corrisponde_ad_attacco'] == True]
-        non_attacchi_df = df[df['corrisponde_ad_attacco'] == False]
-
-        # Regole attacco reale (tutte le regole che hanno risposto ad un attacco reale almeno una volta)
-        regole_attacco_reale = attacchi_df['signature'].nunique()
-
-        # Regole non attacco reale (tutte le regole che non hanno mai risposto ad un vero attacco)
-        regole_non_attacchi_reale = len(set(non_attacchi_df['signature'].unique()) - set(attacchi_df['signature'].unique()))
-
-        # Contatori per le regole specifiche, generiche e con lo stesso numero di attivazioni per attacchi e non-attacchi
-        regole_generiche = 0
-        regole_specifiche = 0
-        regole_stesso_numero = 0
-
-        signature_counts = df['signature'].value_counts()
-        attack_counts = attacchi_df['signature'].value_counts()
-        non_attack_counts = non_attacchi_df['signature'].value_counts()
-
-        for signature in signature_counts.index:
-            attacchi_regola = attack_counts.get(signature, 0)
-            non_attacchi_regola = non_attack_counts.get(signature, 0)
-
-            if attacchi_regola < non_attacchi_regola and attacchi_regola != 0:
-                # Regole generiche (delle regole facenti parte di "Regole attacco reale" queste si sono attivate più volte per non-attacchi che per attacchi)
-                regole_generiche += 1
-            elif attacchi_regola > non_attacchi_regola:
-                # Regole specifiche (delle regole facenti parte di "Regole attacco reale" queste si sono attivate più volte per attacchi che per non-attacchi)
-                regole_specifiche += 1
-            elif attacchi_regola == non_attacchi_regola:
-                # Regole stesso numero (delle regole facenti parte di "Regole attacco reale" queste si sono attivate lo stesso numero di volte per attacchi e non-attacchi)
-                regole_stesso_numero += 1
+        # Una riga per regola con attivazioni per attacchi e non-attacchi e la classe della regola
+        if scorecard is None:
+            scorecard = RuleScorecard.build(df)
+        classi = scorecard['class'].value_counts()
 
         # Nomi delle regole che fanno parte di "Regole non attacco reale"
-        nomi_regole_non_attacco = list(set(non_attacchi_df['signature'].unique()) - set(attacchi_df['signature'].unique()))
+        nomi_regole_non_attacco = scorecard.loc[scorecard['class'] == 'non_attack', 'signature'].tolist()
 
         variabili = {
-            'regole_diverse': regole_diverse,
-            'regole_attacco_reale': regole_attacco_reale,
-            'regole_generiche': regole_generiche,
-            'regole_stesso_numero': regole_stesso_numero,
-            'regole_specifiche': regole_specifiche,
-            'regole_non_attacco': regole_non_attacchi_reale,
+            # Regole diverse (tutte le regole presenti nel dataset)
+            'regole_diverse': len(scorecard),
+            # Regole attacco reale (tutte le regole che hanno risposto ad un attacco reale almeno una volta)
+            'regole_attacco_reale': int((scorecard['true_positives'] > 0).sum()),
+            # Regole generiche (delle regole facenti parte di "Regole attacco reale" queste si sono attivate più volte per non-attacchi che per attacchi)
+            'regole_generiche': int(classi.get('generic', 0)),
+            # Regole stesso numero (delle regole facenti parte di "Regole attacco reale" queste si sono attivate lo stesso numero di volte per attacchi e non-attacchi)
+            'regole_stesso_numero': int(classi.get('equal', 0)),
+            # Regole specifiche (delle regole facenti parte di "Regole attacco reale" queste si sono attivate più volte per attacchi che per non-attacchi)
+            'regole_specifiche': int(classi.get('specific', 0)),
+            # Regole non attacco reale (tutte le regole che non hanno mai risposto ad un vero attacco)
+            'regole_non_attacco': len(nomi_regole_non_attacco),
             'nomi_regole_non_attacco': nomi_regole_non_attacco
         }
 
@@ -1,9 +1,11 @@
 from .lib import *
+from .plots import Plots
 
 class ValueCountsPlot:
     """
     This class generates bar plots to visualize the count of values in a specified column of a DataFrame.
-    Each unique value in the specified column is plotted separately.
+    Each unique value in the specified column is plotted separately; the counts are computed with a single
+    crosstab and the subplots are split into pages of at most max_per_page.
     
     Parameters:
     - df: DataFrame: The DataFrame containing the data to be plotted.
@@ -23,63 +25,38 @@ class ValueCountsPlot:
 
     """
 
-    def plot_value_counts_per_unique(df):
+    def value_counts_per_unique_data(df):
         """
-        Plot the count of values for each unique value in a specified column of the DataFrame.
+        Counts the values of 'corrisponde_ad_attacco' for each unique MITRE ATT&CK id.
 
         Parameters:
         - df: DataFrame: The DataFrame containing the data to be plotted.
-        """
-
-        unique_col = 'RuleAnnotation.mitre_attack.id'
-        count_col = 'corrisponde_ad_attacco'
-        cols = 5  # Numero di colonne desiderato nella griglia dei subplot
-        color = ['#5cabbf', '#a15cbf']  # Colori per le barre
-        xlabel = ''  # Etichetta per l'asse x
-        ylabel = 'N. record'  # Etichetta per l'asse y
-        xtick_labels = ['Non attacco', 'Attacco']  # Etichette per i tick dell'asse x
-        figsize_multiplier = (5, 4)  # Multiplicatore per la dimensione della figura (larghezza, altezza)
-
-        # Troviamo i valori unici della colonna unique_col
-        unique_values = df[unique_col].unique()
-
-        # Impostiamo il numero di subplot (una per ciascun valore unico di unique_col)
-        num_plots = len(unique_values)
-
-        # Determiniamo il numero di righe e colonne per la griglia
-        rows = math.ceil(num_plots / cols)  # Calcola il numero di righe necessario
-
-        # Creiamo i subplot
-        fig, axes = plt.subplots(rows, cols, figsize=(figsize_multiplier[0] * cols, figsize_multiplier[1] * rows))
-
-        # Se c'è solo un valore unico, axes non è un array bidimensionale, quindi lo convertiamo
-        if num_plots == 1:
-            axes = [[axes]]
-        elif rows == 1:
-            axes = [axes]
-
-        # Cicliamo su ciascun valore unico di unique_col e plottiamo i dati
-        for ax, value in zip(axes.flat, unique_values):
-            # Filtriamo il DataFrame per il valore corrente di unique_col
-            filtered_df = df[df[unique_col] == value]
 
-            # Contiamo i valori di count_col (0 e 1)
-            count_values = filtered_df[count_col].value_counts().sort_index()
+        Returns:
+        - DataFrame: One row per unique MITRE ATT&CK id, with the counts of 0 and 1.
+        """
+        return Plots.value_counts_per_unique_data(df, unique_col='RuleAnnotation.mitre_attack.id')
 
-            # Creiamo il grafico sul subplot corrente
-            count_values.plot(kind='bar', ax=ax, color=color)
+    def draw_value_counts_per_unique(data):
+        """
+        Draws one bar chart for each row of the table returned by value_counts_per_unique_data
+        (or of one of its pages, see Plots.value_counts_pages).
 
-            # Aggiungiamo etichette e titolo
-            ax.set_xlabel(xlabel)
-            ax.set_ylabel(ylabel)
-            ax.set_title(value)
-            ax.set_xticks([0, 1])
-            ax.set_xticklabels(xtick_labels, rotation='horizontal')
+        Returns:
+        - Figure: The matplotlib figure.
+        """
+        return Plots.draw_value_counts_per_unique(data, figsize_multiplier=(5, 4), annotate=False)
 
-        # Rimuoviamo gli assi vuoti
-        for i in range(num_plots, rows * cols):
-            fig.delaxes(axes.flat[i])
+    def plot_value_counts_per_unique(df, max_per_page=50):
+        """
+        Plot the count of values for each unique value in a specified column of the DataFrame,
+        in pages of at most max_per_page subplots.
 
-        # Aggiustiamo il layout
-        plt.tight_layout()
-        plt.show()
\ No newline at end of file
+        Parameters:
+        - df: DataFrame: The DataFrame containing the data to be plotted.
+        - max_per_page: int: The maximum number of subplots of a figure.
+        """
+        data = ValueCountsPlot.value_counts_per_unique_data(df)
+        for page in Plots.value_counts_pages(data, max_per_page):
+            ValueCountsPlot.draw_value_counts_per_unique(page)
+            plt.show()
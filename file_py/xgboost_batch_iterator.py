@@ -0,0 +1,39 @@
+from .lib import *
+
+class XGBoostBatchIterator(xgb.DataIter):
+    """Feeds XGBoost one batch at a time from a source of (X, y) batches.
+
+    XGBoost may go through the data more than once (to build the quantiles and then
+    to fill the matrix), so the source is a function that starts a new pass every
+    time it is called, e.g. lambda: preprocessor.transform_batches(frames).
+
+    Methods:
+        next(input_data): Passes the next batch to XGBoost; returns False at the end of a pass.
+        reset(): Starts a new pass.
+    """
+
+    def __init__(self, batches, cache_prefix=None):
+        """Initializes the iterator.
+
+        Args:
+            batches (callable): A function without arguments returning an iterable of (X, y) batches.
+            cache_prefix (str): The prefix of the on-disk pages, for an external-memory DMatrix.
+        """
+        self._batches = batches
+        self._iterator = None
+        super().__init__(cache_prefix=cache_prefix)
+
+    def next(self, input_data):
+        """Passes the next batch to XGBoost; returns False at the end of a pass."""
+        if self._iterator is None:
+            self._iterator = iter(self._batches())
+        try:
+            X, y = next(self._iterator)
+        except StopIteration:
+            return False
+        input_data(data=X, label=y)
+        return True
+
+    def reset(self):
+        """Starts a new pass."""
+        self._iterator = None